@@ -139,6 +139,25 @@ def create_histogram(data, bins=30, title="分布直方图", x_label="值"):
     
     return fig
 
+def create_binned_histogram(bins, counts, title="分布直方图", x_label="值"):
+    """根据预先分箱的统计结果创建直方图（如网格质量指标）"""
+    labels = [f"{lo:g}–{hi:g}" for lo, hi in zip(bins[:-1], bins[1:])]
+    
+    fig = go.Figure(data=[go.Bar(
+        x=labels,
+        y=counts,
+        marker_color='rgb(55, 83, 109)'
+    )])
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_label,
+        yaxis_title="单元数",
+        bargap=0.1
+    )
+    
+    return fig
+
 def create_box_plot(data_dict, title="箱线图"):
     """创建箱线图"""
     fig = go.Figure()
@@ -3,6 +3,11 @@ import streamlit as st
 from stpyvista import stpyvista
 import numpy as np
 
+try:
+    from services.result_store import open_results
+except ImportError:
+    open_results = None
+
 class CAE3DViewer:
     """CAE 3D 可视化组件"""
     
@@ -10,8 +15,10 @@ class CAE3DViewer:
         self.plotter = None
     
     def load_mesh(self, mesh_file):
-        """加载网格文件"""
+        """加载网格文件（.frd 经结果存储零拷贝打开，只在首次或结果更新后转换）"""
         try:
+            if open_results is not None and str(mesh_file).lower().endswith('.frd'):
+                return open_results(mesh_file).to_pyvista()
             mesh = pv.read(mesh_file)
             return mesh
         except Exception as e:
@@ -28,6 +35,7 @@ class CAE3DViewer:
         # 查找应力数据
         stress_arrays = [name for name in mesh.array_names 
                         if 'stress' in name.lower() or 'mises' in name.lower()]
+        stress_arrays.sort(key=lambda name: 'mises' not in name.lower())
         
         if not stress_arrays:
             st.warning("未找到应力数据")
@@ -3,7 +3,65 @@ import pandas as pd
 import numpy as np
 
 # 导入统一的导入助手
-from utils.imports import SimulationDataCollector
+from utils.imports import SimulationDataCollector, analyze_mesh
+from components.charts import create_binned_histogram
+
+QUALITY_METRIC_LABELS = {
+    'scaled_jacobian': 'Scaled Jacobian',
+    'aspect_ratio': '长宽比',
+    'skewness': '偏斜度',
+    'min_dihedral': '最小二面角 (°)',
+    'max_dihedral': '最大二面角 (°)',
+}
+
+def show_mesh_quality_section():
+    """网格质量评估"""
+    st.subheader("🔍 网格质量")
+
+    mesh_file = st.text_input("网格文件路径 (.msh)", help="输入 Gmsh 生成的 .msh 文件路径")
+
+    if not mesh_file or not st.button("评估网格质量"):
+        return
+
+    if analyze_mesh is None:
+        st.warning("网格质量模块不可用")
+        return
+
+    try:
+        with st.spinner("正在计算网格质量..."):
+            stats = analyze_mesh(mesh_file)
+    except Exception as e:
+        st.error(f"网格质量评估失败: {e}")
+        return
+
+    quality = stats.get('quality_metrics')
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("节点数", f"{stats['num_nodes']:,}")
+    col2.metric("体单元数", f"{stats['num_volume_elements']:,}")
+    col3.metric("质量得分", f"{stats['quality']:.3f}")
+    col4.metric("翻转单元", quality['num_inverted'] if quality else 0)
+
+    if not quality:
+        st.info("网格中没有四面体或六面体单元")
+        return
+
+    metric = st.selectbox(
+        "质量指标",
+        list(QUALITY_METRIC_LABELS),
+        format_func=lambda name: QUALITY_METRIC_LABELS[name]
+    )
+    summary = quality['metrics'][metric]
+    st.caption(f"最小 {summary['min']:.3f} / 平均 {summary['mean']:.3f} / 最大 {summary['max']:.3f}")
+    st.plotly_chart(
+        create_binned_histogram(
+            summary['histogram']['bins'],
+            summary['histogram']['counts'],
+            title=f"{QUALITY_METRIC_LABELS[metric]} 分布",
+            x_label=QUALITY_METRIC_LABELS[metric]
+        ),
+        use_container_width=True
+    )
 
 def show_analysis_page():
     """数据分析页面"""
@@ -71,30 +129,36 @@ def show_analysis_page():
             recent_df = pd.DataFrame(recent)
             st.dataframe(recent_df, use_container_width=True)
 
+        st.divider()
+        show_mesh_quality_section()
+
     else:
         # 按类型筛选数据
-        training_data = collector.get_training_data(analysis_type)
+        # 列式读取：每个几何参数一列，直接构造 DataFrame，无需逐行解析参数字符串
+        if hasattr(collector, 'get_training_columns'):
+            df = pd.DataFrame(collector.get_training_columns(analysis_type))
+        else:
+            df = pd.DataFrame(collector.get_training_data(analysis_type))
 
-        if not training_data:
+        if df.empty:
             st.info(f"暂无 {analysis_type} 类型的仿真数据")
         else:
             # 数据统计
             st.subheader(f"{analysis_type} 仿真数据统计")
 
-            df = pd.DataFrame(training_data)
-
             # 基本统计信息
             st.write("基本统计:")
             st.write(df.describe())
 
             # 数据可视化
+            value_column = 'max_stress' if 'max_stress' in df.columns else df.columns[-1]
             col1, col2 = st.columns(2)
 
             with col1:
                 # 直方图
                 fig = px.histogram(
                     df,
-                    x='value',
+                    x=value_column,
                     title=f'{analysis_type} 数值分布',
                     nbins=30
                 )
@@ -107,7 +171,7 @@ def show_analysis_page():
                     time_fig = px.line(
                         df,
                         x='timestamp',
-                        y='value',
+                        y=value_column,
                         title=f'{analysis_type} 时间趋势'
                     )
                     st.plotly_chart(time_fig, use_container_width=True)
@@ -61,6 +61,8 @@ def show_monitor_page():
         if st.button("查询任务状态"):
             if get_task_status:
                 status = get_task_status(task_id)
+                if status.get('eta_seconds') is not None:
+                    st.metric("预计剩余时间", f"{status['eta_seconds'] / 60:.1f} 分钟")
                 st.json(status)
             else:
                 st.warning("任务状态查询功能暂不可用")
@@ -91,7 +91,18 @@ def show_visualize_page():
     if result_data:
         # 如果有实际数据，显示3D可视化
         # 这里需要集成 PyVista 或其他3D可视化库
-        placeholder.info("3D 可视化区域 (需要安装 PyVista)")
+        with placeholder.container():
+            col1, col2 = st.columns(2)
+            col1.metric("节点数", f"{result_data['n_points']:,}")
+            col2.metric("单元数", f"{result_data['n_cells']:,}")
+            if result_data.get('fields'):
+                st.dataframe(
+                    [{'字段': f['name'], '步': f['step'], '增量': f['increment'],
+                      '时间': f['time'], '列': ', '.join(f['columns'])}
+                     for f in result_data['fields']],
+                    use_container_width=True
+                )
+            st.info("3D 可视化区域 (需要安装 PyVista)")
     else:
         # 显示示例说明
         placeholder.markdown("""
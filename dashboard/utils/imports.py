@@ -62,6 +62,13 @@ except ImportError as e:
     print(f"✗ 导入 VisualizationService 失败: {e}")
     VisualizationService = None
 
+try:
+    from services.mesh_quality import analyze_mesh
+    print("✓ 成功导入 analyze_mesh")
+except ImportError as e:
+    print(f"✗ 导入 analyze_mesh 失败: {e}")
+    analyze_mesh = None
+
 # 如果某些模块导入失败，创建模拟类
 if SimulationDataCollector is None:
     print("创建 SimulationDataCollector 模拟类")
@@ -97,4 +104,5 @@ __all__ = [
     'SurrogateModel',
     'train_surrogate_model',
     'VisualizationService',
+    'analyze_mesh',
 ]
@@ -1,13 +1,32 @@
 """
 几何特征提取器
-使用 3D CNN 或 PointNet 提取几何特征向量
+使用 3D CNN（稠密体素）或 PointNet（表面体素点云）提取几何特征向量
 """
 
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+from ml.models.voxel_cache import CACHE_ERRORS, COORDS_MODE, get_voxel_cache, unpack_voxels, voxelize_job
+from ml.models.voxelizer import surface_coords_step, voxelize_step, voxels_to_coords
+
+INFERENCE_BACKENDS = ('torch', 'torchscript', 'onnx')
+MODEL_TYPES = ('simple_3dcnn', 'pointnet')
+
 class Simple3DCNN(nn.Module):
     """简单的 3D CNN 几何编码器"""
     
@@ -54,90 +73,328 @@ class Simple3DCNN(nn.Module):
         return F.normalize(x, p=2, dim=1)  # L2 归一化
 
 
+class PointNetEncoder(nn.Module):
+    """PointNet 几何编码器（逐点共享 MLP + 全局最大池化）
+
+    输入为表面体素中心组成的点云，计算量和激活内存与点数成正比，与包围盒体积无关；
+    最大池化对点的顺序和重复点不敏感，点数不足时可以重复补齐
+    """
+    
+    def __init__(self, feature_dim=128):
+        super(PointNetEncoder, self).__init__()
+        
+        self.conv1 = nn.Conv1d(3, 64, 1)
+        self.bn1 = nn.BatchNorm1d(64)
+        self.conv2 = nn.Conv1d(64, 128, 1)
+        self.bn2 = nn.BatchNorm1d(128)
+        self.conv3 = nn.Conv1d(128, 512, 1)
+        self.bn3 = nn.BatchNorm1d(512)
+        
+        self.fc1 = nn.Linear(512, 256)
+        self.bn4 = nn.BatchNorm1d(256)
+        self.dropout = nn.Dropout(0.3)
+        self.fc2 = nn.Linear(256, feature_dim)
+    
+    def forward(self, x):
+        # x shape: (batch, num_points, 3)，坐标归一化到 [-1, 1]
+        x = x.transpose(1, 2)
+        x = F.relu(self.bn1(self.conv1(x)))
+        x = F.relu(self.bn2(self.conv2(x)))
+        x = F.relu(self.bn3(self.conv3(x)))
+        x = torch.max(x, dim=2)[0]
+        
+        x = F.relu(self.bn4(self.fc1(x)))
+        x = self.dropout(x)
+        x = self.fc2(x)
+        
+        return F.normalize(x, p=2, dim=1)  # L2 归一化
+
+
+def coords_to_points(coords, resolution, num_points=2048, rng=None):
+    """体素坐标 (N, 3) -> 固定点数的点云 (num_points, 3) float32，坐标归一化到 [-1, 1]
+
+    点数多于 num_points 时下采样（rng 为 None 时等间隔取点，结果确定），
+    少于时循环重复补齐；空网格返回全零
+    """
+    coords = np.asarray(coords)
+    if len(coords) == 0:
+        return np.zeros((num_points, 3), dtype=np.float32)
+    if len(coords) > num_points:
+        if rng is None:
+            idx = np.linspace(0, len(coords) - 1, num_points).astype(np.int64)
+        else:
+            idx = rng.choice(len(coords), num_points, replace=False)
+    else:
+        idx = np.arange(num_points) % len(coords)
+    return ((coords[idx] + 0.5) * (2.0 / resolution) - 1.0).astype(np.float32)
+
+
+def voxels_to_points(voxels, num_points=2048, rng=None):
+    """(R, R, R) 体素网格 -> 表面体素点云 (num_points, 3)"""
+    return coords_to_points(voxels_to_coords(voxels), len(voxels), num_points, rng)
+
+
+def _bounded_map(executor, fn, items, limit):
+    """按输入顺序返回 fn(item) 的结果，同时在途的任务不超过 limit 个
+
+    executor.map 会一次性提交全部任务，结果在主进程中堆积；这里消费一个才补交一个
+    """
+    in_flight = deque()
+    for item in items:
+        in_flight.append(executor.submit(fn, item))
+        if len(in_flight) >= limit:
+            yield in_flight.popleft().result()
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
 class GeometryFeatureExtractor:
-    """几何特征提取器"""
+    """几何特征提取器
+
+    model_type 为 'pointnet' 时使用 PointNetEncoder：STEP 输入经三角化后直接求表面体素坐标
+    （surface_voxel_coords，缓存、进程间传递的都是 (N, 3) 坐标，不生成 R³ 网格，voxel_mode 不起作用），
+    再采样为 num_points 个点，内存和计算量随表面积增长，适合高分辨率；体素网格输入取其表面体素。
+    backend 为 'torchscript' / 'onnx' 时在第一次推理前编译模型（onnx 需要 onnxruntime，
+    只在 CPU 上运行）；num_threads 设置 PyTorch 的 intra-op 线程数（进程级设置）。
+    use_cache 时体素网格经由 VoxelCache 读写（cache_dir 缺省为 VOXEL_CACHE_DIR），
+    缓存目录不可用时按不使用缓存处理
+    """
     
-    def __init__(self, model_path=None, resolution=64, feature_dim=128):
+    def __init__(self, model_path=None, resolution=64, feature_dim=128, voxel_mode='solid',
+                 backend='torch', num_threads=None, use_cache=True, cache_dir=None,
+                 model_type='simple_3dcnn', num_points=2048):
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown backend: {backend} (expected one of {INFERENCE_BACKENDS})")
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"Unknown model type: {model_type} (expected one of {MODEL_TYPES})")
         self.resolution = resolution
+        self.model_type = model_type
+        self.num_points = num_points
         self.feature_dim = feature_dim
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.voxel_mode = voxel_mode
+        self.backend = backend
+        self.num_threads = num_threads
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self._runner = None
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.device = torch.device('cuda' if torch.cuda.is_available() and backend != 'onnx' else 'cpu')
         
         # 创建模型
-        self.model = Simple3DCNN(
-            input_shape=(resolution, resolution, resolution),
-            feature_dim=feature_dim
-        ).to(self.device)
+        if model_type == 'pointnet':
+            self.model = PointNetEncoder(feature_dim=feature_dim).to(self.device)
+        else:
+            self.model = Simple3DCNN(
+                input_shape=(resolution, resolution, resolution),
+                feature_dim=feature_dim
+            ).to(self.device)
         
         if model_path:
             self.load_model(model_path)
     
-    def voxelize_step_file(self, step_file, resolution=None):
-        """将 STEP 文件转换为体素网格"""
+    def _voxel_cache(self):
+        """共享的体素缓存；未启用或不可用（目录无写权限、索引损坏等）时返回 None"""
+        if not self.use_cache:
+            return None
+        try:
+            return get_voxel_cache(self.cache_dir)
+        except CACHE_ERRORS as e:
+            print(f"体素缓存不可用，不使用缓存: {e}")
+            return None
+    
+    def voxelize_step_file(self, step_file, resolution=None, mode=None):
+        """将 STEP 文件转换为体素网格（三角化一次后向量化体素化，见 ml.models.voxelizer）
+
+        Args:
+            mode: 'solid'（内部 + 表面）或 'surface'，缺省为 self.voxel_mode
+        """
         resolution = resolution or self.resolution
-        
+        mode = mode or self.voxel_mode
+        cache = self._voxel_cache()
         try:
-            import cadquery as cq
-            
-            # 加载几何
-            shape = cq.importers.importStep(step_file)
-            
-            # 获取包围盒
-            bb = shape.val().BoundingBox()
-            
-            # 创建体素网格
-            x_min, x_max = bb.xmin, bb.xmax
-            y_min, y_max = bb.ymin, bb.ymax
-            z_min, z_max = bb.zmin, bb.zmax
-            
-            # 计算体素大小
-            x_size = (x_max - x_min) / resolution
-            y_size = (y_max - y_min) / resolution
-            z_size = (z_max - z_min) / resolution
-            
-            # 初始化体素网格
-            voxels = np.zeros((resolution, resolution, resolution), dtype=np.float32)
-            
-            # 填充体素（简化版：采样点检测）
-            for i in range(resolution):
-                for j in range(resolution):
-                    for k in range(resolution):
-                        x = x_min + (i + 0.5) * x_size
-                        y = y_min + (j + 0.5) * y_size
-                        z = z_min + (k + 0.5) * z_size
-                        
-                        point = cq.Vector(x, y, z)
-                        
-                        # 检查点是否在几何内部
-                        # 这里使用简化方法，实际应用需要更精确的算法
-                        try:
-                            is_inside = shape.val().isInside(point, tolerance=max(x_size, y_size, z_size))
-                            voxels[i, j, k] = 1.0 if is_inside else 0.0
-                        except:
-                            voxels[i, j, k] = 0.0
-            
-            return voxels
-        
+            if cache is not None:
+                return cache.get_or_voxelize(step_file, resolution, mode)
+            return voxelize_step(step_file, resolution, mode)
+        except Exception as e:
+            print(f"体素化失败: {e}")
+            return None
+    
+    def surface_coords(self, step_file, resolution=None):
+        """STEP 文件 -> (N, 3) 表面体素坐标（稀疏，不生成 R³ 网格），失败返回 None"""
+        resolution = resolution or self.resolution
+        cache = self._voxel_cache()
+        try:
+            if cache is not None:
+                return cache.get_or_voxelize(step_file, resolution, COORDS_MODE)
+            return surface_coords_step(step_file, resolution)
         except Exception as e:
             print(f"体素化失败: {e}")
             return None
     
     def extract_features(self, step_file):
         """提取几何特征向量"""
+        if self.model_type == 'pointnet':
+            coords = self.surface_coords(step_file)
+            if coords is None:
+                return None
+            return self._encode(self._coords_input(coords)[None])[0]
+        
         # 体素化
         voxels = self.voxelize_step_file(step_file)
         
         if voxels is None:
             return None
         
-        # 转换为 PyTorch 张量
-        voxels_tensor = torch.from_numpy(voxels).unsqueeze(0).unsqueeze(0).to(self.device)
-        
-        # 提取特征
+        return self.encode_voxels(voxels[None])[0]
+    
+    def _input_shape(self, batch):
+        if self.model_type == 'pointnet':
+            return (batch, self.num_points, 3)
+        return (batch, 1) + (self.resolution,) * 3
+    
+    def _model_input(self, voxels):
+        """一批体素网格 -> 模型输入（稠密网格加通道维，或表面点云）"""
+        if self.model_type == 'pointnet':
+            return np.stack([voxels_to_points(grid, self.num_points) for grid in voxels])
+        return voxels[:, None]
+    
+    def _coords_input(self, coords):
+        """表面体素坐标 -> 单个样本的 PointNet 输入"""
+        return coords_to_points(coords, self.resolution, self.num_points)
+    
+    def _job_input(self, result):
+        """voxelize_job 的结果（位压缩网格或坐标）-> 单个样本的模型输入"""
+        if self.model_type == 'pointnet':
+            return self._coords_input(result)
+        return unpack_voxels(result, self.resolution)[None]
+    
+    def _compile_backend(self):
+        """按 backend 准备推理函数：eager / TorchScript（trace + freeze）/ ONNX Runtime（CPU）"""
+        if self._runner is not None:
+            return self._runner
         self.model.eval()
-        with torch.no_grad():
-            features = self.model(voxels_tensor)
+        example = torch.zeros(self._input_shape(1), device=self.device)
+        
+        if self.backend == 'torchscript':
+            with torch.no_grad():
+                scripted = torch.jit.freeze(torch.jit.trace(self.model, example))
+            self._runner = lambda batch: scripted(batch)
+        elif self.backend == 'onnx':
+            if not ONNXRUNTIME_AVAILABLE:
+                raise RuntimeError("onnxruntime is not installed (backend='onnx')")
+            buffer = io.BytesIO()
+            torch.onnx.export(self.model, example, buffer,
+                              input_names=['voxels'], output_names=['features'],
+                              dynamic_axes={'voxels': {0: 'batch'}, 'features': {0: 'batch'}})
+            options = ort.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            session = ort.InferenceSession(buffer.getvalue(), options, providers=['CPUExecutionProvider'])
+            self._runner = lambda batch: torch.from_numpy(
+                session.run(None, {'voxels': batch.cpu().numpy()})[0])
+        else:
+            self._runner = self.model
+        return self._runner
+    
+    def encode_voxels(self, voxels, batch_size=32):
+        """批量编码体素网格
+
+        Args:
+            voxels: (n, R, R, R) 数组或体素网格列表
+
+        Returns:
+            (n, feature_dim) float32 特征（L2 归一化）
+        """
+        voxels = np.asarray(voxels, dtype=np.float32)
+        if len(voxels) == 0:
+            return np.empty((0, self.feature_dim), dtype=np.float32)
+        return self._encode(self._model_input(voxels), batch_size)
+    
+    def _encode(self, inputs, batch_size=32):
+        """(n, ...) 模型输入 -> (n, feature_dim) 特征"""
+        runner = self._compile_backend()
+        features = []
+        with torch.inference_mode():
+            for begin in range(0, len(inputs), batch_size):
+                batch = torch.from_numpy(np.ascontiguousarray(inputs[begin:begin + batch_size])).to(self.device)
+                features.append(runner(batch).float().cpu().numpy())
+        return np.concatenate(features)
+    
+    def extract_features_batch(self, inputs, batch_size=32, workers=None):
+        """批量提取特征：STEP 路径在进程池中体素化，边体素化边按批推理
+
+        进程池以 spawn 方式启动（主进程已加载 torch，fork 可能继承其线程池和锁而死锁），
+        worker 返回位压缩网格（pointnet 为表面体素坐标），在途任务不超过 2 × workers × batch_size 个
+
+        Args:
+            inputs: STEP 路径或 (R, R, R) 体素网格组成的列表（可混合）
+            workers: 体素化进程数，缺省为 CPU 核数；1 表示在当前进程中体素化
+
+        Returns:
+            dict: success、features ((n, feature_dim)，失败的行为 NaN)、failed（失败的下标）、
+                  parts_per_second、voxelize_seconds（等待体素化的时间）、inference_seconds
+        """
+        start = time.perf_counter()
+        features = np.full((len(inputs), self.feature_dim), np.nan, dtype=np.float32)
+        failed = []
+        inference_seconds = 0.0
+        pending_idx, pending = [], []
+        
+        def flush():
+            nonlocal inference_seconds
+            if not pending:
+                return
+            begin = time.perf_counter()
+            features[pending_idx] = self._encode(np.stack(pending), batch_size)
+            inference_seconds += time.perf_counter() - begin
+            pending_idx.clear()
+            pending.clear()
+        
+        executor = None
+        try:
+            cache = self._voxel_cache()
+            cache_dir = str(cache.cache_dir) if cache is not None else None
+            mode = COORDS_MODE if self.model_type == 'pointnet' else self.voxel_mode
+            jobs = [(str(item), self.resolution, mode, cache_dir)
+                    if isinstance(item, (str, os.PathLike)) else None
+                    for item in inputs]
+            step_jobs = [job for job in jobs if job is not None]
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(step_jobs) > 1:
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            voxelized = (_bounded_map(executor, voxelize_job, step_jobs, 2 * workers * batch_size) if executor
+                         else map(voxelize_job, step_jobs))
+            for i, (item, job) in enumerate(zip(inputs, jobs)):
+                if job is None:
+                    voxels = np.asarray(item, dtype=np.float32)
+                    sample = self._model_input(voxels[None])[0] if voxels.shape == (self.resolution,) * 3 else None
+                else:
+                    result = next(voxelized)
+                    sample = None if result is None else self._job_input(result)
+                if sample is None:
+                    failed.append(i)
+                    continue
+                pending_idx.append(i)
+                pending.append(sample)
+                if len(pending) >= batch_size:
+                    flush()
+            flush()
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
         
-        return features.cpu().numpy()[0]
+        elapsed = time.perf_counter() - start
+        return {
+            'success': True,
+            'features': features,
+            'failed': failed,
+            'parts_per_second': len(inputs) / elapsed if elapsed > 0 else 0.0,
+            'voxelize_seconds': elapsed - inference_seconds,
+            'inference_seconds': inference_seconds
+        }
     
     def save_model(self, filepath):
         """保存模型"""
@@ -148,6 +405,7 @@ class GeometryFeatureExtractor:
         """加载模型"""
         self.model.load_state_dict(torch.load(filepath, map_location=self.device))
         self.model.eval()
+        self._runner = None
         print(f"模型已加载: {filepath}")
 
 
@@ -7,91 +7,692 @@
 import faiss
 import numpy as np
 import json
+import os
+import threading
+import time
 from pathlib import Path
 
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / 'config' / 'model_config.yaml'
+
+# vector_database 配置的缺省值（config/model_config.yaml 中的同名项覆盖）
+VECTOR_DB_DEFAULTS = {
+    'feature_dim': 128,
+    # flat_l2（精确）/ ivf_flat / ivf_pq / hnsw / auto（超过阈值后切换到 approximate_index_type）
+    'index_type': 'flat_l2',
+    # l2 / inner_product / cosine（入库和查询向量先做 L2 归一化，再按内积检索）
+    'metric': 'l2',
+    'approximate_index_type': 'hnsw',
+    'auto_switch_threshold': 100000,
+    'train_sample_size': 100000,
+    'ivf': {'nlist': None, 'nprobe': 16},
+    'pq': {'m': 16, 'nbits': 8},
+    'hnsw': {'m': 32, 'ef_construction': 200, 'ef_search': 64},
+}
+
+INDEX_TYPES = ('flat_l2', 'ivf_flat', 'ivf_pq', 'hnsw', 'auto')
+METRICS = ('l2', 'inner_product', 'cosine')
+
+# 向量少于该数量时近似索引没有意义（IVF/PQ 也无法训练），始终使用精确索引
+MIN_APPROX_VECTORS = 1000
+
+# FAISS 建议每个聚类中心至少 39 个训练样本
+_TRAIN_POINTS_PER_CENTROID = 39
+
+# IVF 训练后向量数增长超过该倍数（或目标 nlist 超过当前的 2 倍）时重新训练
+_RETRAIN_GROWTH = 4
+
+
+def load_vector_config(config_path=None):
+    """读取 vector_database 配置，缺失项使用 VECTOR_DB_DEFAULTS"""
+    config = json.loads(json.dumps(VECTOR_DB_DEFAULTS))
+    path = Path(config_path) if config_path else DEFAULT_CONFIG_PATH
+    if not YAML_AVAILABLE or not path.exists():
+        return config
+    with open(path, 'r', encoding='utf-8') as f:
+        section = (yaml.safe_load(f) or {}).get('vector_database') or {}
+    for key, value in section.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    return config
+
+
+def faiss_metric(metric):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric} (expected one of {METRICS})")
+    return faiss.METRIC_L2 if metric == 'l2' else faiss.METRIC_INNER_PRODUCT
+
+
+def prepare_vectors(vectors, metric='l2'):
+    """加入索引或查询前的预处理：float32 连续数组，余弦度量下 L2 归一化（不修改输入）"""
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    if metric == 'cosine':
+        vectors = vectors.copy()
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def similarity_from_distance(distances, metric='l2'):
+    """L2 距离换算为 1 / (1 + d)；内积/余弦度量下 FAISS 返回的就是相似度"""
+    if metric == 'l2':
+        return 1.0 / (1.0 + distances)
+    return distances
+
+
+def index_kind(index):
+    """FAISS 索引对象 -> INDEX_TYPES 中的名称"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return 'hnsw'
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivf_pq'
+    if isinstance(index, faiss.IndexIVFFlat):
+        return 'ivf_flat'
+    return 'flat_l2'
+
+
+def ivf_nlist(num_vectors, config):
+    """IVF 聚类中心数：配置值或 4·sqrt(N)，且保证每个中心有足够的训练样本"""
+    nlist = config['ivf'].get('nlist') or int(4 * np.sqrt(max(num_vectors, 1)))
+    return max(1, min(nlist, num_vectors // _TRAIN_POINTS_PER_CENTROID))
+
+
+def create_index(kind, feature_dim, num_vectors, config):
+    """按类型和 config['metric'] 创建（未训练的）FAISS 索引，参数根据数据量自动收紧
+
+    'flat_l2' 表示精确检索，内积/余弦度量下对应 IndexFlatIP
+    """
+    metric = faiss_metric(config.get('metric', 'l2'))
+    if kind == 'flat_l2':
+        return faiss.IndexFlatL2(feature_dim) if metric == faiss.METRIC_L2 else faiss.IndexFlatIP(feature_dim)
+    if kind == 'hnsw':
+        index = faiss.IndexHNSWFlat(feature_dim, config['hnsw']['m'], metric)
+        index.hnsw.efConstruction = config['hnsw']['ef_construction']
+        return index
+
+    nlist = ivf_nlist(num_vectors, config)
+    quantizer = faiss.IndexFlatL2(feature_dim) if metric == faiss.METRIC_L2 else faiss.IndexFlatIP(feature_dim)
+    if kind == 'ivf_flat':
+        return faiss.IndexIVFFlat(quantizer, feature_dim, nlist, metric)
+    if kind == 'ivf_pq':
+        m = config['pq']['m']
+        while feature_dim % m:
+            m -= 1
+        nbits = config['pq']['nbits']
+        while nbits > 4 and num_vectors < (1 << nbits) * _TRAIN_POINTS_PER_CENTROID:
+            nbits -= 1
+        return faiss.IndexIVFPQ(quantizer, feature_dim, nlist, m, nbits, metric)
+    raise ValueError(f"Unknown index type: {kind} (expected one of {INDEX_TYPES})")
+
+
+def apply_search_params(index, nprobe=None, ef_search=None):
+    """设置查询时的精度/速度参数（IVF 的 nprobe、HNSW 的 efSearch）"""
+    index = faiss.downcast_index(index)
+    if nprobe is not None and hasattr(index, 'nprobe'):
+        index.nprobe = int(nprobe)
+    if ef_search is not None and isinstance(index, faiss.IndexHNSWFlat):
+        index.hnsw.efSearch = int(ef_search)
+
+
+class SearchResults:
+    """批量搜索结果
+
+    distances / ids 为 (n, k) 数组，不足 k 个结果处 id 为 -1；
+    元数据和结果字典只在按查询取用时才生成
+    """
+    
+    def __init__(self, distances, ids, metadata, metric='l2'):
+        self.distances = distances
+        self.ids = ids
+        self.metric = metric
+        self._metadata = metadata
+    
+    @property
+    def similarities(self):
+        return similarity_from_distance(self.distances, self.metric)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def metadata(self, query):
+        """第 query 个查询命中的元数据列表"""
+        return [self._metadata[idx] for idx in self.ids[query] if 0 <= idx < len(self._metadata)]
+    
+    def __getitem__(self, query):
+        """第 query 个查询的结果（与 search_similar 的格式相同）"""
+        similarities = self.similarities[query]
+        return [{
+            'metadata': self._metadata[idx],
+            'distance': float(self.distances[query, j]),
+            'similarity': float(similarities[j])
+        } for j, idx in enumerate(self.ids[query]) if 0 <= idx < len(self._metadata)]
+    
+    def __iter__(self):
+        for query in range(len(self)):
+            yield self[query]
+
+
 class GeometryVectorDatabase:
-    """几何特征向量数据库"""
+    """几何特征向量数据库
+
+    文件布局（db_path 去掉后缀）::
+
+        geometry_vectors.vec     追加写入的 float32 向量，每行 feature_dim 个
+        geometry_vectors.jsonl   追加写入的元数据日志，每行一条，与向量按行号对应
+        geometry_vectors.index   FAISS 索引检查点，覆盖 .vec 的前 index.ntotal 行
+        geometry_vectors.index.json  检查点说明：度量、索引类型、nlist、训练时的向量数
+
+    添加向量只追加两个日志文件，索引按 checkpoint_interval 或显式 checkpoint() 落盘；
+    加载时读取检查点并重放其后的向量，总开销与数据量成线性。
+
+    索引类型取自 index_type 参数或 config/model_config.yaml 的 vector_database.index_type：
+    近似索引（IVF-Flat / IVF-PQ / HNSW）在向量足够多时从 .vec 抽样训练并重建，
+    'auto' 在向量数超过 auto_switch_threshold 后从精确索引切换到 approximate_index_type。
+    IVF 索引在向量数超过训练时的 4 倍、或按当前数据量算出的 nlist 超过现有 nlist 的
+    2 倍时重新训练，避免早期在少量向量上训练的聚类中心一直沿用。
+    metric 为 'cosine' 时向量以原值写入日志，加入索引和查询前做 L2 归一化
+    （Simple3DCNN 的输出已归一化，此时余弦与内积等价）。
+    inner_product 与 cosine 在 FAISS 中是同一种 metric_type，检查点按说明文件中记录的
+    度量名判断是否可用，不一致时从 .vec 重建
+    """
     
-    def __init__(self, feature_dim=128, db_path="E:/DeepSeek_Work/ml/data/geometry_vectors.db"):
+    def __init__(self, feature_dim=128, db_path="E:/DeepSeek_Work/ml/data/geometry_vectors.db",
+                 checkpoint_interval=10000, index_type=None, metric=None, config=None, config_path=None):
         self.feature_dim = feature_dim
         self.db_path = Path(db_path)
+        self.checkpoint_interval = checkpoint_interval
+        self.config = config or load_vector_config(config_path)
+        self.index_type = index_type or self.config['index_type']
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {self.index_type} (expected one of {INDEX_TYPES})")
+        if metric is not None:
+            self.config['metric'] = metric
+        self.metric = self.config['metric']
+        faiss_metric(self.metric)
         
-        # 创建 FAISS 索引
-        self.index = faiss.IndexFlatL2(feature_dim)
+        # 创建 FAISS 索引（近似索引在数据量足够后再训练、切换）
+        self.index = create_index('flat_l2', feature_dim, 0, self.config)
+        # 当前索引中向量所用的度量（加载的检查点可能与配置不同）
+        self._index_metric = self.metric
         
         # 元数据
         self.metadata = []
         
+        # 上次检查点之后新增的向量数
+        self._pending = 0
+        # 当前索引训练时的向量数（无需训练的索引为 None）
+        self._trained_vectors = None
+        self._lock = threading.Lock()
+        
         # 加载已有数据
         self._load_database()
     
+    @property
+    def vector_file(self):
+        return self.db_path.with_suffix('.vec')
+    
+    @property
+    def metadata_file(self):
+        return self.db_path.with_suffix('.jsonl')
+    
+    @property
+    def index_file(self):
+        return self.db_path.with_suffix('.index')
+    
+    @property
+    def index_meta_file(self):
+        return self.db_path.with_suffix('.index.json')
+    
     def add_geometry(self, feature_vector, metadata):
         """添加几何特征到数据库"""
         # 确保特征是正确的形状
         if feature_vector.shape[0] != self.feature_dim:
             raise ValueError(f"Feature dimension mismatch: expected {self.feature_dim}, got {feature_vector.shape[0]}")
         
-        # 添加到 FAISS 索引
-        feature_vector = feature_vector.reshape(1, -1).astype('float32')
-        self.index.add(feature_vector)
+        self.add_geometries(feature_vector.reshape(1, -1), [metadata])
+    
+    def add_geometries(self, feature_vectors, metadata_list):
+        """批量添加几何特征
+
+        Args:
+            feature_vectors: (n, feature_dim) 数组
+            metadata_list: 长度为 n 的元数据列表（需可 JSON 序列化）
+        """
+        feature_vectors = np.ascontiguousarray(feature_vectors, dtype='float32')
+        if feature_vectors.ndim != 2 or feature_vectors.shape[1] != self.feature_dim:
+            raise ValueError(f"Feature dimension mismatch: expected (n, {self.feature_dim}), "
+                             f"got {feature_vectors.shape}")
+        if len(metadata_list) != len(feature_vectors):
+            raise ValueError(f"Got {len(feature_vectors)} vectors but {len(metadata_list)} metadata entries")
+        if len(feature_vectors) == 0:
+            return
         
-        # 保存元数据
-        self.metadata.append(metadata)
+        lines = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in metadata_list)
         
-        # 保存数据库
-        self._save_database()
+        with self._lock:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # 先写向量再写元数据：加载时按两者较短的一方对齐，中途失败不会错位
+            with open(self.vector_file, 'ab') as f:
+                f.write(feature_vectors.tobytes())
+            with open(self.metadata_file, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            
+            self.index.add(self._prepare(feature_vectors))
+            self.metadata.extend(metadata_list)
+            self._pending += len(feature_vectors)
+            
+            if not self._switch_index_if_needed() and \
+                    self.checkpoint_interval and self._pending >= self.checkpoint_interval:
+                self._checkpoint()
+    
+    def _prepare(self, vectors):
+        return prepare_vectors(vectors, self.metric)
     
     def search_similar(self, query_vector, k=5):
         """搜索相似几何"""
         if self.index.ntotal == 0:
             return []
+        return self.search_batch(np.asarray(query_vector).reshape(1, -1), k)[0]
+    
+    def search_batch(self, query_vectors, k=5):
+        """批量搜索：(n, feature_dim) 查询矩阵只调用一次 FAISS
+
+        Returns:
+            SearchResults: distances / ids 为 (n, k) NumPy 数组，元数据按需取
+        """
+        query_vectors = np.asarray(query_vectors)
+        if query_vectors.ndim != 2 or query_vectors.shape[1] != self.feature_dim:
+            raise ValueError(f"Query shape mismatch: expected (n, {self.feature_dim}), got {query_vectors.shape}")
+        k = min(k, self.index.ntotal)
+        if k == 0:
+            empty = np.empty((len(query_vectors), 0))
+            return SearchResults(empty.astype('float32'), empty.astype('int64'), self.metadata, self.metric)
+        distances, ids = self.index.search(self._prepare(query_vectors), k)
+        return SearchResults(distances, ids, self.metadata, self.metric)
+    
+    def _target_kind(self, num_vectors):
+        """当前数据量下应使用的索引类型"""
+        if self.index_type == 'flat_l2':
+            return 'flat_l2'
+        if self.index_type == 'auto':
+            threshold = max(self.config['auto_switch_threshold'], MIN_APPROX_VECTORS)
+            return self.config['approximate_index_type'] if num_vectors >= threshold else 'flat_l2'
+        return self.index_type if num_vectors >= MIN_APPROX_VECTORS else 'flat_l2'
+    
+    def _needs_retrain(self):
+        """IVF 索引是否已落后于数据量（训练向量数未知时视为需要）"""
+        index = faiss.downcast_index(self.index)
+        if not hasattr(index, 'nlist'):
+            return False
+        if self._trained_vectors is None:
+            return True
+        ntotal = self.index.ntotal
+        return (ntotal > _RETRAIN_GROWTH * self._trained_vectors or
+                ivf_nlist(ntotal, self.config) > 2 * index.nlist)
+    
+    def _switch_index_if_needed(self):
+        """索引类型或度量与目标不符、或 IVF 需要重新训练时重建，返回是否重建"""
+        kind = self._target_kind(self.index.ntotal)
+        if index_kind(self.index) == kind and self._index_metric == self.metric and not self._needs_retrain():
+            return False
+        self._rebuild_index(kind)
+        return True
+    
+    def _stored_vectors(self):
+        count = len(self.metadata)
+        if count == 0:
+            return np.empty((0, self.feature_dim), dtype='float32')
+        return np.memmap(self.vector_file, dtype='float32', mode='r', shape=(count, self.feature_dim))
+    
+    def _rebuild_index(self, kind):
+        """从 .vec 重建索引：近似索引先在随机样本上训练"""
+        vectors = self._stored_vectors()
+        count = len(vectors)
+        index = create_index(kind, self.feature_dim, count, self.config)
+        self._trained_vectors = None
+        if not index.is_trained:
+            rng = np.random.default_rng(0)
+            sample_size = min(count, self.config['train_sample_size'])
+            sample = np.sort(rng.choice(count, sample_size, replace=False))
+            index.train(self._prepare(vectors[sample]))
+            self._trained_vectors = count
+        for begin in range(0, count, 65536):
+            index.add(self._prepare(vectors[begin:begin + 65536]))
+        apply_search_params(index, self.config['ivf']['nprobe'], self.config['hnsw']['ef_search'])
+        self.index = index
+        self._index_metric = self.metric
+        self._pending = count
+        self._checkpoint()
+    
+    def rebuild_index(self, index_type=None):
+        """按指定类型（或当前配置）重新训练并重建索引，例如数据分布变化后"""
+        with self._lock:
+            if index_type is not None:
+                if index_type not in INDEX_TYPES:
+                    raise ValueError(f"Unknown index type: {index_type} (expected one of {INDEX_TYPES})")
+                self.index_type = index_type
+            self._rebuild_index(self._target_kind(len(self.metadata)))
+    
+    def set_search_params(self, nprobe=None, ef_search=None):
+        """调整查询精度/速度：IVF 的 nprobe，HNSW 的 efSearch"""
+        if nprobe is not None:
+            self.config['ivf']['nprobe'] = nprobe
+        if ef_search is not None:
+            self.config['hnsw']['ef_search'] = ef_search
+        apply_search_params(self.index, nprobe, ef_search)
+    
+    def evaluate_recall(self, k=10, num_queries=1000, queries=None, seed=0):
+        """以同一度量下的精确搜索为基准测量当前索引的 recall@k 和单次查询延迟
+
+        Args:
+            queries: (n, feature_dim) 查询向量；缺省时从库中随机抽取 num_queries 个
+        """
+        vectors = self._stored_vectors()
+        if len(vectors) == 0:
+            return {'index_type': index_kind(self.index), 'k': k, 'queries': 0, 'recall_at_k': None}
+        if queries is None:
+            rng = np.random.default_rng(seed)
+            picks = np.sort(rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False))
+            queries = vectors[picks]
+        queries = self._prepare(queries)
+        k = min(k, len(vectors))
         
-        query_vector = query_vector.reshape(1, -1).astype('float32')
-        
-        # 搜索
-        distances, indices = self.index.search(query_vector, min(k, self.index.ntotal))
+        flat = create_index('flat_l2', self.feature_dim, len(vectors), self.config)
+        for begin in range(0, len(vectors), 65536):
+            flat.add(self._prepare(vectors[begin:begin + 65536]))
+        start = time.perf_counter()
+        _, truth = flat.search(queries, k)
+        flat_seconds = time.perf_counter() - start
         
-        # 整理结果
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.metadata):
-                results.append({
-                    'metadata': self.metadata[idx],
-                    'distance': float(distances[0][i]),
-                    'similarity': 1.0 / (1.0 + float(distances[0][i]))
-                })
+        start = time.perf_counter()
+        _, found = self.index.search(queries, k)
+        seconds = time.perf_counter() - start
         
-        return results
+        hits = (found[:, :, None] == truth[:, None, :]).any(axis=2).sum(axis=1)
+        return {
+            'index_type': index_kind(self.index),
+            'k': k,
+            'queries': len(queries),
+            'recall_at_k': float(hits.mean() / k),
+            'latency_ms': seconds * 1000 / len(queries),
+            'flat_latency_ms': flat_seconds * 1000 / len(queries)
+        }
+    
+    def checkpoint(self):
+        """把索引写入检查点（先写临时文件再替换）"""
+        with self._lock:
+            self._checkpoint()
     
-    def _save_database(self):
-        """保存数据库"""
+    def _checkpoint(self):
+        if self._pending == 0 and self.index_file.exists():
+            return
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 保存 FAISS 索引
-        faiss.write_index(self.index, str(self.db_path.with_suffix('.index')))
-        
-        # 保存元数据
-        with open(self.db_path.with_suffix('.json'), 'w', encoding='utf-8') as f:
-            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+        tmp = self.index_file.with_name(self.index_file.name + '.tmp')
+        faiss.write_index(self.index, str(tmp))
+        os.replace(tmp, self.index_file)
+        # 说明文件后写：中途失败时训练向量数未知，下次加载会重新训练
+        index = faiss.downcast_index(self.index)
+        meta_tmp = self.index_meta_file.with_name(self.index_meta_file.name + '.tmp')
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'metric': self._index_metric,
+                'index_type': index_kind(self.index),
+                'nlist': int(index.nlist) if hasattr(index, 'nlist') else None,
+                'trained_vectors': self._trained_vectors,
+                'ntotal': int(self.index.ntotal)
+            }, f)
+        os.replace(meta_tmp, self.index_meta_file)
+        self._pending = 0
+    
+    def close(self):
+        """写入最后的检查点"""
+        self.checkpoint()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _migrate_legacy(self):
+        """旧版整文件保存的 .index + .json 转换为追加日志格式"""
+        legacy_metadata = self.db_path.with_suffix('.json')
+        if self.metadata_file.exists() or not legacy_metadata.exists():
+            return
+        with open(legacy_metadata, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        vectors = np.empty((0, self.feature_dim), dtype='float32')
+        if self.index_file.exists():
+            index = faiss.read_index(str(self.index_file))
+            vectors = index.reconstruct_n(0, index.ntotal)
+        with open(self.vector_file, 'wb') as f:
+            f.write(np.ascontiguousarray(vectors, dtype='float32').tobytes())
+        with open(self.metadata_file, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(m, ensure_ascii=False) + '\n' for m in metadata)
+    
+    def _read_index_meta(self):
+        """检查点说明；缺失或损坏时返回空字典"""
+        try:
+            with open(self.index_meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
     
     def _load_database(self):
-        """加载数据库"""
-        index_file = self.db_path.with_suffix('.index')
-        metadata_file = self.db_path.with_suffix('.json')
+        """加载数据库：读取索引检查点，重放其后追加的向量"""
+        self._migrate_legacy()
+        if not self.metadata_file.exists() or not self.vector_file.exists():
+            return
+        
+        # 元数据日志，记录每行的结束位置以便截断
+        offsets = []
+        with open(self.metadata_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # 最后一行没写完
+                self.metadata.append(json.loads(line))
+                offsets.append(f.tell())
         
-        if index_file.exists():
-            self.index = faiss.read_index(str(index_file))
+        row_bytes = self.feature_dim * 4
+        num_vectors = os.path.getsize(self.vector_file) // row_bytes
+        count = min(num_vectors, len(self.metadata))
         
-        if metadata_file.exists():
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                self.metadata = json.load(f)
+        # 两个日志对齐到相同行数（丢弃中断写入留下的尾部）
+        with open(self.metadata_file, 'r+b') as f:
+            f.truncate(offsets[count - 1] if count else 0)
+        with open(self.vector_file, 'r+b') as f:
+            f.truncate(count * row_bytes)
+        del self.metadata[count:]
+        
+        if self.index_file.exists():
+            index = faiss.read_index(str(self.index_file))
+            meta = self._read_index_meta()
+            # 旧版检查点没有说明文件，只可能是 L2；度量不同的检查点不重放，直接从 .vec 重建
+            if index.d == self.feature_dim and index.ntotal <= count and meta.get('metric', 'l2') == self.metric:
+                apply_search_params(index, self.config['ivf']['nprobe'], self.config['hnsw']['ef_search'])
+                self.index = index
+                self._trained_vectors = meta.get('trained_vectors')
+        
+        # 重放检查点之后的向量
+        start = self.index.ntotal
+        if start < count:
+            vectors = np.memmap(self.vector_file, dtype='float32', mode='r', shape=(count, self.feature_dim))
+            for begin in range(start, count, 65536):
+                self.index.add(self._prepare(vectors[begin:begin + 65536]))
+            self._pending = count - start
+        
+        # 配置的索引类型变化或数据量跨过切换阈值；否则若检查点被弃用，立即按当前度量重写
+        if not self._switch_index_if_needed() and self.index_file.exists() and start == 0 and count:
+            self._checkpoint()
     
     def get_statistics(self):
         """获取统计信息"""
         return {
             'total_geometries': self.index.ntotal,
             'feature_dimension': self.feature_dim,
-            'metadata_count': len(self.metadata)
+            'metadata_count': len(self.metadata),
+            'pending_vectors': self._pending,
+            'index_type': index_kind(self.index),
+            'configured_index_type': self.index_type,
+            'trained_vectors': self._trained_vectors,
+            'metric': self.metric
+        }
+
+
+class GeometryFeatureStore:
+    """基于仿真数据库的几何特征库
+
+    特征向量以 float32 存在 geometry_features 表（每个 sim_id 一条），
+    FAISS 索引（IndexIDMap，向量 id 为 simulations.id）只是可重建的缓存：
+    记录已同步的最大 geometry_features.id（高水位），sync() 只读取之后写入的向量，
+    同一仿真覆盖写入的向量先从索引中删除旧版本再加入。
+    搜索结果在一次 SQL 查询中关联仿真记录和 results 表
+    """
+    
+    def __init__(self, collector=None, feature_dim=128, index_path=None, auto_sync=True, metric='l2'):
+        if collector is None:
+            from server.data_collector import SimulationDataCollector
+            collector = SimulationDataCollector()
+        self.collector = collector
+        self.feature_dim = feature_dim
+        faiss_metric(metric)
+        self.metric = metric
+        self.index_path = Path(index_path) if index_path else None
+        self.index = self._new_index()
+        self.high_water = 0
+        self._lock = threading.Lock()
+        
+        self._load_index()
+        if auto_sync:
+            self.sync()
+    
+    def _new_index(self):
+        return faiss.IndexIDMap(create_index('flat_l2', self.feature_dim, 0, {'metric': self.metric}))
+    
+    def _meta_path(self):
+        return self.index_path.with_suffix('.json')
+    
+    def _load_index(self):
+        """加载索引缓存；与当前数据库或维度不符、文件损坏时从数据库重建"""
+        if self.index_path is None or not self.index_path.exists():
+            return
+        try:
+            with open(self._meta_path(), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('feature_dim') != self.feature_dim or
+                    meta.get('metric', 'l2') != self.metric or
+                    meta.get('db_path') != os.path.abspath(self.collector.db_path)):
+                return
+            index = faiss.read_index(str(self.index_path))
+        except (OSError, ValueError, RuntimeError):
+            return
+        self.index = index
+        self.high_water = int(meta.get('high_water', 0))
+    
+    def save(self):
+        """保存索引和高水位（先写临时文件再替换）"""
+        if self.index_path is None:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            tmp = self.index_path.with_name(self.index_path.name + '.tmp')
+            faiss.write_index(self.index, str(tmp))
+            os.replace(tmp, self.index_path)
+            # 索引先于高水位落盘：中途失败时下次只会重复同步（旧版本会先被删除）
+            meta_tmp = self._meta_path().with_name(self._meta_path().name + '.tmp')
+            with open(meta_tmp, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'db_path': os.path.abspath(self.collector.db_path),
+                    'feature_dim': self.feature_dim,
+                    'metric': self.metric,
+                    'high_water': self.high_water,
+                    'ntotal': int(self.index.ntotal)
+                }, f)
+            os.replace(meta_tmp, self._meta_path())
+    
+    def sync(self, batch_size=10000):
+        """把数据库中新增或更新的向量同步到索引，返回同步的向量数"""
+        synced = 0
+        with self._lock:
+            while True:
+                last_id, ids, vectors = self.collector.get_feature_updates(
+                    self.high_water, batch_size, self.feature_dim)
+                if last_id == self.high_water:
+                    break
+                if len(ids):
+                    self.index.remove_ids(ids)
+                    self.index.add_with_ids(prepare_vectors(vectors, self.metric), ids)
+                    synced += len(ids)
+                self.high_water = last_id
+        if synced:
+            self.save()
+        return synced
+    
+    def rebuild(self):
+        """丢弃索引并从数据库全量重建（仿真被删除后可用于清理）"""
+        with self._lock:
+            self.index = self._new_index()
+            self.high_water = 0
+        return self.sync()
+    
+    def add_geometry(self, sim_id, feature_vector):
+        """写入特征并同步索引"""
+        feature_vector = np.asarray(feature_vector, dtype='float32').ravel()
+        if feature_vector.shape[0] != self.feature_dim:
+            raise ValueError(f"Feature dimension mismatch: expected {self.feature_dim}, got {feature_vector.shape[0]}")
+        self.collector.record_geometry_features(sim_id, feature_vector)
+        return self.sync()
+    
+    def search_similar(self, query_vector, k=5, sync=True):
+        """搜索相似几何，结果附带仿真记录和最新结果（max_stress 等）"""
+        return self.search_batch(np.asarray(query_vector).reshape(1, -1), k, sync)[0]
+    
+    def search_batch(self, query_vectors, k=5, sync=True):
+        """批量搜索：一次 FAISS 查询 + 一次 SQL 关联全部命中的仿真
+
+        Returns:
+            每个查询一个结果列表（格式同 search_similar）
+        """
+        if sync:
+            self.sync()
+        query_vectors = np.asarray(query_vectors)
+        if query_vectors.ndim != 2 or query_vectors.shape[1] != self.feature_dim:
+            raise ValueError(f"Query shape mismatch: expected (n, {self.feature_dim}), got {query_vectors.shape}")
+        if self.index.ntotal == 0:
+            return [[] for _ in range(len(query_vectors))]
+        
+        distances, ids = self.index.search(prepare_vectors(query_vectors, self.metric),
+                                           min(k, self.index.ntotal))
+        similarities = similarity_from_distance(distances, self.metric)
+        records = self.collector.get_simulations_by_rowid(np.unique(ids[ids >= 0]))
+        
+        results = []
+        for row_ids, row_distances, row_similarities in zip(ids, distances, similarities):
+            hits = []
+            for row_id, distance, similarity in zip(row_ids, row_distances, row_similarities):
+                record = records.get(int(row_id))
+                if record is None:
+                    # 无结果（-1），或仿真已删除但索引尚未重建
+                    continue
+                hits.append(dict(record, distance=float(distance), similarity=float(similarity)))
+            results.append(hits)
+        return results
+    
+    def get_statistics(self):
+        """获取统计信息"""
+        return {
+            'total_geometries': int(self.index.ntotal),
+            'feature_dimension': self.feature_dim,
+            'metric': self.metric,
+            'high_water': self.high_water,
+            'index_path': str(self.index_path) if self.index_path else None
         }
 
 
@@ -0,0 +1,176 @@
+# ml/models/voxel_cache.py
+"""
+体素缓存
+按 STEP 文件内容哈希 + 分辨率 + 体素模式寻址，命中时直接读取体素网格，
+不再三角化和体素化。GeometryFeatureExtractor（单个/批量提取，含进程池 worker）、
+generate_voxel_data 和相似度查询共用同一份实现（缓存目录由 VOXEL_CACHE_DIR 指定）。
+
+体素以 np.packbits 位压缩后存为 .npy（每个体素 1 bit，比 float32 小 32 倍）；
+COORDS_MODE 条目只存 (N, 3) int16 表面体素坐标，大小与表面积成正比（PointNet 使用）。
+索引和淘汰与网格缓存（server/mesh_cache.py）共用 services/content_cache.py
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from ml.models.voxelizer import VOXEL_MODES, surface_coords_step, voxelize_step
+from services.content_cache import CACHE_ERRORS, ContentCache
+
+# 体素化算法变化时递增，使旧缓存自然失效
+VOXELIZER_VERSION = 1
+
+# 稀疏表面体素坐标（surface_coords_step），与 VOXEL_MODES 的稠密网格分开寻址
+COORDS_MODE = 'coords'
+CACHE_MODES = VOXEL_MODES + (COORDS_MODE,)
+
+def voxelize(step_file, resolution, mode):
+    """按模式体素化：VOXEL_MODES 返回 (R, R, R) 网格，COORDS_MODE 返回 (N, 3) 坐标"""
+    if mode == COORDS_MODE:
+        return surface_coords_step(step_file, resolution)
+    return voxelize_step(step_file, resolution, mode)
+
+
+def pack_voxels(voxels):
+    """(R, R, R) 体素网格 -> 位压缩 uint8 数组（非零即占据）"""
+    return np.packbits(np.asarray(voxels).ravel() != 0)
+
+
+def unpack_voxels(packed, resolution, dtype=np.float32):
+    """pack_voxels 的逆操作"""
+    count = resolution ** 3
+    return np.unpackbits(packed, count=count).reshape(resolution, resolution, resolution).astype(dtype)
+
+
+class VoxelCache(ContentCache):
+    """内容寻址的体素缓存，按最近最少使用（LRU）和总大小淘汰（索引与淘汰见 ContentCache）"""
+
+    SUFFIX = '.npy'
+    EXTRA_COLUMNS = '''
+                geometry_hash TEXT,
+                resolution INTEGER NOT NULL,
+                mode TEXT,
+                occupied INTEGER,'''
+
+    def __init__(self, cache_dir=None, max_bytes=None, max_entries=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get('VOXEL_CACHE_DIR', '/data/voxel_cache')
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('VOXEL_CACHE_MAX_MB', 2048)) * 1024 * 1024
+        if max_entries is None:
+            max_entries = int(os.environ.get('VOXEL_CACHE_MAX_ENTRIES', 100000))
+        super().__init__(cache_dir, max_bytes, max_entries)
+
+    def key_for(self, step_file: str, resolution: int, mode: str = 'solid') -> str:
+        """计算缓存键：几何内容哈希 + 分辨率 + 体素模式 + 算法版本"""
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown voxel mode: {mode} (expected one of {CACHE_MODES})")
+        content = f"{self._geometry_hash(step_file)}:{int(resolution)}:{mode}:v{VOXELIZER_VERSION}"
+        return hashlib.md5(content.encode()).hexdigest()
+
+    def get(self, key: str, packed: bool = False):
+        """查询缓存；命中时返回 (R, R, R) float32 体素网格（packed=True 时返回位压缩数组），
+        COORDS_MODE 条目返回 (N, 3) int32 坐标
+        """
+        hit = self._lookup(key, 'resolution, mode')
+        if hit is None:
+            return None
+        row, entry = hit
+
+        try:
+            data = np.load(entry, allow_pickle=False)
+        except (OSError, ValueError):
+            # 文件在读取时被淘汰或写坏，按未命中处理
+            return None
+        if row[1] == COORDS_MODE:
+            return data.astype(np.int32)
+        return data if packed else unpack_voxels(data, row[0])
+
+    def put(self, key: str, voxels, resolution: int = None, mode: str = None, geometry_hash: str = None):
+        """写入缓存（原子替换），然后按容量淘汰
+
+        mode 为 COORDS_MODE 时 voxels 是 (N, 3) 坐标，必须给出 resolution
+        """
+        voxels = np.asarray(voxels)
+        if mode == COORDS_MODE:
+            data = voxels.astype(np.int16).reshape(-1, 3)
+            occupied = len(data)
+        else:
+            resolution = resolution or voxels.shape[0]
+            data = pack_voxels(voxels)
+            occupied = int(np.count_nonzero(voxels))
+        tmp = self._tmp_path(key)
+        np.save(tmp, data)
+        os.replace(tmp, self._entry_path(key))
+        self._record(key, {
+            'geometry_hash': geometry_hash,
+            'resolution': int(resolution),
+            'mode': mode,
+            'occupied': occupied,
+        })
+
+    def get_or_voxelize(self, step_file: str, resolution: int = 64, mode: str = 'solid', packed: bool = False):
+        """命中时读取缓存，否则体素化并写入缓存；体素化失败时抛出异常
+
+        packed=True 时稠密网格返回位压缩数组（命中时不解压）；COORDS_MODE 始终返回坐标
+        """
+        key = self.key_for(step_file, resolution, mode)
+        voxels = self.get(key, packed)
+        if voxels is None:
+            voxels = voxelize(step_file, resolution, mode)
+            try:
+                self.put(key, voxels, resolution, mode, self._geometry_hash(step_file))
+            except CACHE_ERRORS as e:
+                # 写缓存失败（磁盘满、目录只读等）不丢弃刚算好的结果
+                print(f"体素缓存写入失败，不缓存: {step_file}: {e}")
+            if packed and mode != COORDS_MODE:
+                voxels = pack_voxels(voxels)
+        return voxels
+
+    def get_statistics(self):
+        """获取缓存统计信息"""
+        stats = super().get_statistics()
+        voxels = self._summary(', COALESCE(SUM(resolution * resolution * resolution), 0)')[3]
+        # 同样的网格以 float32 存储时的大小
+        stats['float32_mb'] = round(voxels * 4 / (1024 * 1024), 2)
+        return stats
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_voxel_cache(cache_dir=None) -> VoxelCache:
+    """进程内共享的默认缓存实例"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None or (cache_dir and Path(cache_dir) != _default_cache.cache_dir):
+            _default_cache = VoxelCache(cache_dir)
+        return _default_cache
+
+
+def voxelize_job(job):
+    """进程池任务：(step_file, resolution, mode, cache_dir) -> 位压缩体素网格（pack_voxels），
+    COORDS_MODE 时为 (N, 3) 表面体素坐标；失败返回 None
+
+    结果以 1 bit/体素（或稀疏坐标）传回主进程，减少序列化和在途结果占用的内存（unpack_voxels 解压）。
+    cache_dir 为 None 时不使用缓存。本模块不依赖 torch，spawn 方式启动的 worker 导入开销小
+    """
+    step_file, resolution, mode, cache_dir = job
+    cache = None
+    if cache_dir is not None:
+        try:
+            cache = get_voxel_cache(cache_dir)
+        except CACHE_ERRORS as e:
+            print(f"体素缓存不可用，不使用缓存: {e}")
+    try:
+        if cache is None:
+            voxels = voxelize(step_file, resolution, mode)
+            return voxels if mode == COORDS_MODE else pack_voxels(voxels)
+        return cache.get_or_voxelize(step_file, resolution, mode, packed=True)
+    except Exception as e:
+        print(f"体素化失败: {step_file}: {e}")
+        return None
@@ -7,6 +7,8 @@ import numpy as np
 import pickle
 from pathlib import Path
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.linear_model import SGDRegressor
+from sklearn.multioutput import MultiOutputRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_absolute_error
@@ -19,6 +21,7 @@ class SurrogateModel:
         self.model_type = model_type
         self.model = None
         self.scaler = StandardScaler()
+        self.target_scaler = None  # 仅流式训练使用：SGD 需要标准化的目标值
         self.is_trained = False
         self.feature_names = []
         self.target_names = []
@@ -62,13 +65,33 @@ class SurrogateModel:
         
         return np.array(X), np.array(y)
     
+    def prepare_columns(self, data):
+        """从列式训练数据准备训练集
+
+        data 可以是 read_training_table 返回的 pyarrow.Table、其 to_pandas() 结果
+        或 SimulationDataCollector.get_training_columns 的列字典；
+        特征和目标与 prepare_data 相同，但整列向量化处理，不逐行解析参数字符串
+        """
+        from server.data_collector import TARGET_COLUMNS
+        from server.training_export import feature_columns, training_matrix
+
+        self.feature_names = feature_columns(data)
+        self.target_names = list(TARGET_COLUMNS)
+        X = np.nan_to_num(training_matrix(data, self.feature_names), nan=0.0)
+        y = np.nan_to_num(training_matrix(data, self.target_names), nan=0.0)
+
+        # 只使用有结果的数据
+        keep = y.any(axis=1)
+        return X[keep], y[keep]
+    
     def train(self, X, y, test_size=0.2, save_path=None):
         """训练代理模型"""
         print(f"训练代理模型...")
         print(f"  数据集大小: {len(X)} 样本")
         print(f"  特征维度: {X.shape[1]}")
         
-        # 数据标准化
+        # 数据标准化（批量训练的模型直接预测原始目标值）
+        self.target_scaler = None
         X_scaled = self.scaler.fit_transform(X)
         
         # 划分训练集和测试集
@@ -123,6 +146,76 @@ class SurrogateModel:
             'test_mae': test_mae
         }
     
+    def train_streaming(self, batches, epochs=5, schema=None, save_path=None):
+        """流式（out-of-core）训练，数据集可以大于内存
+
+        Args:
+            batches: 无参可调用对象，每次调用返回新的 (X, y) 批迭代器，例如
+                     lambda: collector.iter_training_batches(4096, schema=schema)
+            epochs: 训练轮数（每轮重新遍历一次 batches()）
+            schema: get_training_schema 的结果，用于记录特征/目标列名
+        """
+        if schema is not None:
+            self.feature_names = list(schema['features'])
+            self.target_names = list(schema['targets'])
+
+        # 第一遍：增量统计特征和目标的均值/方差
+        self.scaler = StandardScaler()
+        self.target_scaler = StandardScaler()
+        samples = 0
+        for X, y in batches():
+            self.scaler.partial_fit(X)
+            self.target_scaler.partial_fit(y)
+            samples += len(X)
+        if samples == 0:
+            raise ValueError("没有可用的训练数据")
+
+        print("流式训练代理模型...")
+        print(f"  数据集大小: {samples} 样本")
+        print(f"  特征维度: {self.scaler.n_features_in_}")
+
+        self.model_type = 'sgd'
+        self.model = MultiOutputRegressor(SGDRegressor(
+            penalty='l2',
+            alpha=1e-4,
+            learning_rate='invscaling',
+            eta0=0.01,
+            random_state=42
+        ))
+        for epoch in range(epochs):
+            for X, y in batches():
+                self.model.partial_fit(self.scaler.transform(X), self.target_scaler.transform(y))
+            print(f"  Epoch {epoch + 1}/{epochs}")
+
+        # 最后一遍：流式累计 R² 和 MAE（按目标平均）
+        count = 0
+        abs_error = sq_error = y_sum = y_sq_sum = 0.0
+        for X, y in batches():
+            pred = self.target_scaler.inverse_transform(self.model.predict(self.scaler.transform(X)))
+            count += len(y)
+            abs_error = abs_error + np.abs(pred - y).sum(axis=0)
+            sq_error = sq_error + ((pred - y) ** 2).sum(axis=0)
+            y_sum = y_sum + y.sum(axis=0, dtype=np.float64)
+            y_sq_sum = y_sq_sum + (y.astype(np.float64) ** 2).sum(axis=0)
+        total_var = y_sq_sum - y_sum ** 2 / count
+        r2 = 1.0 - sq_error / np.where(total_var > 0, total_var, np.nan)
+        train_r2 = float(np.nanmean(r2)) if np.any(total_var > 0) else 0.0
+        train_mae = float(np.mean(abs_error / count))
+
+        print(f"\n  训练集 R²: {train_r2:.4f}, MAE: {train_mae:.2f}")
+
+        self.is_trained = True
+
+        if save_path:
+            self.save(save_path)
+
+        return {
+            'train_r2': train_r2,
+            'train_mae': train_mae,
+            'samples': samples,
+            'epochs': epochs
+        }
+    
     def predict(self, features, return_uncertainty=True):
         """预测结果"""
         if not self.is_trained:
@@ -133,7 +226,10 @@ class SurrogateModel:
         features_scaled = self.scaler.transform(features)
         
         # 预测
-        prediction = self.model.predict(features_scaled)[0]
+        prediction = self.model.predict(features_scaled)
+        if self.target_scaler is not None:
+            prediction = self.target_scaler.inverse_transform(prediction)
+        prediction = prediction[0]
         
         result = {
             'max_stress': float(prediction[0]),
@@ -170,6 +266,7 @@ class SurrogateModel:
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
+            'target_scaler': self.target_scaler,
             'model_type': self.model_type,
             'feature_names': self.feature_names,
             'target_names': self.target_names,
@@ -186,6 +283,7 @@ class SurrogateModel:
         
         self.model = model_data['model']
         self.scaler = model_data['scaler']
+        self.target_scaler = model_data.get('target_scaler')
         self.model_type = model_data['model_type']
         self.feature_names = model_data.get('feature_names', [])
         self.target_names = model_data.get('target_names', [])
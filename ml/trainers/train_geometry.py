@@ -5,14 +5,27 @@
 import sys
 sys.path.append('E:/DeepSeek_Work')
 
+import contextlib
+import json
+import os
+import time
+
 import torch
-import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, get_worker_info
 import numpy as np
 from pathlib import Path
 
-from ml.models.geometry_encoder import Simple3DCNN, GeometryFeatureExtractor
+from ml.models.geometry_encoder import (Simple3DCNN, PointNetEncoder, GeometryFeatureExtractor,
+                                        coords_to_points)
+from ml.models.voxel_cache import pack_voxels, unpack_voxels
+from ml.models.voxelizer import voxels_to_coords
+
+# 分片体素数据集的索引文件
+SHARD_INDEX = 'index.json'
+# 分片格式：packed —— 位压缩稠密网格；coords —— 表面体素坐标（PointNet，大小与表面积成正比）
+SHARD_FORMATS = ('packed', 'coords')
 
 class GeometryDataset(Dataset):
     """几何数据集"""
@@ -25,6 +38,10 @@ class GeometryDataset(Dataset):
     def __len__(self):
         return len(self.voxel_files)
     
+    def load(self, idx):
+        """第 idx 个样本的 (R, R, R) float32 网格"""
+        return np.load(self.voxel_files[idx]).astype(np.float32)
+    
     def __getitem__(self, idx):
         voxel_file = self.voxel_files[idx]
         voxels = np.load(voxel_file)
@@ -37,14 +54,329 @@ class GeometryDataset(Dataset):
         
         return voxels, voxels  # 自编码器：输入=输出
 
+def write_voxel_shards(samples, output_dir, resolution, shard_size=1024, shard_format='packed'):
+    """把体素网格写成分片数据集
+
+    packed 格式每个分片是一个 (n, R³/8) uint8 的 .npy（每行一个位压缩网格）；
+    coords 格式每个分片是各样本表面体素坐标拼接成的 (M, 3) int16 .npy，
+    index.json 中记录每个样本的点数。index.json 还记录分辨率、格式、各分片的样本数和样本名；
+    读取时按 mmap 打开，不需要逐文件 open
+
+    Args:
+        samples: (name, 样本) 的可迭代对象（可以是生成器），name 可为 None；
+                 样本为 (R, R, R) 网格（packed）或 (N, 3) 体素坐标（coords）
+
+    Returns:
+        写入的样本数
+    """
+    if shard_format not in SHARD_FORMATS:
+        raise ValueError(f"Unknown shard format: {shard_format} (expected one of {SHARD_FORMATS})")
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    shards, sample_names, buffer = [], [], []
+    
+    def flush():
+        if not buffer:
+            return
+        shard_file = f"shard_{len(shards):05d}.npy"
+        tmp = output_path / (shard_file + '.tmp.npy')
+        shard = {'file': shard_file, 'count': len(buffer)}
+        if shard_format == 'coords':
+            np.save(tmp, np.concatenate(buffer))
+            shard['lengths'] = [len(coords) for coords in buffer]
+        else:
+            np.save(tmp, np.stack(buffer))
+        os.replace(tmp, output_path / shard_file)
+        shards.append(shard)
+        buffer.clear()
+    
+    for name, sample in samples:
+        if shard_format == 'coords':
+            buffer.append(np.asarray(sample, dtype=np.int16).reshape(-1, 3))
+        else:
+            if sample.shape != (resolution,) * 3:
+                raise ValueError(f"Voxel grid shape mismatch: expected {(resolution,) * 3}, got {sample.shape}")
+            buffer.append(pack_voxels(sample))
+        sample_names.append(name)
+        if len(buffer) >= shard_size:
+            flush()
+    flush()
+    
+    with open(output_path / SHARD_INDEX, 'w', encoding='utf-8') as f:
+        json.dump({'resolution': resolution, 'format': shard_format, 'shards': shards,
+                   'names': sample_names}, f)
+    return len(sample_names)
+
+def _augment_rng():
+    """增强用的随机数生成器
+
+    DataLoader worker 中以 worker 种子初始化（各 worker 不同，由主进程的 torch 随机数状态派生）；
+    主进程中（num_workers=0）从 torch 全局随机数状态取种子。torch 随机数状态随检查点保存和恢复，
+    因此续训不会重放第一轮的增强；但续训后的增强序列与不中断训练时并不逐位相同
+    """
+    if get_worker_info() is not None:
+        return np.random.default_rng(torch.initial_seed() % (2 ** 32))
+    return np.random.default_rng(int(torch.randint(0, 2 ** 31 - 1, ()).item()))
+
+def augment_voxels(voxels, rng):
+    """随机坐标轴置换 + 各轴随机翻转（立方体的 48 种对称变换）"""
+    voxels = np.transpose(voxels, rng.permutation(3))
+    flips = rng.random(3) < 0.5
+    voxels = voxels[tuple(slice(None, None, -1) if flip else slice(None) for flip in flips)]
+    return np.ascontiguousarray(voxels)
+
+def augment_coords(coords, resolution, rng):
+    """augment_voxels 的稀疏版本：对 (N, 3) 体素坐标做同样的轴置换和翻转"""
+    coords = coords[:, rng.permutation(3)]
+    flips = rng.random(3) < 0.5
+    return np.where(flips, resolution - 1 - coords, coords)
+
+class ShardedVoxelDataset(Dataset):
+    """write_voxel_shards 生成的分片数据集
+
+    分片在每个 DataLoader worker 中首次访问时以 mmap 打开（不在进程间共享文件句柄），
+    样本按需解压；augment 时每次取样做随机对称变换。
+    load_coords 返回表面体素坐标：coords 格式直接切片读取，不生成稠密网格
+    """
+    
+    def __init__(self, shard_dir, augment=False):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / SHARD_INDEX, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.resolution = index['resolution']
+        self.format = index.get('format', 'packed')
+        self.names = index.get('names') or []
+        self.shard_files = [shard['file'] for shard in index['shards']]
+        self.offsets = np.cumsum([0] + [shard['count'] for shard in index['shards']])
+        # coords 格式：每个分片内各样本的起始行
+        self.point_offsets = [np.cumsum([0] + shard['lengths']) for shard in index['shards']
+                              ] if self.format == 'coords' else None
+        self.augment = augment
+        self._shards = {}
+        self._rng = None
+    
+    def __len__(self):
+        return int(self.offsets[-1])
+    
+    def _shard(self, shard_idx):
+        shard = self._shards.get(shard_idx)
+        if shard is None:
+            shard = np.load(self.shard_dir / self.shard_files[shard_idx], mmap_mode='r')
+            self._shards[shard_idx] = shard
+        return shard
+    
+    def _locate(self, idx):
+        """样本序号 -> (分片序号, 分片内序号)"""
+        if idx < 0:
+            idx += len(self)
+        shard_idx = int(np.searchsorted(self.offsets, idx, side='right')) - 1
+        return shard_idx, int(idx - self.offsets[shard_idx])
+    
+    def load_coords(self, idx):
+        """第 idx 个样本的 (N, 3) int32 表面体素坐标（不做增强）"""
+        if self.format != 'coords':
+            return voxels_to_coords(self.load(idx))
+        shard_idx, row = self._locate(idx)
+        begin, end = self.point_offsets[shard_idx][row:row + 2]
+        return np.asarray(self._shard(shard_idx)[begin:end], dtype=np.int32)
+    
+    def load(self, idx):
+        """第 idx 个样本的 (R, R, R) float32 网格（不做增强）"""
+        if self.format == 'coords':
+            voxels = np.zeros((self.resolution,) * 3, dtype=np.float32)
+            voxels[tuple(self.load_coords(idx).T)] = 1.0
+            return voxels
+        shard_idx, row = self._locate(idx)
+        return unpack_voxels(np.asarray(self._shard(shard_idx)[row]), self.resolution)
+    
+    def __getitem__(self, idx):
+        voxels = self.load(idx)
+        if self.augment:
+            if self._rng is None:
+                # 各 worker 的增强序列不同且可复现
+                self._rng = _augment_rng()
+            voxels = augment_voxels(voxels, self._rng)
+        voxels = torch.from_numpy(voxels).unsqueeze(0)
+        return voxels, voxels  # 自编码器：输入=输出
+    
+    def __getstate__(self):
+        # mmap 句柄不随 dataset 传给 worker
+        state = self.__dict__.copy()
+        state['_shards'] = {}
+        state['_rng'] = None
+        return state
+
+def make_voxel_loader(dataset, batch_size=8, shuffle=True, num_workers=None, prefetch_factor=4, drop_last=False):
+    """多进程加载体素数据：worker 数缺省为 min(8, CPU 核数)，GPU 训练时使用锁页内存"""
+    if num_workers is None:
+        num_workers = min(8, os.cpu_count() or 1)
+    options = {}
+    if num_workers > 0:
+        options = {'persistent_workers': True, 'prefetch_factor': prefetch_factor}
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=torch.cuda.is_available(), drop_last=drop_last, **options)
+
+class ContrastiveViews(Dataset):
+    """对比学习样本：同一几何的两个随机增强视图
+
+    base 需提供 load(idx) -> (R, R, R) 网格（ShardedVoxelDataset / GeometryDataset）；
+    model_type 为 'pointnet' 时样本为表面体素坐标（base 有 load_coords 时直接读取，
+    不生成稠密网格），增强和丢弃都在坐标上进行，再采样为点云
+    """
+    
+    def __init__(self, base, indices=None, drop_rate=0.05, model_type='simple_3dcnn', num_points=2048,
+                 resolution=None):
+        self.base = base
+        self.indices = np.arange(len(base)) if indices is None else np.asarray(indices)
+        self.drop_rate = drop_rate
+        self.model_type = model_type
+        self.num_points = num_points
+        self.resolution = resolution or getattr(base, 'resolution', None)
+        self._rng = None
+    
+    def __len__(self):
+        return len(self.indices)
+    
+    def sample(self, idx):
+        """第 idx 个样本：pointnet 为 (N, 3) 表面体素坐标，否则为 (R, R, R) 网格"""
+        base_idx = int(self.indices[idx])
+        if self.model_type != 'pointnet':
+            return self.base.load(base_idx)
+        if hasattr(self.base, 'load_coords'):
+            return self.base.load_coords(base_idx)
+        return voxels_to_coords(self.base.load(base_idx))
+    
+    def model_input(self, sample, rng=None):
+        """sample() 的结果 -> 单个样本的模型输入"""
+        if self.model_type == 'pointnet':
+            return coords_to_points(sample, self.resolution, self.num_points, rng)
+        return sample[None]
+    
+    def view(self, sample, rng):
+        if self.model_type == 'pointnet':
+            coords = augment_coords(sample, self.resolution, rng)
+            if self.drop_rate:
+                coords = coords[rng.random(len(coords)) >= self.drop_rate]
+            return torch.from_numpy(self.model_input(coords, rng))
+        voxels = augment_voxels(sample, rng)
+        if self.drop_rate:
+            voxels = voxels * (rng.random(voxels.shape) >= self.drop_rate)
+        return torch.from_numpy(self.model_input(voxels.astype(np.float32), rng))
+    
+    def __getitem__(self, idx):
+        if self._rng is None:
+            self._rng = _augment_rng()
+        sample = self.sample(idx)
+        return self.view(sample, self._rng), self.view(sample, self._rng)
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_rng'] = None
+        return state
+
+def nt_xent_loss(z1, z2, temperature=0.1):
+    """NT-Xent（SimCLR）损失：z1[i] 与 z2[i] 为正样本对，批内其余 2n-2 个样本为负样本
+
+    z1 / z2 为 L2 归一化后的 (n, d) 特征；应在 autocast 之外调用，
+    否则 logits 的矩阵乘法会以 bfloat16 计算（除以 temperature 后精度损失明显）
+    """
+    z = torch.cat([z1, z2]).float()
+    n = z1.shape[0]
+    logits = z @ z.t() / temperature
+    logits.fill_diagonal_(float('-inf'))
+    targets = torch.cat([torch.arange(n, 2 * n), torch.arange(0, n)]).to(z.device)
+    return F.cross_entropy(logits, targets)
+
+def _embed(model, inputs, device, autocast):
+    """一批模型输入 -> float32 特征（CPU）"""
+    with autocast():
+        return model(torch.from_numpy(np.stack(inputs)).to(device)).float().cpu()
+
+def evaluate_recall(model, views, device, k=5, batch_size=32, seed=0, autocast=contextlib.nullcontext):
+    """留出集上的检索 recall@k
+
+    以每个样本的原始网格为库、随机增强视图为查询（固定种子），
+    统计查询的最近 k 个结果（余弦相似度）中包含其原始样本的比例。
+    按 batch_size 分批读取样本并编码，内存中只保留 (n, feature_dim) 特征；
+    样本数不大于 k 时 recall 恒为 1，没有意义，返回 None
+    """
+    if len(views) <= k:
+        return None
+    rng = np.random.default_rng(seed)
+    model.eval()
+    database, query = [], []
+    with torch.inference_mode():
+        for begin in range(0, len(views), batch_size):
+            originals, queries = [], []
+            for idx in range(begin, min(begin + batch_size, len(views))):
+                sample = views.sample(idx)
+                originals.append(views.model_input(sample))
+                queries.append(views.view(sample, rng).numpy())
+            database.append(_embed(model, originals, device, autocast))
+            query.append(_embed(model, queries, device, autocast))
+    database, query = torch.cat(database), torch.cat(query)
+    
+    topk = (query @ database.t()).topk(k, dim=1).indices
+    hits = (topk == torch.arange(len(query))[:, None]).any(dim=1)
+    return float(hits.float().mean())
+
+def _bf16_supported(device):
+    """CUDA 需支持 bfloat16；CPU 需要有原生 bfloat16 指令（否则模拟执行反而更慢）"""
+    if device.type == 'cuda':
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def _save_checkpoint(path, state):
+    """先写临时文件再替换，中断时不会留下半个检查点"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+
 def train_geometry_encoder(
     voxel_dir='E:/DeepSeek_Work/ml/data/voxels',
     epochs=50,
     batch_size=8,
     learning_rate=0.001,
-    save_path='E:/DeepSeek_Work/ml/models/geometry_encoder.pth'
+    save_path='E:/DeepSeek_Work/ml/models/geometry_encoder.pth',
+    num_workers=None,
+    model_type='simple_3dcnn',
+    feature_dim=128,
+    temperature=0.1,
+    drop_rate=0.05,
+    val_fraction=0.1,
+    recall_k=5,
+    patience=5,
+    precision='auto',
+    checkpoint_path=None,
+    checkpoint_every=1,
+    resume=True,
+    seed=42
 ):
-    """训练几何编码器"""
+    """对比学习（NT-Xent）训练几何编码器
+
+    同一几何的两个随机对称变换 + 体素丢弃视图互为正样本，批内其他几何为负样本，
+    学到对摆放方向不敏感的特征。每轮在留出集上计算检索 recall@k：
+    - 提升时把模型权重保存到 save_path（GeometryFeatureExtractor.load_model 可直接加载），
+      训练历史写入同名 .json
+    - 连续 patience 轮没有提升时提前停止
+    留出集样本数不大于 recall_k 时 recall 没有意义：给出警告，不做评估和提前停止，
+    每轮保存最新权重
+    checkpoint_path（缺省为 save_path 同目录的 <name>.ckpt）每 checkpoint_every 轮保存
+    模型、优化器、torch 随机数状态和历史，resume 时从中断处继续（增强视图的随机数由恢复后的
+    torch 状态重新派生，不单独保存，见 _augment_rng）。
+    precision: 'auto'（支持时使用 bfloat16 autocast）/ 'bf16' / 'fp32'
+
+    voxel_dir 为分片数据集（含 index.json，见 generate_voxel_data）时按 mmap 读取，
+    否则按旧格式逐个读取 *.npy
+
+    Returns:
+        加载了最佳权重的模型；没有数据时返回 None
+    """
     
     print("=" * 60)
     print("几何编码器训练")
@@ -57,82 +389,184 @@ def train_geometry_encoder(
         print("需要先生成体素数据")
         return None
     
-    voxel_files = list(voxel_path.glob('*.npy'))
-    if len(voxel_files) == 0:
-        print("⚠️  没有找到体素数据文件")
+    # 创建数据集
+    if (voxel_path / SHARD_INDEX).exists():
+        dataset = ShardedVoxelDataset(voxel_dir)
+        resolution = dataset.resolution
+    else:
+        dataset = GeometryDataset(voxel_dir)
+        resolution = np.load(dataset.voxel_files[0], mmap_mode='r').shape[0] if len(dataset) else 0
+    
+    if len(dataset) < 4:
+        print("⚠️  体素样本不足（至少需要 4 个）")
         return None
     
-    print(f"找到 {len(voxel_files)} 个体素文件")
+    print(f"找到 {len(dataset)} 个体素样本（分辨率 {resolution}）")
     
-    # 创建数据集
-    dataset = GeometryDataset(voxel_dir)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    # 固定种子划分留出集，重复运行、断点续训时划分相同
+    torch.manual_seed(seed)
+    order = np.random.default_rng(seed).permutation(len(dataset))
+    num_val = min(max(2, int(len(dataset) * val_fraction)), len(dataset) - 2)
+    view_options = {'drop_rate': drop_rate, 'model_type': model_type, 'resolution': resolution}
+    train_views = ContrastiveViews(dataset, order[num_val:], **view_options)
+    val_views = ContrastiveViews(dataset, order[:num_val], **view_options)
+    early_stopping = num_val > recall_k
+    if not early_stopping:
+        print(f"⚠️  留出集只有 {num_val} 个样本（需多于 recall_k={recall_k}），"
+              f"不做 recall 评估和提前停止，每轮保存最新权重")
+    # NT-Xent 需要批内负样本：丢弃不足一批的尾部
+    dataloader = make_voxel_loader(train_views, batch_size=batch_size, num_workers=num_workers,
+                                   drop_last=len(train_views) > batch_size)
     
     # 创建模型
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"使用设备: {device}")
+    use_bf16 = precision == 'bf16' or (precision == 'auto' and _bf16_supported(device))
+    print(f"使用设备: {device}，精度: {'bfloat16' if use_bf16 else 'float32'}")
     
-    model = Simple3DCNN(feature_dim=128).to(device)
+    def autocast():
+        if use_bf16:
+            return torch.autocast(device_type=device.type, dtype=torch.bfloat16)
+        return contextlib.nullcontext()
     
-    # 定义损失函数和优化器
-    criterion = nn.MSELoss()
+    if model_type == 'pointnet':
+        model = PointNetEncoder(feature_dim=feature_dim).to(device)
+    else:
+        model = Simple3DCNN(input_shape=(resolution,) * 3, feature_dim=feature_dim).to(device)
     optimizer = optim.Adam(model.parameters(), lr=learning_rate)
     
+    # 断点续训
+    save_path = Path(save_path)
+    checkpoint_path = Path(checkpoint_path) if checkpoint_path else save_path.with_suffix('.ckpt')
+    start_epoch, best_recall, stale_epochs, history = 0, -1.0, 0, []
+    if resume and checkpoint_path.exists():
+        state = torch.load(checkpoint_path, map_location=device, weights_only=False)
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        # map_location 会把 ByteTensor 一起移到 GPU，set_rng_state 只接受 CPU 张量
+        torch.set_rng_state(state['torch_rng'].cpu())
+        start_epoch = state['epoch'] + 1
+        best_recall = state['best_recall']
+        stale_epochs = state['stale_epochs']
+        history = state['history']
+        print(f"从检查点继续: {checkpoint_path}（第 {start_epoch + 1} 轮起）")
+    
     # 训练
     print("\n开始训练...")
     
-    for epoch in range(epochs):
+    for epoch in range(start_epoch, epochs):
+        if stale_epochs >= patience:
+            break
+        epoch_start = time.perf_counter()
         model.train()
         total_loss = 0
+        num_batches = 0
         
-        for batch_idx, (data, target) in enumerate(dataloader):
-            data = data.to(device)
-            target = target.to(device)
+        for view1, view2 in dataloader:
+            view1 = view1.to(device, non_blocking=True)
+            view2 = view2.to(device, non_blocking=True)
             
-            # 前向传播
+            # 前向传播：只有编码器在 autocast 下运行，相似度矩阵和交叉熵用 float32 特征计算
             optimizer.zero_grad()
-            features = model(data)
-            
-            # 这里使用对比学习或重建损失
-            # 简化版：使用 MSE 损失
-            loss = criterion(features, features.detach())
+            with autocast():
+                z1, z2 = model(view1), model(view2)
+            loss = nt_xent_loss(z1.float(), z2.float(), temperature)
             
             # 反向传播
             loss.backward()
             optimizer.step()
             
             total_loss += loss.item()
+            num_batches += 1
+        
+        recall = evaluate_recall(model, val_views, device, recall_k, batch_size, seed, autocast) \
+            if early_stopping else None
+        improved = recall is None or recall > best_recall
+        if improved:
+            if recall is not None:
+                best_recall, stale_epochs = recall, 0
+            save_path.parent.mkdir(parents=True, exist_ok=True)
+            torch.save(model.state_dict(), save_path)
+        else:
+            stale_epochs += 1
         
-        avg_loss = total_loss / len(dataloader)
-        print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.6f}")
+        history.append({
+            'epoch': epoch + 1,
+            'loss': total_loss / max(num_batches, 1),
+            f'recall@{recall_k}': recall,
+            'seconds': time.perf_counter() - epoch_start
+        })
+        recall_text = f"Recall@{recall_k}: {recall:.4f}{' *' if improved else ''}, " if recall is not None else ""
+        print(f"Epoch {epoch+1}/{epochs}, Loss: {history[-1]['loss']:.6f}, "
+              f"{recall_text}Time: {history[-1]['seconds']:.1f}s")
+        
+        if (epoch + 1) % checkpoint_every == 0 or epoch + 1 == epochs or stale_epochs >= patience:
+            _save_checkpoint(checkpoint_path, {
+                'epoch': epoch,
+                'model': model.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'torch_rng': torch.get_rng_state(),
+                'best_recall': best_recall,
+                'stale_epochs': stale_epochs,
+                'history': history
+            })
+    
+    if stale_epochs >= patience:
+        print(f"\n连续 {patience} 轮 recall@{recall_k} 没有提升，提前停止")
     
-    # 保存模型
-    Path(save_path).parent.mkdir(parents=True, exist_ok=True)
-    torch.save(model.state_dict(), save_path)
-    print(f"\n✅ 模型已保存: {save_path}")
+    # 训练记录：参数 + 每轮指标，便于比较不同运行
+    with open(save_path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'voxel_dir': str(voxel_dir),
+            'model_type': model_type,
+            'resolution': resolution,
+            'feature_dim': feature_dim,
+            'batch_size': batch_size,
+            'learning_rate': learning_rate,
+            'temperature': temperature,
+            'precision': 'bf16' if use_bf16 else 'fp32',
+            'seed': seed,
+            'num_train': len(train_views),
+            'num_val': len(val_views),
+            'early_stopping': early_stopping,
+            f'best_recall@{recall_k}': best_recall if early_stopping else None,
+            'history': history
+        }, f, ensure_ascii=False, indent=2)
+    
+    if save_path.exists():
+        model.load_state_dict(torch.load(save_path, map_location=device))
+    if early_stopping:
+        print(f"\n✅ 模型已保存: {save_path}（最佳 recall@{recall_k} = {best_recall:.4f}）")
+    else:
+        print(f"\n✅ 模型已保存: {save_path}（最后一轮权重）")
     
     return model
 
-def generate_voxel_data(step_files, output_dir='E:/DeepSeek_Work/ml/data/voxels'):
-    """从 STEP 文件生成体素数据"""
+def generate_voxel_data(step_files, output_dir='E:/DeepSeek_Work/ml/data/voxels', resolution=32, shard_size=1024,
+                        shard_format='packed'):
+    """从 STEP 文件生成分片体素数据集（write_voxel_shards 格式，体素化经由体素缓存）
+
+    shard_format 为 'coords' 时只求表面体素坐标（PointNet 训练用，不生成 R³ 网格）
+    """
     
     print("生成体素数据...")
     
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+    extractor = GeometryFeatureExtractor(resolution=resolution)
     
-    extractor = GeometryFeatureExtractor(resolution=32)
+    def samples():
+        for i, step_file in enumerate(step_files):
+            print(f"处理 {i+1}/{len(step_files)}: {step_file}")
+            
+            if shard_format == 'coords':
+                voxels = extractor.surface_coords(step_file)
+            else:
+                voxels = extractor.voxelize_step_file(step_file)
+            
+            if voxels is not None:
+                yield Path(step_file).name, voxels
     
-    for i, step_file in enumerate(step_files):
-        print(f"处理 {i+1}/{len(step_files)}: {step_file}")
-        
-        voxels = extractor.voxelize_step_file(step_file)
-        
-        if voxels is not None:
-            output_file = output_path / f"voxel_{i:04d}.npy"
-            np.save(output_file, voxels)
+    count = write_voxel_shards(samples(), output_dir, resolution, shard_size, shard_format)
     
-    print(f"✅ 体素数据已生成: {output_dir}")
+    print(f"✅ 体素数据已生成: {output_dir}（{count} 个样本）")
 
 if __name__ == "__main__":
     # 如果有 STEP 文件，先生成体素数据
@@ -140,5 +574,18 @@ if __name__ == "__main__":
     # if step_files:
     #     generate_voxel_data(step_files)
     
-    # 训练模型
-    train_geometry_encoder(epochs=10)
\ No newline at end of file
+    # 训练模型（中断后重新运行会从检查点继续）
+    import argparse
+    parser = argparse.ArgumentParser(description="Contrastive geometry encoder training")
+    parser.add_argument("--voxel-dir", default='E:/DeepSeek_Work/ml/data/voxels')
+    parser.add_argument("--save-path", default='E:/DeepSeek_Work/ml/models/geometry_encoder.pth')
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--model-type", default='simple_3dcnn', choices=['simple_3dcnn', 'pointnet'])
+    parser.add_argument("--precision", default='auto', choices=['auto', 'bf16', 'fp32'])
+    parser.add_argument("--patience", type=int, default=5)
+    parser.add_argument("--no-resume", action='store_true')
+    args = parser.parse_args()
+    train_geometry_encoder(voxel_dir=args.voxel_dir, save_path=args.save_path, epochs=args.epochs,
+                           batch_size=args.batch_size, model_type=args.model_type,
+                           precision=args.precision, patience=args.patience, resume=not args.no_resume)
\ No newline at end of file
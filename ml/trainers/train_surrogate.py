@@ -6,23 +6,33 @@ import sys
 sys.path.append('E:/DeepSeek_Work')
 
 from server.data_collector import SimulationDataCollector
-from ml.models.surrogate_model import SurrogateModel
+from ml.trainers.surrogate_model import SurrogateModel
 
-def train_surrogate_model(analysis_type='stress', min_samples=50):
-    """训练代理模型"""
+def train_surrogate_model(analysis_type='stress', min_samples=50, table_path=None):
+    """训练代理模型
+
+    table_path 为 export_training_data 导出的 Arrow / Parquet 文件或分区目录时从中读取，
+    否则直接从数据库按列读取（get_training_columns）
+    """
     
     print("=" * 60)
     print("代理模型训练")
     print("=" * 60)
     
-    # 加载数据
-    collector = SimulationDataCollector()
-    data = collector.get_training_data(analysis_type=analysis_type)
+    # 加载数据（列式）
+    if table_path:
+        from server.training_export import read_training_table
+        data = read_training_table(table_path, analysis_type=analysis_type)
+        num_records = data.num_rows
+    else:
+        collector = SimulationDataCollector()
+        data = collector.get_training_columns(analysis_type=analysis_type)
+        num_records = len(data['sim_id'])
     
-    print(f"\n加载数据: {len(data)} 条记录")
+    print(f"\n加载数据: {num_records} 条记录")
     
-    if len(data) < min_samples:
-        print(f"⚠️  数据不足！需要至少 {min_samples} 条记录，当前只有 {len(data)} 条")
+    if num_records < min_samples:
+        print(f"⚠️  数据不足！需要至少 {min_samples} 条记录，当前只有 {num_records} 条")
         print(f"   建议：继续运行仿真积累数据")
         return None
     
@@ -30,7 +40,7 @@ def train_surrogate_model(analysis_type='stress', min_samples=50):
     model = SurrogateModel(model_type='random_forest')
     
     # 准备数据
-    X, y = model.prepare_data(data)
+    X, y = model.prepare_columns(data)
     
     print(f"\n特征矩阵: {X.shape}")
     print(f"目标矩阵: {y.shape}")
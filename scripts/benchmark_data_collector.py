@@ -0,0 +1,173 @@
+"""
+SimulationDataCollector 并发写入基准
+模拟多个 Celery worker 同时写入仿真记录（start → mesh → results → complete），
+对比改造前“每次调用新建连接”的写法与共享连接池（WAL + busy_timeout + 语句缓存）
+的每秒记录数和 "database is locked" 错误数；最后用 bulk_ingest 批量导入同样数量的记录
+
+用法:
+    python scripts/benchmark_data_collector.py --writers 8 --records 200
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server.data_collector import SimulationDataCollector
+from server.sqlite_pool import get_pool
+
+
+class LegacyWriter:
+    """改造前的写法：每次调用新建连接（默认 5 秒超时、回滚日志模式）"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _execute(self, sql, params):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+    def write_record(self, sim_id, params):
+        self._execute('''
+            INSERT INTO simulations (sim_id, timestamp, geometry_file, geometry_hash, analysis_type, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (sim_id, datetime.now().isoformat(), 'bench.step', None, 'static', 'running'))
+        for name, value in params.items():
+            self._execute('INSERT INTO geometry_params (sim_id, param_name, param_value) VALUES (?, ?, ?)',
+                          (sim_id, name, value))
+        self._execute('''
+            INSERT INTO mesh_params (sim_id, num_nodes, num_elements, clmax, clmin, mesh_quality)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (sim_id, 1000, 5000, 5.0, 0.5, 0.8))
+        self._execute('''
+            INSERT INTO results (sim_id, max_stress, min_stress, mean_stress, max_displacement, volume, mass)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (sim_id, 250.0, 1.0, 80.0, 0.1, 1e5, 0.78))
+        self._execute('UPDATE simulations SET status = ?, duration = ? WHERE sim_id = ?',
+                      ('completed', 1.0, sim_id))
+
+
+class PooledWriter:
+    """连接池写法：直接调用 SimulationDataCollector"""
+
+    def __init__(self, db_path):
+        self.collector = SimulationDataCollector(db_path)
+
+    def write_record(self, sim_id, params):
+        collector = self.collector
+        sim_id = collector.start_simulation(f'bench_{sim_id}.step', 'static', params)
+        collector.record_mesh(sim_id, {'num_nodes': 1000, 'num_elements': 5000,
+                                       'clmax': 5.0, 'clmin': 0.5, 'quality': 0.8})
+        collector.record_results(sim_id, {'max_stress': 250.0, 'min_stress': 1.0, 'mean_stress': 80.0,
+                                          'max_displacement': 0.1, 'volume': 1e5, 'mass': 0.78})
+        collector.complete_simulation(sim_id, 1.0)
+
+
+WRITERS = {'legacy': LegacyWriter, 'pooled': PooledWriter}
+
+
+def writer_process(mode, db_path, worker_id, records, start_event, queue):
+    writer = WRITERS[mode](db_path)
+    params = {'length': 100.0, 'width': 50.0, 'thickness': 5.0}
+    ok = locked = other = 0
+    start_event.wait()
+    for i in range(records):
+        try:
+            writer.write_record(f'w{worker_id}_{i}', params)
+            ok += 1
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e):
+                locked += 1
+            else:
+                other += 1
+    queue.put((ok, locked, other))
+
+
+def prepare_database(path, mode):
+    SimulationDataCollector(path)
+    # 建表后关闭本进程的池连接，写入全部来自子进程
+    get_pool(path).close()
+    if mode == 'legacy':
+        # 回到默认的回滚日志模式，还原改造前的并发行为
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+
+
+def run(mode, writers, records, workdir):
+    db_path = os.path.join(workdir, f'{mode}.db')
+    prepare_database(db_path, mode)
+
+    ctx = mp.get_context('spawn')
+    start_event = ctx.Event()
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=writer_process, args=(mode, db_path, w, records, start_event, queue))
+             for w in range(writers)]
+    for p in procs:
+        p.start()
+    time.sleep(1.0)  # 等所有进程完成导入
+
+    start = time.perf_counter()
+    start_event.set()
+    totals = [queue.get() for _ in procs]
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join()
+
+    ok = sum(t[0] for t in totals)
+    locked = sum(t[1] for t in totals)
+    other = sum(t[2] for t in totals)
+    print(f"{mode:8s} writers={writers:3d}  records={ok:6d}  locked_errors={locked:5d}  "
+          f"other_errors={other:4d}  time={elapsed:7.2f} s  rate={ok / elapsed:8.1f} records/s")
+    return ok / elapsed
+
+
+def run_bulk(total, workdir, batch_size):
+    """单进程批量导入 total 条完整记录（参数、网格、结果、仿真）"""
+    collector = SimulationDataCollector(os.path.join(workdir, 'bulk.db'))
+    sim_ids = [f'bulk_{i}' for i in range(total)]
+    stats = collector.bulk_ingest(
+        simulations=({'sim_id': sid, 'analysis_type': 'static', 'duration': 1.0,
+                      'geometry_params': {'length': 100.0, 'width': 50.0, 'thickness': 5.0}}
+                     for sid in sim_ids),
+        mesh=({'sim_id': sid, 'num_nodes': 1000, 'num_elements': 5000,
+               'clmax': 5.0, 'clmin': 0.5, 'quality': 0.8} for sid in sim_ids),
+        results=({'sim_id': sid, 'max_stress': 250.0, 'min_stress': 1.0, 'mean_stress': 80.0,
+                  'max_displacement': 0.1, 'volume': 1e5, 'mass': 0.78} for sid in sim_ids),
+        batch_size=batch_size
+    )
+    if not stats['success']:
+        print(f"bulk     failed: {stats['error']}")
+        return None
+    rate = stats['rows']['simulations'] / stats['elapsed']
+    print(f"bulk     records={stats['rows']['simulations']:6d}  rows={sum(stats['rows'].values()):7d}  "
+          f"batches={stats['batches']:4d}  time={stats['elapsed']:7.2f} s  rate={rate:8.1f} records/s  "
+          f"({stats['rows_per_second']:.0f} rows/s)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SimulationDataCollector concurrent write benchmark")
+    parser.add_argument("--writers", type=int, default=8, help="并发写入进程数")
+    parser.add_argument("--records", type=int, default=200, help="每个进程写入的仿真记录数")
+    parser.add_argument("--batch-size", type=int, default=5000, help="bulk_ingest 每批行数")
+    parser.add_argument("--workdir", default=None, help="数据库目录（默认临时目录）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        legacy = run('legacy', args.writers, args.records, workdir)
+        pooled = run('pooled', args.writers, args.records, workdir)
+        bulk = run_bulk(args.writers * args.records, workdir, args.batch_size)
+    print(f"Speedup: pooled {pooled / legacy:.1f}x" + (f", bulk {bulk / legacy:.1f}x" if bulk else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+docker_exec 调用延迟基准
+对比每次启动 docker exec 子进程与复用长驻会话的单次调用延迟
+
+用法:
+    python scripts/benchmark_docker_exec.py --iterations 50 --cmd "ls /app"
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server import server as mcp
+
+
+def summarize(name, samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)]
+    print(f"{name:12s} n={len(samples_ms):4d}  mean={statistics.mean(samples_ms):8.1f} ms  "
+          f"p50={statistics.median(samples_ms):8.1f} ms  p95={p95:8.1f} ms")
+    return statistics.mean(samples_ms)
+
+
+def bench_subprocess(cmd, workdir, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        mcp.DockerJob(cmd, workdir).run(timeout=60)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_session(cmd, workdir, iterations):
+    session = mcp.DockerShellSession()
+    try:
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            session.execute(cmd, workdir, timeout=60)
+            samples.append(time.perf_counter() - start)
+        return samples
+    finally:
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docker_exec latency benchmark")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--cmd", default="ls /app")
+    parser.add_argument("--workdir", default="/app")
+    args = parser.parse_args()
+
+    print(f"Container: {mcp.DOCKER_CONTAINER_NAME}  cmd: {args.cmd!r}")
+    subprocess_mean = summarize("subprocess", bench_subprocess(args.cmd, args.workdir, args.iterations))
+    session_mean = summarize("session", bench_session(args.cmd, args.workdir, args.iterations))
+    print(f"Speedup: {subprocess_mean / session_mean:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+GeometryVectorDatabase 写入基准
+对比逐条 add_geometry 与批量 add_geometries 的写入速度，测量重新加载时间，
+对比逐条 search_similar 与批量 search_batch 的查询吞吐，
+并以精确搜索为基准比较各索引类型的 recall@k 和单次查询延迟
+
+用法:
+    python scripts/benchmark_vector_db.py --count 100000 --batch 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.models.geometry_search import GeometryVectorDatabase
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GeometryVectorDatabase ingest benchmark")
+    parser.add_argument("--count", type=int, default=100000, help="批量写入的向量数")
+    parser.add_argument("--single", type=int, default=2000, help="逐条写入的向量数")
+    parser.add_argument("--batch", type=int, default=10000, help="每批向量数")
+    parser.add_argument("--dim", type=int, default=128, help="特征维度")
+    parser.add_argument("--index-types", default="flat_l2,ivf_flat,ivf_pq,hnsw", help="逗号分隔的索引类型")
+    parser.add_argument("--k", type=int, default=10, help="recall@k 的 k")
+    parser.add_argument("--queries", type=int, default=1000, help="查询吞吐测试的查询数")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        db = GeometryVectorDatabase(args.dim, os.path.join(workdir, 'single.db'), index_type='flat_l2')
+        vectors = rng.random((args.single, args.dim), dtype=np.float32)
+        start = time.perf_counter()
+        for i, vector in enumerate(vectors):
+            db.add_geometry(vector, {'id': i})
+        db.close()
+        elapsed = time.perf_counter() - start
+        print(f"add_geometry    n={args.single:7d}  time={elapsed:7.2f} s  rate={args.single / elapsed:9.0f} vectors/s")
+
+        path = os.path.join(workdir, 'batch.db')
+        db = GeometryVectorDatabase(args.dim, path, index_type='flat_l2')
+        start = time.perf_counter()
+        for begin in range(0, args.count, args.batch):
+            n = min(args.batch, args.count - begin)
+            db.add_geometries(rng.random((n, args.dim), dtype=np.float32),
+                              [{'id': begin + i} for i in range(n)])
+        db.close()
+        elapsed = time.perf_counter() - start
+        print(f"add_geometries  n={args.count:7d}  time={elapsed:7.2f} s  rate={args.count / elapsed:9.0f} vectors/s")
+
+        start = time.perf_counter()
+        db = GeometryVectorDatabase(args.dim, path, index_type='flat_l2')
+        print(f"reload          n={db.index.ntotal:7d}  time={time.perf_counter() - start:7.2f} s")
+
+        queries = rng.random((args.queries, args.dim), dtype=np.float32)
+        start = time.perf_counter()
+        for query in queries:
+            db.search_similar(query, k=args.k)
+        elapsed = time.perf_counter() - start
+        print(f"search_similar  n={args.queries:7d}  time={elapsed:7.2f} s  rate={args.queries / elapsed:9.0f} queries/s")
+        start = time.perf_counter()
+        db.search_batch(queries, k=args.k)
+        elapsed = time.perf_counter() - start
+        print(f"search_batch    n={args.queries:7d}  time={elapsed:7.2f} s  rate={args.queries / elapsed:9.0f} queries/s")
+
+        for index_type in args.index_types.split(','):
+            start = time.perf_counter()
+            db.rebuild_index(index_type)
+            build = time.perf_counter() - start
+            stats = db.evaluate_recall(k=args.k, num_queries=1000)
+            print(f"{stats['index_type']:15s} build={build:7.2f} s  recall@{stats['k']}={stats['recall_at_k']:.3f}  "
+                  f"latency={stats['latency_ms']:.3f} ms/query  (flat {stats['flat_latency_ms']:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,105 @@ import hashlib
 from datetime import datetime
 from pathlib import Path
 import sqlite3
+import time
 import numpy as np
 
+from server.migrations import FEATURE_DTYPE, apply_migrations
+from server.sqlite_pool import get_pool
+
+
+def hash_file(filepath: str) -> str:
+    """计算文件内容的 MD5 哈希"""
+    hasher = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# 列式训练数据：training_view 的数值列（几何参数另按名称展开为 param_<名称> 列）
+TRAINING_COLUMNS = ('num_elements', 'clmax', 'clmin', 'max_stress', 'mean_stress', 'max_displacement', 'volume')
+PARAM_PREFIX = 'param_'
+# 代理模型的特征（其后接几何参数列）和预测目标
+FEATURE_COLUMNS = ('num_elements', 'clmax', 'clmin')
+TARGET_COLUMNS = ('max_stress', 'mean_stress', 'max_displacement')
+
+# bulk_ingest 各表的列（sim_id 之外的列缺省为 NULL）
+BULK_TABLES = {
+    'geometry_params': ('sim_id', 'param_name', 'param_value'),
+    'mesh_params': ('sim_id', 'num_nodes', 'num_elements', 'clmax', 'clmin', 'mesh_quality'),
+    'results': ('sim_id', 'max_stress', 'min_stress', 'mean_stress', 'max_displacement', 'volume', 'mass'),
+    'geometry_features': ('sim_id', 'feature_vector', 'feature_dim'),
+    'simulations': ('sim_id', 'timestamp', 'geometry_file', 'geometry_hash', 'analysis_type', 'status', 'duration'),
+}
+
+# 子表先于仿真表写入：仿真以 completed 状态插入时训练视图只需计算一次
+BULK_ORDER = ('geometry_params', 'mesh_params', 'results', 'geometry_features', 'simulations')
+
+
+def _iter_row_batches(data, batch_size):
+    """把 pandas DataFrame、Arrow 表或可迭代的 dict 行统一切成 dict 列表"""
+    if hasattr(data, 'to_batches'):
+        # pyarrow.Table / RecordBatchReader
+        for batch in data.to_batches(max_chunksize=batch_size):
+            yield batch.to_pylist()
+    elif hasattr(data, 'iloc') and hasattr(data, 'columns'):
+        # pandas.DataFrame
+        for start in range(0, len(data), batch_size):
+            yield data.iloc[start:start + batch_size].to_dict('records')
+    else:
+        batch = []
+        for row in data:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _bulk_row(table, row, now):
+    """dict 行 -> 按 BULK_TABLES 列顺序的元组（兼容单条记录接口使用的字段名）"""
+    if table == 'mesh_params' and 'mesh_quality' not in row:
+        row = dict(row, mesh_quality=row.get('quality', 0.0))
+    elif table == 'geometry_features':
+        vector = np.asarray(row['feature_vector'], dtype=FEATURE_DTYPE).ravel()
+        row = dict(row, feature_vector=vector.tobytes(), feature_dim=len(vector))
+    elif table == 'simulations':
+        row = dict(row, timestamp=row.get('timestamp') or now, status=row.get('status') or 'completed')
+    return tuple(row.get(column) for column in BULK_TABLES[table])
+
+
+def _pivot_params(ids, params, names=None):
+    """(id, 参数名, 参数值) 行 -> (参数名列表, (len(ids), len(names)) 矩阵，缺失为 NaN)
+
+    ids 需升序。names 为 None 时取出现过的全部参数名（排序），否则按 names 的顺序
+    只保留其中的参数；同名参数重复写入时以最后一条为准
+    """
+    if not params:
+        names = [] if names is None else list(names)
+        return names, np.full((len(ids), len(names)), np.nan)
+
+    param_ids, param_names, values = zip(*params)
+    found, inverse = np.unique(np.array(param_names, dtype=str), return_inverse=True)
+    if names is None:
+        names = [str(name) for name in found]
+        col = inverse
+    else:
+        names = list(names)
+        position = {name: j for j, name in enumerate(names)}
+        col = np.array([position.get(str(name), -1) for name in found], dtype=np.int64)[inverse]
+
+    param_ids = np.array(param_ids, dtype=np.int64)
+    rows = np.searchsorted(ids, param_ids)
+    # 参数按 id 区间查询，可能包含不在 ids 中的行（被过滤掉的仿真）
+    keep = (col >= 0) & (rows < len(ids))
+    keep[keep] &= ids[rows[keep]] == param_ids[keep]
+    matrix = np.full((len(ids), len(names)), np.nan)
+    matrix[rows[keep], col[keep]] = np.array(values, dtype=np.float64)[keep]
+    return names, matrix
+
+
 class SimulationDataCollector:
     def __init__(self, db_path=None):
         # 支持环境变量和容器内路径
@@ -23,6 +120,8 @@ class SimulationDataCollector:
 
         self.db_path = db_path
         self._ensure_directory()
+        # 同一数据库的所有实例共享一个连接池（WAL + busy_timeout + 语句缓存）
+        self._pool = get_pool(self.db_path)
         self._init_database()
 
     def _ensure_directory(self):
@@ -32,76 +131,98 @@ class SimulationDataCollector:
 
     def _init_database(self):
         """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 仿真记录表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS simulations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sim_id TEXT UNIQUE NOT NULL,
-                timestamp TEXT NOT NULL,
-                geometry_file TEXT,
-                geometry_hash TEXT,
-                analysis_type TEXT,
-                status TEXT,
-                duration REAL
-            )
-        ''')
-        
-        # 几何参数表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS geometry_params (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sim_id TEXT NOT NULL,
-                param_name TEXT NOT NULL,
-                param_value REAL NOT NULL,
-                FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
-            )
-        ''')
-        
-        # 网格参数表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mesh_params (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sim_id TEXT NOT NULL,
-                num_nodes INTEGER,
-                num_elements INTEGER,
-                clmax REAL,
-                clmin REAL,
-                mesh_quality REAL,
-                FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
-            )
-        ''')
-        
-        # 结果表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sim_id TEXT NOT NULL,
-                max_stress REAL,
-                min_stress REAL,
-                mean_stress REAL,
-                max_displacement REAL,
-                volume REAL,
-                mass REAL,
-                FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
-            )
-        ''')
-        
-        # 几何特征向量表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS geometry_features (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sim_id TEXT NOT NULL,
-                feature_vector BLOB NOT NULL,
-                feature_dim INTEGER NOT NULL,
-                FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
-            )
-        ''')
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # 仿真记录表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS simulations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sim_id TEXT UNIQUE NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    geometry_file TEXT,
+                    geometry_hash TEXT,
+                    analysis_type TEXT,
+                    status TEXT,
+                    duration REAL
+                )
+            ''')
+            
+            # 几何参数表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS geometry_params (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sim_id TEXT NOT NULL,
+                    param_name TEXT NOT NULL,
+                    param_value REAL NOT NULL,
+                    FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
+                )
+            ''')
+            
+            # 网格参数表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS mesh_params (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sim_id TEXT NOT NULL,
+                    num_nodes INTEGER,
+                    num_elements INTEGER,
+                    clmax REAL,
+                    clmin REAL,
+                    mesh_quality REAL,
+                    FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
+                )
+            ''')
+            
+            # 结果表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sim_id TEXT NOT NULL,
+                    max_stress REAL,
+                    min_stress REAL,
+                    mean_stress REAL,
+                    max_displacement REAL,
+                    volume REAL,
+                    mass REAL,
+                    FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
+                )
+            ''')
+            
+            # 几何特征向量表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS geometry_features (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sim_id TEXT NOT NULL,
+                    feature_vector BLOB NOT NULL,
+                    feature_dim INTEGER NOT NULL,
+                    FOREIGN KEY (sim_id) REFERENCES simulations(sim_id)
+                )
+            ''')
+            
+            # 求解器运行记录表（线程布局与耗时，供调度器参考）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS solver_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    inp_file TEXT,
+                    num_nodes INTEGER,
+                    num_elements INTEGER,
+                    threads INTEGER NOT NULL,
+                    total_cpus INTEGER,
+                    busy_cpus INTEGER,
+                    plan_source TEXT,
+                    wall_time REAL,
+                    status TEXT
+                )
+            ''')
+            
+            # 索引、训练视图等后续变更（见 server/migrations.py）
+            applied = apply_migrations(conn)
         
-        conn.commit()
-        conn.close()
+        if applied:
+            # 新索引建好后更新查询规划器的统计信息
+            with self._pool.connection() as conn:
+                conn.execute('PRAGMA optimize')
     
     def start_simulation(self, geometry_file: str, analysis_type: str, 
                         geometry_params: dict = None) -> str:
@@ -113,182 +234,472 @@ class SimulationDataCollector:
         # 计算文件哈希
         geometry_hash = self._hash_file(geometry_file) if Path(geometry_file).exists() else None
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO simulations (sim_id, timestamp, geometry_file, 
-                                       geometry_hash, analysis_type, status)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (sim_id, datetime.now().isoformat(), geometry_file, 
-                 geometry_hash, analysis_type, 'running'))
-            
-            # 记录几何参数
-            if geometry_params:
-                for name, value in geometry_params.items():
-                    cursor.execute('''
+            with self._pool.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO simulations (sim_id, timestamp, geometry_file, 
+                                           geometry_hash, analysis_type, status)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (sim_id, datetime.now().isoformat(), geometry_file, 
+                     geometry_hash, analysis_type, 'running'))
+                
+                # 记录几何参数
+                if geometry_params:
+                    cursor.executemany('''
                         INSERT INTO geometry_params (sim_id, param_name, param_value)
                         VALUES (?, ?, ?)
-                    ''', (sim_id, name, float(value)))
-            
-            conn.commit()
+                    ''', [(sim_id, name, float(value)) for name, value in geometry_params.items()])
         except sqlite3.IntegrityError:
             # 已存在相同记录
             pass
-        finally:
-            conn.close()
         
         return sim_id
     
     def record_mesh(self, sim_id: str, mesh_info: dict):
-        """记录网格信息"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO mesh_params (sim_id, num_nodes, num_elements, 
-                                    clmax, clmin, mesh_quality)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (sim_id, 
-              mesh_info.get('num_nodes'),
-              mesh_info.get('num_elements'),
-              mesh_info.get('clmax'),
-              mesh_info.get('clmin'),
-              mesh_info.get('quality', 0.0)))
-        
-        conn.commit()
-        conn.close()
+        """记录网格信息
+
+        mesh_info 可直接使用 services.mesh_quality.analyze_mesh 的结果
+        （其中 'quality' 为质量得分），再补充 clmax / clmin
+        """
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO mesh_params (sim_id, num_nodes, num_elements, 
+                                        clmax, clmin, mesh_quality)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (sim_id, 
+                  mesh_info.get('num_nodes'),
+                  mesh_info.get('num_elements'),
+                  mesh_info.get('clmax'),
+                  mesh_info.get('clmin'),
+                  mesh_info.get('quality', 0.0)))
     
     def record_results(self, sim_id: str, results: dict):
         """记录仿真结果"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO results (sim_id, max_stress, min_stress, mean_stress,
-                               max_displacement, volume, mass)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (sim_id,
-              results.get('max_stress'),
-              results.get('min_stress'),
-              results.get('mean_stress'),
-              results.get('max_displacement'),
-              results.get('volume'),
-              results.get('mass')))
-        
-        conn.commit()
-        conn.close()
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO results (sim_id, max_stress, min_stress, mean_stress,
+                                   max_displacement, volume, mass)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (sim_id,
+                  results.get('max_stress'),
+                  results.get('min_stress'),
+                  results.get('mean_stress'),
+                  results.get('max_displacement'),
+                  results.get('volume'),
+                  results.get('mass')))
     
     def record_geometry_features(self, sim_id: str, feature_vector: np.ndarray):
-        """记录几何特征向量"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 将 numpy 数组转换为 bytes
-        feature_bytes = feature_vector.tobytes()
-        
-        cursor.execute('''
-            INSERT INTO geometry_features (sim_id, feature_vector, feature_dim)
-            VALUES (?, ?, ?)
-        ''', (sim_id, feature_bytes, len(feature_vector)))
-        
-        conn.commit()
-        conn.close()
+        """记录几何特征向量（float32，每个 sim_id 一条）"""
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # 统一存为 float32；同一 sim_id 重复记录时覆盖（生成新的 id，向量索引据此增量更新）
+            feature_vector = np.asarray(feature_vector, dtype=FEATURE_DTYPE).ravel()
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO geometry_features (sim_id, feature_vector, feature_dim)
+                VALUES (?, ?, ?)
+            ''', (sim_id, feature_vector.tobytes(), len(feature_vector)))
     
     def complete_simulation(self, sim_id: str, duration: float, status: str = 'completed'):
         """完成仿真记录"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE simulations 
+                SET status = ?, duration = ?
+                WHERE sim_id = ?
+            ''', (status, duration, sim_id))
+    
+    def bulk_ingest(self, simulations=None, geometry_params=None, mesh=None, results=None,
+                    features=None, batch_size: int = 5000):
+        """批量导入历史仿真记录
+
+        每个参数可以是 dict 行的可迭代对象、pandas DataFrame 或 pyarrow Table，
+        字段名与对应表的列名一致（mesh 也接受 record_mesh 的 'quality'）。
+        simulations 的 status 缺省为 'completed'，timestamp 缺省为当前时间，
+        行内可带 'geometry_params' 字典；sim_id 已存在的仿真会被跳过，
+        geometry_hash 需要调用方提供（批量导入时不读取几何文件）。
+        每批数据用 executemany 在一个事务内写入。
+
+        Returns:
+            dict: success, rows（各表写入行数）, skipped_simulations,
+                  batches, elapsed, rows_per_second
+        """
+        sources = {
+            'geometry_params': geometry_params,
+            'mesh_params': mesh,
+            'results': results,
+            'geometry_features': features,
+            'simulations': simulations
+        }
+        rows = {table: 0 for table in BULK_ORDER}
+        skipped = 0
+        batches = 0
+        now = datetime.now().isoformat()
+        start = time.perf_counter()
+
+        try:
+            for table in BULK_ORDER:
+                if sources[table] is None:
+                    continue
+                columns = BULK_TABLES[table]
+                verb = {'simulations': 'INSERT OR IGNORE',
+                        'geometry_features': 'INSERT OR REPLACE'}.get(table, 'INSERT')
+                sql = (f"{verb} INTO {table} ({', '.join(columns)}) "
+                       f"VALUES ({', '.join('?' * len(columns))})")
+
+                for batch in _iter_row_batches(sources[table], batch_size):
+                    with self._pool.transaction() as conn:
+                        cursor = conn.cursor()
+                        if table == 'simulations':
+                            # 行内参数先写入（已存在的仿真不重复写参数）
+                            params = [(row['sim_id'], name, float(value), row['sim_id'])
+                                      for row in batch for name, value in (row.get('geometry_params') or {}).items()]
+                            if params:
+                                cursor.executemany('''
+                                    INSERT INTO geometry_params (sim_id, param_name, param_value)
+                                    SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM simulations WHERE sim_id = ?)
+                                ''', params)
+                                rows['geometry_params'] += cursor.rowcount if cursor.rowcount >= 0 else len(params)
+                        cursor.executemany(sql, [_bulk_row(table, row, now) for row in batch])
+                        inserted = cursor.rowcount if cursor.rowcount >= 0 else len(batch)
+                    rows[table] += inserted
+                    if table == 'simulations':
+                        skipped += len(batch) - inserted
+                    batches += 1
+        except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+            elapsed = time.perf_counter() - start
+            return {
+                'success': False,
+                'error': f"{type(e).__name__}: {e}",
+                'rows': rows,
+                'batches': batches,
+                'elapsed': elapsed
+            }
+
+        elapsed = time.perf_counter() - start
+        total = sum(rows.values())
+        return {
+            'success': True,
+            'rows': rows,
+            'skipped_simulations': skipped,
+            'batches': batches,
+            'elapsed': elapsed,
+            'rows_per_second': total / elapsed if elapsed > 0 else None
+        }
+    
+    def record_solver_run(self, run: dict):
+        """记录一次求解器运行（模型规模、线程数、开始时容器占用核数、墙钟时间）"""
+        with self._pool.transaction() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO solver_runs (timestamp, inp_file, num_nodes, num_elements, threads,
+                                         total_cpus, busy_cpus, plan_source, wall_time, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (datetime.now().isoformat(),
+                  run.get('inp_file'),
+                  run.get('num_nodes'),
+                  run.get('num_elements'),
+                  run['threads'],
+                  run.get('total_cpus'),
+                  run.get('busy_cpus'),
+                  run.get('plan_source'),
+                  run.get('wall_time'),
+                  run.get('status')))
+    
+    def get_solver_runs(self, min_nodes: int, max_nodes: int, limit: int = 200):
+        """获取节点数在 [min_nodes, max_nodes] 内的成功求解记录 (num_nodes, threads, wall_time)"""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT num_nodes, threads, wall_time
+                FROM solver_runs
+                WHERE status = 'completed' AND wall_time IS NOT NULL
+                  AND num_nodes BETWEEN ? AND ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (min_nodes, max_nodes, limit))
+            
+            rows = cursor.fetchall()
         
-        cursor.execute('''
-            UPDATE simulations 
-            SET status = ?, duration = ?
-            WHERE sim_id = ?
-        ''', (status, duration, sim_id))
+        return rows
+    
+    def get_duration_samples(self, limit: int = 5000):
+        """获取已完成仿真的 (analysis_type, num_nodes, duration)，用于拟合求解耗时模型"""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT s.analysis_type, mp.num_nodes, s.duration
+                FROM simulations s
+                JOIN mesh_params mp ON s.sim_id = mp.sim_id
+                WHERE s.status = 'completed' AND s.duration > 0 AND mp.num_nodes > 0
+                ORDER BY s.id DESC
+                LIMIT ?
+            ''', (limit,))
+            
+            rows = cursor.fetchall()
         
-        conn.commit()
-        conn.close()
+        return rows
     
     def get_training_data(self, analysis_type: str = None, limit: int = None):
-        """获取训练数据"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = '''
-            SELECT s.sim_id, s.analysis_type,
-                   GROUP_CONCAT(gp.param_name || ':' || gp.param_value) as params,
-                   mp.num_elements, mp.clmax, mp.clmin,
-                   r.max_stress, r.mean_stress, r.max_displacement, r.volume
-            FROM simulations s
-            LEFT JOIN geometry_params gp ON s.sim_id = gp.sim_id
-            LEFT JOIN mesh_params mp ON s.sim_id = mp.sim_id
-            LEFT JOIN results r ON s.sim_id = r.sim_id
-            WHERE s.status = 'completed'
-        '''
-        
-        if analysis_type:
-            query += f" AND s.analysis_type = '{analysis_type}'"
-        
-        query += " GROUP BY s.sim_id"
-        
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        cursor.execute(query)
-        data = cursor.fetchall()
-        conn.close()
+        """获取训练数据
+
+        读取由触发器增量维护的 training_view，每个已完成仿真一行：
+        (sim_id, analysis_type, params, num_elements, clmax, clmin,
+         max_stress, mean_stress, max_displacement, volume)
+        """
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            query = '''
+                SELECT sim_id, analysis_type, params,
+                       num_elements, clmax, clmin,
+                       max_stress, mean_stress, max_displacement, volume
+                FROM training_view
+            '''
+            
+            # 两条固定的参数化 SQL：按类型过滤时走 (analysis_type, id) 索引，已编译语句可复用
+            if analysis_type:
+                cursor.execute(query + " WHERE analysis_type = ? ORDER BY id LIMIT ?",
+                               (analysis_type, limit if limit else -1))
+            else:
+                cursor.execute(query + " ORDER BY id LIMIT ?", (limit if limit else -1,))
+            data = cursor.fetchall()
         
         return data
     
+    def _fetch_training_page(self, cursor, select, analysis_type=None, after_id=0, limit=None,
+                             require_targets=False):
+        """键集分页读取 training_view 中 id > after_id 的行及其几何参数
+
+        Returns:
+            (rows, params): rows 首列为 id，其后为 select 中的列；
+                            params 为 (id, param_name, param_value)，按写入顺序
+        """
+        conditions = ["id > ?"]
+        args = [after_id]
+        if analysis_type:
+            conditions.append("analysis_type = ?")
+            args.append(analysis_type)
+        if require_targets:
+            conditions.append("(" + " OR ".join(f"{t} IS NOT NULL" for t in TARGET_COLUMNS) + ")")
+        cursor.execute("SELECT id, " + ", ".join(select) + " FROM training_view WHERE " +
+                       " AND ".join(conditions) + " ORDER BY id LIMIT ?",
+                       args + [limit if limit else -1])
+        rows = cursor.fetchall()
+        if not rows:
+            return rows, []
+
+        cursor.execute('''
+            SELECT tv.id, gp.param_name, gp.param_value
+            FROM training_view tv
+            JOIN geometry_params gp ON gp.sim_id = tv.sim_id
+            WHERE tv.id BETWEEN ? AND ?
+        ''' + (" AND tv.analysis_type = ?" if analysis_type else "") + " ORDER BY gp.id",
+            (rows[0][0], rows[-1][0]) + ((analysis_type,) if analysis_type else ()))
+        return rows, cursor.fetchall()
+
+    def get_training_schema(self, analysis_type: str = None):
+        """训练数据的特征/目标列（几何参数按名称排序），用于固定批量迭代的列顺序"""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT DISTINCT gp.param_name
+                FROM training_view tv
+                JOIN geometry_params gp ON gp.sim_id = tv.sim_id
+            ''' + (" WHERE tv.analysis_type = ?" if analysis_type else "") + " ORDER BY gp.param_name",
+                (analysis_type,) if analysis_type else ())
+            params = [row[0] for row in cursor.fetchall()]
+
+        return {
+            'params': params,
+            'features': list(FEATURE_COLUMNS) + [PARAM_PREFIX + name for name in params],
+            'targets': list(TARGET_COLUMNS)
+        }
+
+    def get_training_columns(self, analysis_type: str = None, limit: int = None):
+        """按列获取训练数据（宽表，每个几何参数一列）
+
+        与 get_training_data 选取相同的记录，但不拼接参数字符串：
+        参数按 (仿真行, 参数名) 直接散列到矩阵中，缺失值为 NaN
+
+        Returns:
+            dict: 列名 -> numpy 数组，依次为 sim_id, analysis_type（object）,
+                  TRAINING_COLUMNS（float64）和按名称排序的 param_<名称> 列
+        """
+        with self._pool.connection() as conn:
+            rows, params = self._fetch_training_page(
+                conn.cursor(), ('sim_id', 'analysis_type') + TRAINING_COLUMNS, analysis_type, limit=limit)
+
+        columns_data = list(zip(*rows)) if rows else [()] * (3 + len(TRAINING_COLUMNS))
+        ids = np.array(columns_data[0], dtype=np.int64)
+        columns = {
+            'sim_id': np.array(columns_data[1], dtype=object),
+            'analysis_type': np.array(columns_data[2], dtype=object),
+        }
+        for name, values in zip(TRAINING_COLUMNS, columns_data[3:]):
+            columns[name] = np.array(values, dtype=np.float64)
+
+        names, matrix = _pivot_params(ids, params)
+        for j, name in enumerate(names):
+            columns[PARAM_PREFIX + name] = matrix[:, j]
+        return columns
+
+    def iter_training_batches(self, batch_size: int = 1024, analysis_type: str = None, schema: dict = None,
+                              fill_value: float = 0.0, dtype=np.float32):
+        """流式读取训练数据，逐批产出 (X, y) NumPy 数组
+
+        按 id 键集分页，每批单独借用连接，内存占用只与 batch_size 有关；
+        只包含至少有一个目标值的仿真。特征列顺序由 schema 固定
+        （缺省为 get_training_schema 在开始时的结果），其后新增的参数名会被忽略，
+        因此同一 schema 下每一批、每一轮的列含义都相同
+
+        Args:
+            fill_value: 缺失值的填充值，None 表示保留 NaN
+        """
+        if schema is None:
+            schema = self.get_training_schema(analysis_type)
+        param_names = schema['params']
+        select = FEATURE_COLUMNS + TARGET_COLUMNS
+
+        after_id = 0
+        while True:
+            with self._pool.connection() as conn:
+                rows, params = self._fetch_training_page(conn.cursor(), select, analysis_type,
+                                                         after_id, batch_size, require_targets=True)
+            if not rows:
+                return
+
+            values = np.array(rows, dtype=np.float64)
+            ids = values[:, 0].astype(np.int64)
+            _, matrix = _pivot_params(ids, params, param_names)
+            X = np.concatenate([values[:, 1:1 + len(FEATURE_COLUMNS)], matrix], axis=1)
+            y = values[:, 1 + len(FEATURE_COLUMNS):]
+            if fill_value is not None:
+                X = np.nan_to_num(X, nan=fill_value)
+                y = np.nan_to_num(y, nan=fill_value)
+            yield X.astype(dtype, copy=False), y.astype(dtype, copy=False)
+
+            after_id = int(ids[-1])
+    
+    def get_feature_updates(self, after_id: int = 0, limit: int = 10000, feature_dim: int = None):
+        """读取 geometry_features.id > after_id 的特征向量（按 id 升序），用于增量同步向量索引
+
+        每次写入（含覆盖）都会生成新的 geometry_features.id，因此记住已处理的最大 id
+        即可得到之后所有新增或更新的向量
+
+        Returns:
+            (last_id, sim_rowids, vectors): last_id 为本批最大 id（无数据时为 after_id）；
+            sim_rowids 为 simulations.id（int64，作为索引中的向量 id）；
+            vectors 为 (n, d) float32。指定 feature_dim 时跳过维度不同的向量
+        """
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT gf.id, s.id, gf.feature_dim, gf.feature_vector
+                FROM geometry_features gf
+                JOIN simulations s ON s.sim_id = gf.sim_id
+                WHERE gf.id > ?
+                ORDER BY gf.id
+                LIMIT ?
+            ''', (after_id, limit))
+            rows = cursor.fetchall()
+
+        if not rows:
+            return after_id, np.empty(0, dtype=np.int64), np.empty((0, feature_dim or 0), dtype=np.float32)
+
+        last_id = rows[-1][0]
+        dim = feature_dim or rows[-1][2]
+        rows = [row for row in rows if row[2] == dim]
+        sim_rowids = np.array([row[1] for row in rows], dtype=np.int64)
+        vectors = np.frombuffer(b''.join(row[3] for row in rows), dtype=FEATURE_DTYPE).reshape(len(rows), dim)
+        return last_id, sim_rowids, vectors
+
+    def get_simulations_by_rowid(self, row_ids):
+        """按 simulations.id 批量获取仿真及其最新结果
+
+        Returns:
+            dict: simulations.id -> {sim_id, geometry_file, analysis_type, status, timestamp,
+                  max_stress, mean_stress, max_displacement, volume}
+        """
+        row_ids = [int(i) for i in row_ids]
+        if not row_ids:
+            return {}
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+
+            # json_each 展开 id 列表：SQL 文本固定，不受 IN (?, ?, ...) 个数影响
+            cursor.execute('''
+                SELECT s.id, s.sim_id, s.geometry_file, s.analysis_type, s.status, s.timestamp,
+                       r.max_stress, r.mean_stress, r.max_displacement, r.volume
+                FROM json_each(?) ids
+                JOIN simulations s ON s.id = ids.value
+                LEFT JOIN results r ON r.id = (SELECT MAX(id) FROM results WHERE sim_id = s.sim_id)
+            ''', (json.dumps(row_ids),))
+            rows = cursor.fetchall()
+
+        columns = ('sim_id', 'geometry_file', 'analysis_type', 'status', 'timestamp',
+                   'max_stress', 'mean_stress', 'max_displacement', 'volume')
+        return {row[0]: dict(zip(columns, row[1:])) for row in rows}
+    
     def find_similar_simulations(self, geometry_hash: str, top_k: int = 5):
         """查找相似的历史仿真"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT s.sim_id, s.geometry_file, s.timestamp,
-                   r.max_stress, r.mean_stress, r.max_displacement
-            FROM simulations s
-            LEFT JOIN results r ON s.sim_id = r.sim_id
-            WHERE s.geometry_hash = ? AND s.status = 'completed'
-            ORDER BY s.timestamp DESC
-            LIMIT ?
-        ''', (geometry_hash, top_k))
-        
-        results = cursor.fetchall()
-        conn.close()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT s.sim_id, s.geometry_file, s.timestamp,
+                       r.max_stress, r.mean_stress, r.max_displacement
+                FROM simulations s
+                LEFT JOIN results r ON s.sim_id = r.sim_id
+                WHERE s.geometry_hash = ? AND s.status = 'completed'
+                ORDER BY s.timestamp DESC
+                LIMIT ?
+            ''', (geometry_hash, top_k))
+            
+            results = cursor.fetchall()
         
         return results
     
     def get_statistics(self):
         """获取统计信息"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        stats = {}
-        
-        # 总仿真数
-        cursor.execute("SELECT COUNT(*) FROM simulations")
-        stats['total_simulations'] = cursor.fetchone()[0]
-        
-        # 成功率
-        cursor.execute("SELECT COUNT(*) FROM simulations WHERE status='completed'")
-        stats['successful_simulations'] = cursor.fetchone()[0]
-        
-        # 平均耗时
-        cursor.execute("SELECT AVG(duration) FROM simulations WHERE duration IS NOT NULL")
-        stats['avg_duration'] = cursor.fetchone()[0]
-        
-        # 按类型统计
-        cursor.execute('''
-            SELECT analysis_type, COUNT(*) 
-            FROM simulations 
-            GROUP BY analysis_type
-        ''')
-        stats['by_type'] = dict(cursor.fetchall())
-        
-        conn.close()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            stats = {}
+            
+            # 总仿真数
+            cursor.execute("SELECT COUNT(*) FROM simulations")
+            stats['total_simulations'] = cursor.fetchone()[0]
+            
+            # 成功率
+            cursor.execute("SELECT COUNT(*) FROM simulations WHERE status='completed'")
+            stats['successful_simulations'] = cursor.fetchone()[0]
+            
+            # 平均耗时
+            cursor.execute("SELECT AVG(duration) FROM simulations WHERE duration IS NOT NULL")
+            stats['avg_duration'] = cursor.fetchone()[0]
+            
+            # 按类型统计
+            cursor.execute('''
+                SELECT analysis_type, COUNT(*) 
+                FROM simulations 
+                GROUP BY analysis_type
+            ''')
+            stats['by_type'] = dict(cursor.fetchall())
         
         return stats
     
@@ -301,8 +712,4 @@ class SimulationDataCollector:
     
     def _hash_file(self, filepath: str) -> str:
         """计算文件哈希"""
-        hasher = hashlib.md5()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hasher.update(chunk)
-        return hasher.hexdigest()
\ No newline at end of file
+        return hash_file(filepath)
\ No newline at end of file
@@ -0,0 +1,107 @@
+# server/mesh_cache.py
+"""
+网格缓存
+按几何文件内容哈希 + 归一化网格参数寻址，命中时直接返回已有的 .msh
+和统计信息，不再调用 gmsh。MCP 服务器、MeshGenerationService 和 Celery
+网格任务共用同一份实现和同一个缓存目录（MESH_CACHE_DIR，缺省 DEFAULT_CACHE_DIR）。
+缓存不可用（目录无写权限、索引损坏等）时各入口捕获 CACHE_ERRORS，按不使用缓存继续。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+from services.content_cache import CACHE_ERRORS, ContentCache
+
+DEFAULT_CACHE_DIR = '/data/mesh_cache'
+
+__all__ = ['CACHE_ERRORS', 'DEFAULT_CACHE_DIR', 'MeshCache', 'default_cache_dir', 'get_mesh_cache']
+
+
+def default_cache_dir():
+    """所有入口共用的缓存目录"""
+    return os.environ.get('MESH_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+class MeshCache(ContentCache):
+    """内容寻址的网格缓存，按最近最少使用（LRU）和总大小淘汰（索引与淘汰见 ContentCache）"""
+
+    SUFFIX = '.msh'
+    EXTRA_COLUMNS = '''
+                params TEXT,
+                stats TEXT,'''
+
+    def __init__(self, cache_dir=None, max_bytes=None, max_entries=None):
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('MESH_CACHE_MAX_MB', 10240)) * 1024 * 1024
+        if max_entries is None:
+            max_entries = int(os.environ.get('MESH_CACHE_MAX_ENTRIES', 10000))
+        super().__init__(cache_dir, max_bytes, max_entries)
+
+    @staticmethod
+    def normalize_params(params: dict) -> dict:
+        """归一化网格参数：数值统一精度，缺省值显式写出，保证同义参数得到同一个键"""
+        params = params or {}
+
+        def _num(value):
+            return None if value is None else float(f"{float(value):.6g}")
+
+        return {
+            'dim': int(params.get('dim', 3)),
+            'clmax': _num(params.get('clmax')),
+            'clmin': _num(params.get('clmin')),
+            'algorithm': str(params.get('algorithm', 'auto')).lower(),
+            'optimize': bool(params.get('optimize', False)),
+        }
+
+    def key_for(self, geometry_file: str, params: dict) -> str:
+        """计算缓存键：几何内容哈希 + 归一化参数"""
+        normalized = json.dumps(self.normalize_params(params), sort_keys=True)
+        content = f"{self._geometry_hash(geometry_file)}:{normalized}"
+        return hashlib.md5(content.encode()).hexdigest()
+
+    def get(self, key: str, output_file: str = None):
+        """查询缓存；命中时把网格复制到 output_file 并返回 {'mesh_file', 'stats'}"""
+        hit = self._lookup(key, 'stats')
+        if hit is None:
+            return None
+        row, entry = hit
+
+        mesh_file = str(entry)
+        if output_file and os.path.abspath(output_file) != os.path.abspath(mesh_file):
+            Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(mesh_file, output_file)
+            mesh_file = output_file
+
+        return {
+            'mesh_file': mesh_file,
+            'stats': json.loads(row[0]) if row[0] else None
+        }
+
+    def put(self, key: str, mesh_file: str, stats=None, params: dict = None):
+        """写入缓存（原子替换），然后按容量淘汰"""
+        tmp = self._tmp_path(key)
+        shutil.copyfile(mesh_file, tmp)
+        os.replace(tmp, self._entry_path(key))
+        self._record(key, {
+            'params': json.dumps(self.normalize_params(params), sort_keys=True) if params else None,
+            'stats': json.dumps(stats, ensure_ascii=False) if stats is not None else None,
+        })
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_mesh_cache(cache_dir=None) -> MeshCache:
+    """进程内共享的默认缓存实例"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None or (cache_dir and Path(cache_dir) != _default_cache.cache_dir):
+            _default_cache = MeshCache(cache_dir)
+        return _default_cache
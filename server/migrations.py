@@ -0,0 +1,146 @@
+# server/migrations.py
+"""
+仿真数据库的模式迁移
+基础表由 SimulationDataCollector._init_database 创建（版本 0），之后的变更按版本号
+顺序登记在 MIGRATIONS 中，已应用的版本记录在 PRAGMA user_version：
+每个迁移与版本号更新在同一个写事务里完成，多个 worker 同时启动时只会执行一次。
+迁移步骤可以是 SQL 语句，也可以是接收连接的函数（需要在 Python 中转换数据时）
+"""
+
+import numpy as np
+
+# 几何特征向量统一存为 little-endian float32
+FEATURE_DTYPE = '<f4'
+
+# 刷新 training_view 中一条仿真记录：参数按写入顺序拼接，网格和结果取最后写入的一条
+_TRAINING_VIEW_SELECT = '''
+    SELECT s.id, s.sim_id, s.analysis_type,
+           (SELECT GROUP_CONCAT(gp.param_name || ':' || gp.param_value)
+              FROM geometry_params gp WHERE gp.sim_id = s.sim_id),
+           mp.num_elements, mp.clmax, mp.clmin,
+           r.max_stress, r.mean_stress, r.max_displacement, r.volume
+    FROM simulations s
+    LEFT JOIN mesh_params mp ON mp.id = (SELECT MAX(id) FROM mesh_params WHERE sim_id = s.sim_id)
+    LEFT JOIN results r ON r.id = (SELECT MAX(id) FROM results WHERE sim_id = s.sim_id)
+    WHERE s.status = 'completed'
+'''
+
+_TRAINING_VIEW_REFRESH = '''
+    INSERT OR REPLACE INTO training_view (id, sim_id, analysis_type, params,
+                                          num_elements, clmax, clmin,
+                                          max_stress, mean_stress, max_displacement, volume)
+''' + _TRAINING_VIEW_SELECT
+
+
+def _refresh_trigger(name, event, sim_id):
+    """写入子表或仿真完成时，重算对应 sim_id 的一行"""
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS {name} {event}
+        BEGIN
+            {_TRAINING_VIEW_REFRESH} AND s.sim_id = {sim_id};
+        END
+    '''
+
+
+def _geometry_features_float32(conn):
+    """旧版按 ndarray.tobytes() 原样存储（通常为 float64），统一转换为 float32"""
+    cursor = conn.execute('SELECT id, feature_vector, feature_dim FROM geometry_features')
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        updates = [(np.frombuffer(blob, dtype='<f8').astype(FEATURE_DTYPE).tobytes(), row_id)
+                   for row_id, blob, dim in rows if dim and len(blob) == dim * 8]
+        conn.executemany('UPDATE geometry_features SET feature_vector = ? WHERE id = ?', updates)
+
+
+MIGRATIONS = [
+    (1, '索引：子表按 sim_id 关联，仿真表按哈希/状态/类型过滤', [
+        'CREATE INDEX IF NOT EXISTS idx_geometry_params_sim ON geometry_params(sim_id)',
+        'CREATE INDEX IF NOT EXISTS idx_mesh_params_sim ON mesh_params(sim_id)',
+        'CREATE INDEX IF NOT EXISTS idx_results_sim ON results(sim_id)',
+        'CREATE INDEX IF NOT EXISTS idx_geometry_features_sim ON geometry_features(sim_id)',
+        'CREATE INDEX IF NOT EXISTS idx_simulations_hash ON simulations(geometry_hash, status, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_simulations_status_type ON simulations(status, analysis_type)',
+        'CREATE INDEX IF NOT EXISTS idx_simulations_type ON simulations(analysis_type)',
+        'CREATE INDEX IF NOT EXISTS idx_solver_runs_nodes ON solver_runs(status, num_nodes)',
+    ]),
+    (2, '物化训练视图 training_view，由触发器随结果写入增量维护', [
+        '''
+        CREATE TABLE IF NOT EXISTS training_view (
+            id INTEGER PRIMARY KEY,
+            sim_id TEXT UNIQUE NOT NULL,
+            analysis_type TEXT,
+            params TEXT,
+            num_elements INTEGER,
+            clmax REAL,
+            clmin REAL,
+            max_stress REAL,
+            mean_stress REAL,
+            max_displacement REAL,
+            volume REAL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_training_view_type ON training_view(analysis_type, id)',
+        _refresh_trigger('trg_training_view_sim_insert',
+                         "AFTER INSERT ON simulations WHEN NEW.status = 'completed'", 'NEW.sim_id'),
+        _refresh_trigger('trg_training_view_sim_complete',
+                         "AFTER UPDATE OF status, analysis_type ON simulations WHEN NEW.status = 'completed'",
+                         'NEW.sim_id'),
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_training_view_sim_reopen
+        AFTER UPDATE OF status ON simulations WHEN NEW.status IS NOT 'completed'
+        BEGIN
+            DELETE FROM training_view WHERE sim_id = OLD.sim_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_training_view_sim_delete
+        AFTER DELETE ON simulations
+        BEGIN
+            DELETE FROM training_view WHERE sim_id = OLD.sim_id;
+        END
+        ''',
+        # 仿真完成后补写的子表记录（未完成的仿真由上面的触发器在完成时一次算好）
+        _refresh_trigger('trg_training_view_params',
+                         'AFTER INSERT ON geometry_params WHEN EXISTS (SELECT 1 FROM training_view '
+                         'WHERE sim_id = NEW.sim_id)', 'NEW.sim_id'),
+        _refresh_trigger('trg_training_view_mesh',
+                         'AFTER INSERT ON mesh_params WHEN EXISTS (SELECT 1 FROM training_view '
+                         'WHERE sim_id = NEW.sim_id)', 'NEW.sim_id'),
+        _refresh_trigger('trg_training_view_results',
+                         'AFTER INSERT ON results WHEN EXISTS (SELECT 1 FROM training_view '
+                         'WHERE sim_id = NEW.sim_id)', 'NEW.sim_id'),
+        # 回填已有的已完成仿真
+        _TRAINING_VIEW_REFRESH,
+    ]),
+    (3, '几何特征：float32 存储，每个 sim_id 一条（FAISS 索引按 id 高水位增量同步）', [
+        _geometry_features_float32,
+        'DELETE FROM geometry_features WHERE id NOT IN (SELECT MAX(id) FROM geometry_features GROUP BY sim_id)',
+        'DROP INDEX IF EXISTS idx_geometry_features_sim',
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_geometry_features_sim ON geometry_features(sim_id)',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def apply_migrations(conn):
+    """在当前写事务中应用尚未执行的迁移，返回应用的版本号列表"""
+    current = schema_version(conn)
+    applied = []
+    for version, _description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        for statement in statements:
+            if callable(statement):
+                statement(conn)
+            else:
+                conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+        applied.append(version)
+    return applied
@@ -8,8 +8,19 @@ import subprocess
 import sys
 import os
 import glob
+import queue
+import shlex
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# 以脚本方式启动时，确保可以导入项目内的 server 包
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from server.mesh_cache import CACHE_ERRORS, default_cache_dir, get_mesh_cache
+from services.mesh_quality import analyze_mesh
+
 # UTF-8 编码配置
 try:
     sys.stdout.reconfigure(encoding='utf-8')
@@ -30,7 +41,13 @@ CONFIG = {
     "mesh_coarse": 5.0,
     "mesh_fine": 0.5,
     "max_batch_parts": 50,
-    "default_timeout": 600
+    "default_timeout": 600,
+    "max_concurrent_requests": int(os.environ.get("MCP_MAX_CONCURRENT_REQUESTS", 4)),
+    "use_session_pool": os.environ.get("MCP_USE_SESSION_POOL", "1") != "0",
+    "session_pool_size": int(os.environ.get("MCP_SESSION_POOL_SIZE", 4)),
+    "batch_workers": int(os.environ.get("MCP_BATCH_WORKERS", 4)),
+    "batch_part_timeout": 600,
+    "mesh_cache_dir": default_cache_dir()
 }
 
 # 安全黑名单
@@ -42,15 +59,75 @@ def log(msg):
     sys.stderr.write(f"[MCP] {msg}\n")
     sys.stderr.flush()
 
+# stdout 只能有一个写者，多个工作线程的响应通过这把锁串行输出
+_send_lock = threading.Lock()
+
 def send(obj):
     """发送 JSON-RPC 响应"""
+    ctx = current_request()
+    if ctx is not None and ctx.cancelled.is_set() and obj.get("id") == ctx.req_id:
+        # 已取消的请求不再回复（MCP 规范要求）
+        log(f"Drop response for cancelled request {ctx.req_id}")
+        return
     try:
         json_str = json.dumps(obj, ensure_ascii=False)
-        sys.stdout.write(json_str + "\n")
-        sys.stdout.flush()
+        with _send_lock:
+            sys.stdout.write(json_str + "\n")
+            sys.stdout.flush()
     except Exception as e:
         log(f"Send error: {e}")
 
+# ==================== 请求上下文与取消 ====================
+
+class RequestContext:
+    """正在执行的请求：记录其启动的 Docker 进程，以便取消时终止"""
+
+    def __init__(self, req_id, progress_token=None):
+        self.req_id = req_id
+        self.progress_token = progress_token
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._jobs = []
+
+    def register(self, job):
+        """登记一个可终止的 Docker 作业；请求已取消时立即终止"""
+        with self._lock:
+            self._jobs.append(job)
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            job.kill()
+
+    def unregister(self, job):
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+    def cancel(self):
+        """取消请求并终止所有在途作业"""
+        with self._lock:
+            self.cancelled.set()
+            jobs = list(self._jobs)
+        for job in jobs:
+            job.kill()
+
+_request_local = threading.local()
+
+def current_request():
+    """当前线程正在处理的请求上下文"""
+    return getattr(_request_local, "ctx", None)
+
+def notify_progress(progress, total=None, message=None):
+    """发送 notifications/progress（仅当调用方提供了 progressToken）"""
+    ctx = current_request()
+    if ctx is None or ctx.progress_token is None or ctx.cancelled.is_set():
+        return
+    params = {"progressToken": ctx.progress_token, "progress": progress}
+    if total is not None:
+        params["total"] = total
+    if message is not None:
+        params["message"] = message
+    send({"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+
 def get_local_path(container_path):
     """容器路径映射到本地路径 - 安全版本"""
     import os
@@ -102,6 +179,238 @@ def is_safe(cmd):
 
     return True, ""
 
+# 递归终止进程树的 shell 函数（容器内执行）
+KILL_TREE_FUNC = "kill_tree() { for c in $(pgrep -P $1); do kill_tree $c; done; kill -TERM $1 2>/dev/null; };"
+
+class DockerJob:
+    """一次 docker exec 调用，可从其他线程终止（包括容器内的进程）"""
+
+    def __init__(self, cmd, workdir):
+        job_file = f"/tmp/mcp_job_{uuid.uuid4().hex}"
+        self.pid_file = f"{job_file}.pid"
+        # 取消标记：取消先于 PID 文件写入时，容器内的 shell 看到标记后不再执行命令
+        self.cancel_file = f"{job_file}.cancel"
+        # 记录容器内 shell 的 PID，取消时按进程树终止；命令结束后自行清理 PID 文件和标记
+        wrapped = (f"echo $$ > {self.pid_file}; "
+                   f"if [ -f {self.cancel_file} ]; then rm -f {self.pid_file} {self.cancel_file}; exit 130; fi; "
+                   f"/bin/bash -c {shlex.quote(cmd)}; "
+                   f"rc=$?; rm -f {self.pid_file} {self.cancel_file}; exit $rc")
+        self.full_cmd = ["docker", "exec", "-w", workdir, DOCKER_CONTAINER_NAME, "/bin/bash", "-c", wrapped]
+        self.proc = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self, timeout):
+        with self._lock:
+            if self.cancelled:
+                # 启动前已被取消，不再启动 docker exec
+                return 130, "", "Cancelled"
+            self.proc = subprocess.Popen(self.full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                         text=True, encoding='utf-8', errors='replace')
+        try:
+            stdout, stderr = self.proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            self.proc.communicate()
+            raise
+        return self.proc.returncode, stdout, stderr
+
+    def kill(self):
+        """终止容器内进程树以及本地 docker 客户端进程
+
+        这里先写取消标记再查 PID 文件，容器内的 shell 先写 PID 文件再查标记，
+        两边至少有一方看到对方：要么按 PID 终止，要么 shell 自行退出，命令不会在取消后继续运行
+        """
+        with self._lock:
+            self.cancelled = True
+            proc = self.proc
+        if proc is None or proc.poll() is not None:
+            return
+        _docker_cleanup(f"{KILL_TREE_FUNC} touch {self.cancel_file}; "
+                        f"if [ -f {self.pid_file} ]; then kill_tree $(cat {self.pid_file}); "
+                        f"rm -f {self.pid_file} {self.cancel_file}; fi")
+        if proc.poll() is None:
+            proc.kill()
+
+def _docker_cleanup(script):
+    """内部维护命令（终止进程、清理 PID 文件），不经过白名单"""
+    try:
+        subprocess.run(["docker", "exec", DOCKER_CONTAINER_NAME, "/bin/bash", "-c", script],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+    except Exception as e:
+        log(f"Cleanup error: {e}")
+
+# ==================== Docker 会话池 ====================
+
+class SessionError(Exception):
+    """会话已失效（docker exec 进程退出或协议错乱）"""
+
+class DockerShellSession:
+    """容器内的长驻 bash 会话
+
+    命令按帧写入 stdin，每帧以随机令牌结尾：stdout 上的令牌行携带退出码，
+    stderr 上的令牌行标记错误输出结束。省去每次调用启动 docker 客户端
+    和附加容器的开销。
+    """
+
+    def __init__(self, container=None):
+        self.container = container or DOCKER_CONTAINER_NAME
+        self.proc = subprocess.Popen(
+            ["docker", "exec", "-i", self.container, "/bin/bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace', bufsize=1)
+        self.alive = True
+        self._out = queue.Queue()
+        self._err = queue.Queue()
+        for stream, q in ((self.proc.stdout, self._out), (self.proc.stderr, self._err)):
+            threading.Thread(target=self._pump, args=(stream, q), daemon=True).start()
+
+        # 握手：取得会话 shell 本身的 PID，取消命令时终止它的子进程
+        try:
+            _, out, _ = self._run_frame("echo $$", timeout=30)
+            self.shell_pid = int(out.strip())
+        except (SessionError, subprocess.TimeoutExpired, ValueError) as e:
+            self.close()
+            raise SessionError(f"Session handshake failed: {e}")
+
+    @staticmethod
+    def _pump(stream, q):
+        for line in stream:
+            q.put(line)
+        q.put(None)  # EOF
+
+    def _read_until(self, q, token, deadline):
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired("session", 0)
+            try:
+                line = q.get(timeout=remaining)
+            except queue.Empty:
+                raise subprocess.TimeoutExpired("session", 0)
+            if line is None:
+                self.alive = False
+                raise SessionError("Session closed")
+            if line.startswith(token):
+                # 去掉帧尾 printf 补上的换行
+                text = "".join(lines)
+                return (text[:-1] if text.endswith("\n") else text), line[len(token):].strip()
+            lines.append(line)
+
+    def _run_frame(self, body, timeout):
+        """在会话 shell 中执行一帧脚本，读取到令牌为止"""
+        if not self.alive:
+            raise SessionError("Session closed")
+        token = f"__MCP_END_{uuid.uuid4().hex}__"
+        frame = f"{body}; printf '\\n{token} %d\\n' $?; printf '\\n{token}\\n' >&2\n"
+        try:
+            self.proc.stdin.write(frame)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.alive = False
+            raise SessionError(f"Session write failed: {e}")
+
+        deadline = time.monotonic() + timeout
+        try:
+            stdout, rc = self._read_until(self._out, token, deadline)
+            stderr, _ = self._read_until(self._err, token, max(deadline, time.monotonic() + 5))
+        except subprocess.TimeoutExpired:
+            # 帧没有读完，会话状态不可信，直接丢弃
+            self.interrupt()
+            self.close()
+            raise
+        return int(rc), stdout, stderr
+
+    def execute(self, cmd, workdir="/app", timeout=None):
+        """执行一条命令，返回 (exit_code, stdout, stderr)"""
+        body = f"cd {shlex.quote(workdir)} && /bin/bash -c {shlex.quote(cmd)} < /dev/null"
+        return self._run_frame(body, timeout or CONFIG["default_timeout"])
+
+    def interrupt(self):
+        """终止会话 shell 当前运行的命令，会话本身保留"""
+        if getattr(self, "shell_pid", None):
+            _docker_cleanup(f"{KILL_TREE_FUNC} for c in $(pgrep -P {self.shell_pid}); do kill_tree $c; done")
+
+    def close(self):
+        self.alive = False
+        if self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=5)
+            except Exception:
+                self.proc.kill()
+
+class DockerSessionPool:
+    """有界的会话池，按需创建会话；池满时由调用方退回一次性 docker exec"""
+
+    def __init__(self, container=None, size=None):
+        self.container = container or DOCKER_CONTAINER_NAME
+        self.size = size or CONFIG["session_pool_size"]
+        self._lock = threading.Lock()
+        self._idle = []
+        self._created = 0
+
+    def acquire(self):
+        """取得空闲会话；无可用会话时返回 None"""
+        with self._lock:
+            while self._idle:
+                session = self._idle.pop()
+                if session.alive:
+                    return session
+                self._created -= 1
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return DockerShellSession(self.container)
+        except Exception as e:
+            log(f"Session start failed: {e}")
+            with self._lock:
+                self._created -= 1
+            return None
+
+    def release(self, session):
+        with self._lock:
+            if session.alive:
+                self._idle.append(session)
+            else:
+                self._created -= 1
+
+    def close(self):
+        with self._lock:
+            sessions, self._idle = self._idle, []
+            self._created -= len(sessions)
+        for session in sessions:
+            session.close()
+
+class SessionJob:
+    """在会话中执行的一次命令，接口与 DockerJob 一致"""
+
+    def __init__(self, session, cmd, workdir):
+        self.session = session
+        self.cmd = cmd
+        self.workdir = workdir
+        self.cancelled = False
+        self._started = False
+        self._lock = threading.Lock()
+
+    def run(self, timeout):
+        with self._lock:
+            if self.cancelled:
+                return 130, "", "Cancelled"
+            self._started = True
+        return self.session.execute(self.cmd, self.workdir, timeout)
+
+    def kill(self):
+        with self._lock:
+            self.cancelled = True
+            started = self._started
+        if started:
+            self.session.interrupt()
+
+_session_pool = DockerSessionPool()
+
 def docker_exec(cmd, workdir="/app", timeout=None):
     """执行 Docker 命令"""
     if timeout is None:
@@ -111,17 +420,31 @@ def docker_exec(cmd, workdir="/app", timeout=None):
     if not safe:
         return f"SECURITY: {msg}", True
     
-    full_cmd = ["docker", "exec", "-w", workdir, DOCKER_CONTAINER_NAME, "/bin/bash", "-c", cmd]
+    ctx = current_request()
+    if ctx is not None and ctx.cancelled.is_set():
+        return "Cancelled", True
+    
+    # 优先复用长驻会话，池满或会话不可用时退回一次性 docker exec
+    session = _session_pool.acquire() if CONFIG["use_session_pool"] else None
+    job = SessionJob(session, cmd, workdir) if session is not None else DockerJob(cmd, workdir)
+    if ctx is not None:
+        ctx.register(job)
     
     try:
-        proc = subprocess.run(full_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                            text=True, encoding='utf-8', errors='replace', timeout=timeout)
-        output = f"EXIT:{proc.returncode}\nOUT:\n{proc.stdout}\nERR:\n{proc.stderr}"
-        return output, proc.returncode != 0
+        returncode, stdout, stderr = job.run(timeout)
+        if ctx is not None and ctx.cancelled.is_set():
+            return "Cancelled", True
+        output = f"EXIT:{returncode}\nOUT:\n{stdout}\nERR:\n{stderr}"
+        return output, returncode != 0
     except subprocess.TimeoutExpired:
         return f"Timeout after {timeout}s", True
     except Exception as e:
         return f"Error: {e}", True
+    finally:
+        if ctx is not None:
+            ctx.unregister(job)
+        if session is not None:
+            _session_pool.release(session)
 
 # ==================== 装配体工具函数 ====================
 
@@ -209,7 +532,7 @@ def split_assembly(step_path, output_dir="/app/parts"):
         "process_log": output
     }
 
-def generate_mesh(part_path, analysis="stress", target_elements=50000):
+def generate_mesh(part_path, analysis="stress", target_elements=50000, timeout=600):
     """生成自适应网格"""
     container_path = part_path if part_path.startswith("/app/") else f"/app/{os.path.basename(part_path)}"
     
@@ -223,21 +546,55 @@ def generate_mesh(part_path, analysis="stress", target_elements=50000):
     
     output_mesh = container_path.replace('.step', '.msh').replace('.stp', '.msh')
     
-    cmd = f"gmsh {container_path} -3 -clmax {clmax} -clmin {clmin} -optimize -o {output_mesh} 2>&1"
-    output, is_err = docker_exec(cmd, timeout=600)
+    # 相同几何 + 相同参数直接复用缓存网格；缓存不可用时照常调用 gmsh
+    cache_params = {"dim": 3, "clmax": clmax, "clmin": clmin, "optimize": True}
+    local_step = get_local_path(container_path)
+    cache = cache_key = hit = None
+    try:
+        if os.path.exists(local_step):
+            cache = get_mesh_cache(CONFIG["mesh_cache_dir"])
+            cache_key = cache.key_for(local_step, cache_params)
+            hit = cache.get(cache_key, get_local_path(output_mesh))
+    except CACHE_ERRORS as e:
+        log(f"Mesh cache unavailable: {e}")
+        cache = cache_key = hit = None
+    if hit:
+        log(f"Mesh cache hit: {container_path}")
+        return {
+            "status": "success",
+            "mesh_file": output_mesh,
+            "params": {"clmax": clmax, "clmin": clmin},
+            "stats": hit["stats"],
+            "cached": True
+        }
+    
+    # stderr 已由 docker_exec 单独收集，不需要 2>&1（重定向也会被 is_safe 拦截）
+    cmd = f"gmsh {container_path} -3 -clmax {clmax} -clmin {clmin} -optimize -o {output_mesh}"
+    output, is_err = docker_exec(cmd, timeout=timeout)
     
     if is_err:
         return {"error": "Mesh failed", "log": output}
     
-    # 获取网格统计
-    info_cmd = f"gmsh {output_mesh} -info 2>&1 | grep -E 'nodes|elements' | head -10"
-    info, _ = docker_exec(info_cmd, timeout=30)
+    # 直接解析本地 .msh 获取网格统计和质量，不再启动第二个 gmsh 进程
+    local_mesh = get_local_path(output_mesh)
+    try:
+        stats = analyze_mesh(local_mesh)
+    except (OSError, ValueError) as e:
+        log(f"Mesh statistics failed: {e}")
+        stats = None
+    
+    if cache_key and stats is not None:
+        try:
+            cache.put(cache_key, local_mesh, stats, cache_params)
+        except CACHE_ERRORS as e:
+            log(f"Mesh cache write failed: {e}")
     
     return {
         "status": "success",
         "mesh_file": output_mesh,
         "params": {"clmax": clmax, "clmin": clmin},
-        "stats": info
+        "stats": stats,
+        "cached": False
     }
 
 def create_calculix_inp(mesh_file, analysis="stress", material="steel"):
@@ -292,8 +649,27 @@ S, E
         "note": "请修改 BOUNDARY 和 CLOAD 部分定义实际的边界条件和载荷"
     }
 
-def batch_process(parts_dir="/app/parts", analysis="stress"):
-    """批量处理零件"""
+def _mesh_part(ctx, step_file, analysis, timeout):
+    """批量任务中的单个零件，异常只影响该零件"""
+    # 工作线程继承请求上下文，取消请求时同样能终止该零件的 Docker 作业
+    _request_local.ctx = ctx
+    rel_path = os.path.relpath(step_file, LOCAL_WORK_DIR)
+    container_path = f"/app/{rel_path}".replace(os.sep, '/')
+    try:
+        result = generate_mesh(container_path, analysis, timeout=timeout)
+        return {
+            "part": rel_path,
+            "status": result.get("status", "error"),
+            "mesh": result.get("mesh_file", "N/A"),
+            "error": result.get("error")
+        }
+    except Exception as e:
+        return {"part": rel_path, "status": "error", "mesh": "N/A", "error": str(e)}
+    finally:
+        _request_local.ctx = None
+
+def batch_process(parts_dir="/app/parts", analysis="stress", workers=None, part_timeout=None):
+    """批量处理零件（并行）"""
     local_dir = get_local_path(parts_dir)
     if not os.path.exists(local_dir):
         return {"error": f"Directory not found: {local_dir}"}
@@ -304,23 +680,35 @@ def batch_process(parts_dir="/app/parts", analysis="stress"):
     if not step_files:
         return {"error": "No STEP files found"}
     
-    results = []
-    for i, step_file in enumerate(step_files[:CONFIG["max_batch_parts"]], 1):
-        rel_path = os.path.relpath(step_file, LOCAL_WORK_DIR)
-        container_path = f"/app/{rel_path}".replace(os.sep, '/')
-        
-        log(f"Processing {i}/{len(step_files)}: {rel_path}")
-        result = generate_mesh(container_path, analysis)
-        
-        results.append({
-            "part": rel_path,
-            "status": result.get("status", "error"),
-            "mesh": result.get("mesh_file", "N/A")
-        })
+    parts = step_files[:CONFIG["max_batch_parts"]]
+    workers = max(1, int(workers or CONFIG["batch_workers"]))
+    part_timeout = part_timeout or CONFIG["batch_part_timeout"]
+    ctx = current_request()
+    
+    log(f"Batch meshing {len(parts)}/{len(step_files)} parts with {workers} workers")
+    results = [None] * len(parts)
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-batch") as pool:
+        futures = {pool.submit(_mesh_part, ctx, f, analysis, part_timeout): i
+                   for i, f in enumerate(parts)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            done += 1
+            log(f"Processed {done}/{len(parts)}: {result['part']} ({result['status']})")
+            # 每个零件完成即推送进度，不必等待整批结束
+            notify_progress(done, len(parts), json.dumps(result, ensure_ascii=False))
+            if ctx is not None and ctx.cancelled.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
     
+    results = [r for r in results if r is not None]
     return {
         "processed": len(results),
         "total": len(step_files),
+        "failed": sum(1 for r in results if r["status"] != "success"),
+        "workers": workers,
         "results": results
     }
 
@@ -445,7 +833,9 @@ def handle_request(req):
                             "type": "object",
                             "properties": {
                                 "parts_dir": {"type": "string", "default": "/app/parts"},
-                                "analysis": {"type": "string", "default": "stress"}
+                                "analysis": {"type": "string", "default": "stress"},
+                                "workers": {"type": "integer", "default": CONFIG["batch_workers"]},
+                                "part_timeout": {"type": "integer", "default": CONFIG["batch_part_timeout"]}
                             }
                         }
                     },
@@ -543,7 +933,12 @@ def handle_request(req):
                 }})
                 
             elif name == "batch_process":
-                result = batch_process(args.get("parts_dir", "/app/parts"), args.get("analysis", "stress"))
+                result = batch_process(
+                    args.get("parts_dir", "/app/parts"),
+                    args.get("analysis", "stress"),
+                    args.get("workers"),
+                    args.get("part_timeout")
+                )
                 send({"jsonrpc": "2.0", "id": req_id, "result": {
                     "content": [{"type": "text", "text": json.dumps(result, indent=2, ensure_ascii=False)}],
                     "isError": "error" in result
@@ -573,6 +968,63 @@ def handle_request(req):
     elif method == "ping":
         send({"jsonrpc": "2.0", "id": req_id, "result": {}})
 
+# ==================== 并发调度 ====================
+
+class RequestDispatcher:
+    """并发请求调度器
+
+    tools/call 提交到有界线程池并发执行；initialize、tools/list、ping 等
+    轻量请求以及取消通知在读取线程中立即处理。
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or CONFIG["max_concurrent_requests"]
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="mcp-worker")
+        self._lock = threading.Lock()
+        self._active = {}
+
+    def dispatch(self, req):
+        method = req.get("method")
+
+        if method == "notifications/cancelled":
+            params = req.get("params", {})
+            self.cancel(params.get("requestId"), params.get("reason"))
+        elif method == "tools/call" and req.get("id") is not None:
+            meta = req.get("params", {}).get("_meta", {})
+            ctx = RequestContext(req["id"], meta.get("progressToken"))
+            with self._lock:
+                self._active[ctx.req_id] = ctx
+            self._executor.submit(self._run, ctx, req)
+        else:
+            handle_request(req)
+
+    def _run(self, ctx, req):
+        _request_local.ctx = ctx
+        try:
+            if ctx.cancelled.is_set():
+                return
+            handle_request(req)
+        except Exception as e:
+            log(f"Worker error: {e}")
+        finally:
+            _request_local.ctx = None
+            with self._lock:
+                self._active.pop(ctx.req_id, None)
+
+    def cancel(self, req_id, reason=None):
+        """取消在途请求（notifications/cancelled）"""
+        with self._lock:
+            ctx = self._active.get(req_id)
+        if ctx is None:
+            log(f"Cancel ignored, request {req_id} not in flight")
+            return
+        log(f"Cancelling request {req_id}: {reason or 'no reason'}")
+        ctx.cancel()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
 # ==================== 主程序 ====================
 
 if __name__ == "__main__":
@@ -580,16 +1032,24 @@ if __name__ == "__main__":
     log(f"Work dir: {LOCAL_WORK_DIR}")
     log(f"Container: {DOCKER_CONTAINER_NAME}")
     
+    dispatcher = RequestDispatcher()
+    log(f"Max concurrent requests: {dispatcher.max_workers}")
+    
     try:
         for line in sys.stdin:
             if not line.strip():
                 continue
             try:
                 request = json.loads(line)
-                handle_request(request)
+                dispatcher.dispatch(request)
             except json.JSONDecodeError as e:
                 log(f"JSON decode error: {e}")
+        # stdin 关闭后等待在途请求完成
+        dispatcher.shutdown(wait=True)
     except KeyboardInterrupt:
         log("Server stopped by user")
+        dispatcher.shutdown(wait=False)
     except Exception as e:
-        log(f"Fatal error: {e}")
\ No newline at end of file
+        log(f"Fatal error: {e}")
+    finally:
+        _session_pool.close()
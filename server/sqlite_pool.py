@@ -0,0 +1,139 @@
+# server/sqlite_pool.py
+"""
+SQLite 连接池
+同一进程内按数据库路径共享一组长连接：WAL 日志模式让读写互不阻塞，
+busy_timeout 让并发写入排队等待而不是立即报 "database is locked"，
+每个连接保留已编译语句的缓存（cached_statements），相同 SQL 不再重复解析。
+写事务使用 BEGIN IMMEDIATE，避免读锁升级为写锁时的死锁。
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """线程安全的 SQLite 连接池"""
+
+    def __init__(self, db_path, max_size=None, busy_timeout=None, cached_statements=256):
+        if max_size is None:
+            max_size = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+        if busy_timeout is None:
+            busy_timeout = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+
+        self.db_path = db_path
+        self.max_size = max_size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """（重新）初始化池状态；fork 后的子进程不能复用父进程的连接"""
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._all = []
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _create(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,          # 自动提交，事务由 transaction() 显式控制
+            check_same_thread=False,       # 连接在池中跨线程复用，同一时刻只属于一个线程
+            cached_statements=self.cached_statements
+        )
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def _acquire(self, timeout=None):
+        self._check_fork()
+        if not self._slots.acquire(timeout=timeout if timeout is not None else self.busy_timeout):
+            raise sqlite3.OperationalError(f"Connection pool exhausted ({self.max_size} connections)")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self._create()
+            except BaseException:
+                self._slots.release()
+                raise
+
+    def _release(self, conn, broken=False):
+        if broken:
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接（自动提交模式，适合只读查询）"""
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            broken = not isinstance(e, (sqlite3.IntegrityError, sqlite3.OperationalError))
+            raise
+        finally:
+            if conn.in_transaction and not broken:
+                conn.rollback()
+            self._release(conn, broken)
+
+    @contextmanager
+    def transaction(self):
+        """借出连接并开启写事务（BEGIN IMMEDIATE），正常退出时提交，异常时回滚"""
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close(self):
+        """关闭池中所有连接"""
+        with self._lock:
+            conns, self._all = self._all, []
+        if self._pid != os.getpid():
+            return
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._idle = queue.LifoQueue()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, **kwargs) -> ConnectionPool:
+    """按数据库路径共享的进程内连接池"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, **kwargs)
+        return pool
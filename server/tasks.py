@@ -7,10 +7,18 @@ from celery import Celery
 import os
 import subprocess
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 import logging
 
+from server.mesh_cache import CACHE_ERRORS, get_mesh_cache
+from services.mesh_quality import analyze_mesh
+from services.frd_reader import extract_key_results
+from services.result_store import convert_frd
+from services.solve_scheduler import get_solve_scheduler
+from services.solve_estimator import get_solve_time_estimator, sjf_priority
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,7 +41,13 @@ celery.conf.update(
     task_time_limit=30 * 60,  # 30分钟超时
     task_soft_time_limit=25 * 60,  # 25分钟软超时
     worker_prefetch_multiplier=1,
-    task_acks_late=True
+    task_acks_late=True,
+    # 按预计耗时设置任务优先级（短作业优先），Redis 传输下 0 最先执行
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'queue_order_strategy': 'priority',
+    },
+    task_default_priority=5
 )
 
 @celery.task(bind=True)
@@ -68,6 +82,33 @@ def run_gmsh_meshing(self, geometry_file: str, mesh_params: dict):
         # 生成网格文件名
         mesh_file = output_dir / f"{Path(geometry_file).stem}.msh"
         
+        # 相同几何 + 相同参数直接返回缓存网格；缓存不可用时照常运行 gmsh
+        cache_params = {
+            'dim': 2,
+            'clmax': mesh_params.get('clmax') or None,
+            'clmin': mesh_params.get('clmin') or None,
+        }
+        try:
+            cache = get_mesh_cache()
+            cache_key = cache.key_for(geometry_file, cache_params)
+            hit = cache.get(cache_key, str(mesh_file))
+        except CACHE_ERRORS as e:
+            logger.warning(f"网格缓存不可用: {e}")
+            cache = cache_key = hit = None
+        if hit:
+            logger.info(f"网格缓存命中: {geometry_file}")
+            return {
+                'status': 'success',
+                'mesh_file': str(mesh_file),
+                'mesh_info': {
+                    'file': str(mesh_file),
+                    'size': mesh_file.stat().st_size,
+                    'params': mesh_params,
+                    'stats': hit['stats']
+                },
+                'cached': True
+            }
+        
         # 构建Gmsh命令
         cmd = [
             'gmsh', geometry_file,
@@ -101,9 +142,16 @@ def run_gmsh_meshing(self, geometry_file: str, mesh_params: dict):
         mesh_info = {
             'file': str(mesh_file),
             'size': mesh_file.stat().st_size if mesh_file.exists() else 0,
-            'params': mesh_params
+            'params': mesh_params,
+            'stats': analyze_mesh(str(mesh_file)) if mesh_file.exists() else None
         }
         
+        if cache_key and mesh_file.exists():
+            try:
+                cache.put(cache_key, str(mesh_file), mesh_info['stats'], cache_params)
+            except CACHE_ERRORS as e:
+                logger.warning(f"网格缓存写入失败: {e}")
+        
         self.update_state(
             state='PROGRESS',
             meta={'current': 100, 'total': 100, 'status': '完成'}
@@ -114,7 +162,8 @@ def run_gmsh_meshing(self, geometry_file: str, mesh_params: dict):
         return {
             'status': 'success',
             'mesh_file': str(mesh_file),
-            'mesh_info': mesh_info
+            'mesh_info': mesh_info,
+            'cached': False
         }
         
     except Exception as e:
@@ -172,38 +221,71 @@ def run_calculix_simulation(self, mesh_file: str, simulation_params: dict):
         ccx_input_file = work_dir / "simulation.inp"
         create_calculix_input(inp_file, ccx_input_file, simulation_params)
         
+        # 估算求解时间，供 get_task_status 计算 ETA
+        try:
+            estimate = get_solve_time_estimator().estimate_inp(ccx_input_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"求解时间估算失败: {e}")
+            estimate = {'estimated_seconds': None}
+        
         self.update_state(
             state='PROGRESS',
-            meta={'current': 50, 'total': 100, 'status': '运行CalculiX...'}
+            meta={'current': 50, 'total': 100, 'status': '运行CalculiX...',
+                  'estimated_seconds': estimate['estimated_seconds'],
+                  'solve_started_at': time.time()}
         )
         
-        # 运行CalculiX
+        # 运行CalculiX（线程数按模型规模分配，与其他求解共享容器的 CPU 槽位）
+        scheduler = get_solve_scheduler()
+        plan = scheduler.plan(ccx_input_file)
         ccx_cmd = ['ccx', '-i', str(ccx_input_file.with_suffix(''))]
-        result = subprocess.run(
-            ccx_cmd,
-            cwd=work_dir,
-            capture_output=True,
-            text=True,
-            timeout=1800  # 30分钟超时
-        )
+        with scheduler.reserve(plan):
+            start = time.time()
+            try:
+                result = subprocess.run(
+                    ccx_cmd,
+                    cwd=work_dir,
+                    capture_output=True,
+                    text=True,
+                    env={**os.environ, **plan.env()},
+                    timeout=1800  # 30分钟超时
+                )
+            except subprocess.TimeoutExpired:
+                scheduler.record(plan, time.time() - start, 'timeout')
+                raise
+            scheduler.record(plan, time.time() - start,
+                             'completed' if result.returncode == 0 else 'failed')
         
         if result.returncode != 0:
             raise RuntimeError(f"CalculiX仿真失败: {result.stderr}")
         
         # 处理结果
         results = process_calculix_results(work_dir)
+        if results.get('success') is False:
+            raise RuntimeError(results['error'])
         
         self.update_state(
             state='PROGRESS',
             meta={'current': 100, 'total': 100, 'status': '处理结果...'}
         )
         
+        # 结果转换为列存储，可视化端直接 memmap 打开
+        result_store = None
+        frd_file = work_dir / "simulation.frd"
+        if frd_file.exists():
+            try:
+                result_store = str(convert_frd(frd_file).root)
+            except (OSError, ValueError) as e:
+                logger.warning(f"结果存储转换失败: {e}")
+        
         logger.info(f"仿真完成: {mesh_file}")
         
         return {
             'status': 'success',
             'results': results,
-            'work_dir': str(work_dir)
+            'work_dir': str(work_dir),
+            'result_store': result_store,
+            'solver_plan': plan.to_dict()
         }
         
     except Exception as e:
@@ -349,7 +431,7 @@ def create_calculix_input(mesh_file, output_file, params):
     with open(output_file, 'w') as f:
         f.write("*HEADING\n")
         f.write(f"Simulation job - {datetime.now()}\n")
-        f.write("*INCLUDE, INPUT={mesh_file.name}\n")
+        f.write(f"*INCLUDE, INPUT={Path(mesh_file).name}\n")
         # 添加材料属性、边界条件、载荷等
         f.write("*MATERIAL, NAME=STEEL\n")
         f.write("*ELASTIC\n")
@@ -357,7 +439,10 @@ def create_calculix_input(mesh_file, output_file, params):
         # ... 更多输入文件内容
 
 def process_calculix_results(work_dir):
-    """处理CalculiX结果"""
+    """处理CalculiX结果：流式读取 simulation.frd，提取 von Mises 应力和位移统计
+
+    结果文件无法解析时返回 {'success': False, 'error': ...}
+    """
     results = {
         'max_stress': 0.0,
         'min_stress': 0.0,
@@ -367,8 +452,21 @@ def process_calculix_results(work_dir):
         'mass': 0.0
     }
     
-    # 这里应该实现实际的结果处理逻辑
-    # 读取.frd文件并提取结果
+    frd_file = Path(work_dir) / "simulation.frd"
+    if not frd_file.exists():
+        logger.warning(f"结果文件不存在: {frd_file}")
+        return results
+    
+    try:
+        key_results = extract_key_results(str(frd_file))
+    except (OSError, ValueError) as e:
+        # 结果文件截断或格式不支持
+        logger.error(f"结果文件解析失败: {frd_file}: {e}")
+        return {'success': False, 'error': f"结果文件解析失败: {e}"}
+    
+    for key, value in key_results.items():
+        if value is not None:
+            results[key] = value
     
     return results
 
@@ -377,13 +475,42 @@ def get_task_status(task_id):
     from celery.result import AsyncResult
     
     result = AsyncResult(task_id, app=celery)
-    return {
+    status = {
         'task_id': task_id,
         'status': result.state,
         'result': result.result if result.ready() else None,
         'progress': result.info.get('current', 0) if result.info else 0,
         'total': result.info.get('total', 100) if result.info else 100
     }
+    
+    # 求解阶段根据估算耗时给出剩余时间
+    if result.state == 'PROGRESS' and isinstance(result.info, dict):
+        estimated = result.info.get('estimated_seconds')
+        started = result.info.get('solve_started_at')
+        if estimated is not None and started is not None:
+            status['eta_seconds'] = max(0.0, started + estimated - time.time())
+    
+    return status
+
+def submit_simulation(mesh_file, simulation_params, analysis_type='static'):
+    """按预计耗时设置优先级后提交仿真任务（短作业优先）"""
+    try:
+        estimate = get_solve_time_estimator().estimate_mesh(mesh_file, analysis_type)
+    except (OSError, ValueError) as e:
+        logger.warning(f"求解时间估算失败: {e}")
+        estimate = {'estimated_seconds': None}
+    
+    priority = sjf_priority(estimate['estimated_seconds'])
+    result = run_calculix_simulation.apply_async(
+        args=(mesh_file, simulation_params),
+        priority=priority
+    )
+    
+    return {
+        'task_id': result.id,
+        'priority': priority,
+        'estimate': estimate
+    }
 
 def get_job_progress(job_id):
     """获取作业进度"""
@@ -0,0 +1,182 @@
+# server/training_export.py
+"""
+训练数据列式导出
+把 SimulationDataCollector.get_training_columns 的宽表写成 Arrow IPC 或 Parquet，
+可按 analysis_type 分区（hive 目录 analysis_type=<类型>/）。
+未压缩的 Arrow 文件通过内存映射读取，数值列零拷贝转为 NumPy；
+Parquet 更小，适合归档和跨机器传输
+"""
+
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from server.data_collector import FEATURE_COLUMNS, PARAM_PREFIX
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+FORMATS = {
+    'arrow': ('ipc', '.arrow'),
+    'parquet': ('parquet', '.parquet'),
+}
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow not installed. Please install with: pip install pyarrow")
+
+
+def param_columns(names):
+    """列名中的几何参数列（按名称排序）"""
+    return sorted(name for name in names if name.startswith(PARAM_PREFIX))
+
+
+def columns_to_table(columns):
+    """get_training_columns 的结果 -> pyarrow.Table
+
+    num_elements 存为可空 int64，其余数值列为 float64（NaN 记为空值）
+    """
+    _require_pyarrow()
+    arrays = {
+        'sim_id': pa.array(columns['sim_id'], type=pa.string()),
+        'analysis_type': pa.array(columns['analysis_type'], type=pa.string()),
+    }
+    for name, values in columns.items():
+        if name in arrays:
+            continue
+        mask = np.isnan(values)
+        if name == 'num_elements':
+            arrays[name] = pa.array(np.where(mask, 0, values).astype(np.int64), mask=mask)
+        else:
+            arrays[name] = pa.array(values, mask=mask)
+
+    params = param_columns(columns)
+    metadata = {b'geometry_params': json.dumps([p[len(PARAM_PREFIX):] for p in params]).encode()}
+    return pa.table(arrays).replace_schema_metadata(metadata)
+
+
+def export_training_data(collector, path, format='arrow', partition_by_analysis_type=False,
+                         analysis_type=None, limit=None, compression=None):
+    """导出训练数据
+
+    Args:
+        collector: SimulationDataCollector
+        path: 输出文件（不分区）或目录（分区）
+        format: 'arrow'（IPC，未压缩可内存映射）或 'parquet'
+        partition_by_analysis_type: 是否按分析类型写入 hive 分区目录
+        compression: Parquet 压缩算法（默认 zstd）；Arrow 默认不压缩
+
+    Returns:
+        dict: success, path, format, rows, columns, partitions, elapsed
+    """
+    if format not in FORMATS:
+        return {'success': False, 'error': f"Unsupported format: {format} (expected one of {sorted(FORMATS)})"}
+    if not PYARROW_AVAILABLE:
+        return {'success': False, 'error': "pyarrow not installed. Please install with: pip install pyarrow"}
+
+    start = time.perf_counter()
+    table = columns_to_table(collector.get_training_columns(analysis_type, limit))
+    path = Path(path)
+    suffix = FORMATS[format][1]
+
+    try:
+        if partition_by_analysis_type:
+            if format == 'parquet':
+                file_format = ds.ParquetFileFormat()
+                options = file_format.make_write_options(compression=compression or 'zstd')
+            else:
+                file_format = ds.IpcFileFormat()
+                options = file_format.make_write_options(compression=compression)
+            ds.write_dataset(table, path, format=file_format, file_options=options,
+                             partitioning=['analysis_type'], partitioning_flavor='hive',
+                             basename_template='part-{i}' + suffix,
+                             existing_data_behavior='delete_matching')
+            partitions = sorted(set(table.column('analysis_type').to_pylist()), key=str)
+        else:
+            if path.suffix == '':
+                path = path.with_suffix(suffix)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if format == 'parquet':
+                pq.write_table(table, path, compression=compression or 'zstd')
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                with pa.OSFile(str(path), 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                        writer.write_table(table)
+            partitions = None
+    except (OSError, pa.ArrowException) as e:
+        return {'success': False, 'error': str(e)}
+
+    return {
+        'success': True,
+        'path': str(path),
+        'format': format,
+        'rows': table.num_rows,
+        'columns': table.column_names,
+        'partitions': partitions,
+        'elapsed': time.perf_counter() - start
+    }
+
+
+def read_training_table(path, analysis_type=None, columns=None):
+    """读取导出的训练数据为 pyarrow.Table
+
+    单个 .arrow 文件内存映射读取（零拷贝）；目录按 hive 分区读取，
+    指定 analysis_type 时只读取对应分区
+    """
+    _require_pyarrow()
+    path = Path(path)
+    if path.is_file() and path.suffix == '.arrow':
+        with pa.memory_map(str(path), 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if analysis_type is not None:
+            table = table.filter(ds.field('analysis_type') == analysis_type)
+        return table.select(columns) if columns else table
+
+    if path.is_file():
+        dataset = ds.dataset(path, format=FORMATS['parquet'][0])
+    else:
+        fmt = 'parquet' if any(path.rglob('*.parquet')) else 'arrow'
+        dataset = ds.dataset(path, format=FORMATS[fmt][0], partitioning='hive')
+    filter_ = ds.field('analysis_type') == analysis_type if analysis_type is not None else None
+    return dataset.to_table(columns=columns, filter=filter_)
+
+
+def column_array(data, name):
+    """从 pyarrow.Table、pandas.DataFrame 或列字典取出一列 float64 数组（空值为 NaN）
+
+    无空值的单块 float64 Arrow 列直接共享缓冲区，不复制
+    """
+    if PYARROW_AVAILABLE and isinstance(data, pa.Table):
+        column = data.column(name)
+        if column.type != pa.float64():
+            column = column.cast(pa.float64())
+        column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+        return column.to_numpy(zero_copy_only=False)
+    return np.asarray(data[name], dtype=np.float64)
+
+
+def _column_names(data):
+    if PYARROW_AVAILABLE and isinstance(data, pa.Table):
+        return data.column_names
+    return list(data.keys())
+
+
+def training_matrix(data, columns):
+    """若干列拼成 (n, len(columns)) 的 float64 矩阵"""
+    if not columns:
+        return np.empty((len(column_array(data, 'max_stress')), 0))
+    return np.column_stack([column_array(data, name) for name in columns])
+
+
+def feature_columns(data):
+    """代理模型特征列：网格参数 + 按名称排序的几何参数"""
+    return list(FEATURE_COLUMNS) + param_columns(_column_names(data))
@@ -0,0 +1,193 @@
+# services/content_cache.py
+"""
+内容寻址文件缓存的公共部分
+网格缓存（server/mesh_cache.py）和体素缓存（ml/models/voxel_cache.py）共用：
+SQLite 索引（entries 表）、按最近最少使用（LRU）和总大小淘汰、统计与清空，
+以及按 (路径, 大小, mtime) 记忆的文件内容哈希。
+只依赖标准库，ml 侧导入时不会带入 server 包
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# 缓存读写可能抛出的异常：调用方捕获后按未命中 / 不写入处理
+CACHE_ERRORS = (OSError, sqlite3.Error)
+
+# 文件哈希记忆的最大条目数（超出后丢弃最久未用的）
+HASH_MEMO_SIZE = 4096
+
+
+def hash_file(filepath: str) -> str:
+    """文件内容的 MD5（与仿真数据库的 geometry_hash 相同）"""
+    hasher = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentCache:
+    """内容寻址缓存基类
+
+    子类给出条目文件后缀 SUFFIX 和 entries 表的附加列 EXTRA_COLUMNS，
+    读写条目文件后调用 _lookup / _record 维护索引
+    """
+
+    SUFFIX = ''
+    EXTRA_COLUMNS = ''
+
+    def __init__(self, cache_dir, max_bytes, max_entries, hash_memo_size=HASH_MEMO_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.index_path = self.cache_dir / 'index.db'
+
+        # (path, size, mtime) -> md5，避免同一文件重复计算哈希；有界 LRU
+        self._hash_memo = OrderedDict()
+        self._hash_memo_size = hash_memo_size
+        self._memo_lock = threading.Lock()
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._init_index()
+
+    def _connect(self):
+        return sqlite3.connect(str(self.index_path), timeout=30)
+
+    def _init_index(self):
+        """初始化索引表"""
+        conn = self._connect()
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                {self.EXTRA_COLUMNS}
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)')
+        conn.commit()
+        conn.close()
+
+    def _geometry_hash(self, filepath: str) -> str:
+        """几何文件内容哈希（按路径、大小和修改时间记忆）"""
+        st = os.stat(filepath)
+        memo_key = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+        with self._memo_lock:
+            cached = self._hash_memo.get(memo_key)
+            if cached is not None:
+                self._hash_memo.move_to_end(memo_key)
+                return cached
+        cached = hash_file(filepath)
+        with self._memo_lock:
+            self._hash_memo[memo_key] = cached
+            self._hash_memo.move_to_end(memo_key)
+            while len(self._hash_memo) > self._hash_memo_size:
+                self._hash_memo.popitem(last=False)
+        return cached
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}{self.SUFFIX}"
+
+    def _lookup(self, key: str, columns: str):
+        """查询索引并更新访问时间；命中时返回 (columns 对应的行, 条目文件路径)，否则 None"""
+        conn = self._connect()
+        try:
+            row = conn.execute(f'SELECT {columns} FROM entries WHERE key = ?', (key,)).fetchone()
+            entry = self._entry_path(key)
+            if row is None or not entry.exists():
+                if row is not None:
+                    # 索引存在但文件已丢失
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    conn.commit()
+                return None
+
+            conn.execute('UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?',
+                         (time.time(), key))
+            conn.commit()
+        finally:
+            conn.close()
+        return row, entry
+
+    def _tmp_path(self, key: str) -> Path:
+        """写入条目用的临时文件（同目录，os.replace 原子替换）"""
+        entry = self._entry_path(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        return entry.with_name(f'{key}.tmp{os.getpid()}_{threading.get_ident()}{self.SUFFIX}')
+
+    def _record(self, key: str, fields: dict):
+        """条目文件写好后登记到索引（fields 为附加列的值），然后按容量淘汰"""
+        now = time.time()
+        columns = ['key', *fields, 'size', 'created', 'last_access', 'hits']
+        values = [key, *fields.values(), self._entry_path(key).stat().st_size, now, now, 0]
+        conn = self._connect()
+        try:
+            conn.execute(f'INSERT OR REPLACE INTO entries ({", ".join(columns)}) '
+                         f'VALUES ({", ".join("?" * len(columns))})', values)
+            conn.commit()
+            self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        """按 LRU 淘汰，直到总大小和条目数都在限额内"""
+        total_bytes, count = conn.execute('SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries').fetchone()
+        if total_bytes <= self.max_bytes and count <= self.max_entries:
+            return
+
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC'):
+            if total_bytes <= self.max_bytes and count <= self.max_entries:
+                break
+            victims.append(key)
+            total_bytes -= size
+            count -= 1
+
+        conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k in victims])
+        conn.commit()
+        for key in victims:
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _summary(self, extra: str = ''):
+        """COUNT、总大小、总命中数（及 extra 给出的附加聚合列）"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                f'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0){extra} FROM entries'
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def get_statistics(self):
+        """获取缓存统计信息"""
+        count, total_bytes, hits = self._summary()
+        return {
+            'entries': count,
+            'total_mb': round(total_bytes / (1024 * 1024), 2),
+            'max_mb': round(self.max_bytes / (1024 * 1024), 2),
+            'hits': hits
+        }
+
+    def clear(self):
+        """清空缓存"""
+        conn = self._connect()
+        try:
+            keys = [row[0] for row in conn.execute('SELECT key FROM entries')]
+            conn.execute('DELETE FROM entries')
+            conn.commit()
+        finally:
+            conn.close()
+        for key in keys:
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
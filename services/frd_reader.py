@@ -0,0 +1,517 @@
+"""
+CalculiX 结果读取器
+流式解析 .frd 文件（ASCII 定宽格式，二进制格式尽力支持）：节点、单元以及
+各步/增量的节点结果块（DISP / STRESS / TOSTRAIN 等）逐块读入 NumPy 数组，
+按块计算 von Mises、主应力和最小/最大/均值及其所在节点，
+内存峰值以单个结果块为上限
+"""
+
+import numpy as np
+
+from services.msh_reader import NodeIndex
+
+# FRD 单元类型编号 -> (名称, 节点数)
+FRD_ELEMENT_TYPES = {
+    1: ('he8', 8),
+    2: ('pe6', 6),
+    3: ('te4', 4),
+    4: ('he20', 20),
+    5: ('pe15', 15),
+    6: ('te10', 10),
+    7: ('tr3', 3),
+    8: ('tr6', 6),
+    9: ('qu4', 4),
+    10: ('qu8', 8),
+    11: ('be2', 2),
+    12: ('be3', 3),
+}
+
+# 结果块名称 -> 派生量类型
+VECTOR_BLOCKS = ('DISP', 'VELO', 'FORC')
+STRESS_BLOCKS = ('STRESS',)
+STRAIN_BLOCKS = ('TOSTRAIN', 'MESTRAIN', 'STRAIN')
+
+# ASCII 数据按块读取的行数，限制单次解析的内存峰值
+CHUNK_LINES = 1 << 18
+
+# 每行最多的结果分量数（超出部分写在 -2 续行）
+_VALUES_PER_LINE = 6
+_VALUE_WIDTH = 12
+
+_TYPE_NODES = np.zeros(max(FRD_ELEMENT_TYPES) + 1, dtype=np.int64)
+for _type, (_, _nnodes) in FRD_ELEMENT_TYPES.items():
+    _TYPE_NODES[_type] = _nnodes
+
+
+def _id_width(fmt):
+    """节点/单元编号字段宽度：0 为短格式（I5），1 为长格式（I10）"""
+    return 5 if fmt == 0 else 10
+
+
+def von_mises(values):
+    """张量分量 (n, 6)，顺序 XX YY ZZ XY YZ ZX -> von Mises 等效值"""
+    xx, yy, zz, xy, yz, zx = (values[:, i] for i in range(6))
+    return np.sqrt(0.5 * ((xx - yy) ** 2 + (yy - zz) ** 2 + (zz - xx) ** 2) +
+                   3.0 * (xy ** 2 + yz ** 2 + zx ** 2))
+
+
+def principal_values(values):
+    """张量分量 (n, 6) -> 主值 (n, 3)，按从大到小排列"""
+    tensor = np.empty((values.shape[0], 3, 3), dtype=np.float64)
+    tensor[:, 0, 0], tensor[:, 1, 1], tensor[:, 2, 2] = values[:, 0], values[:, 1], values[:, 2]
+    tensor[:, 0, 1] = tensor[:, 1, 0] = values[:, 3]
+    tensor[:, 1, 2] = tensor[:, 2, 1] = values[:, 4]
+    tensor[:, 2, 0] = tensor[:, 0, 2] = values[:, 5]
+    return np.linalg.eigvalsh(tensor)[:, ::-1]
+
+
+class FrdBlock:
+    """一个节点结果块：某一步/增量下的一个物理量"""
+
+    def __init__(self, name, components, step, increment, time, node_ids, values):
+        self.name = name
+        self.components = components    # 分量名列表
+        self.step = step
+        self.increment = increment
+        self.time = time
+        self.node_ids = node_ids          # (n,) int64
+        self.values = values              # (n, len(components)) float64
+
+    def derived(self):
+        """分量及派生量：位移等矢量给出模，应力给出 von Mises 和主应力，应变给出等效应变和主应变"""
+        quantities = {name: self.values[:, i] for i, name in enumerate(self.components)}
+        if self.name in VECTOR_BLOCKS and self.values.shape[1] >= 3:
+            quantities['magnitude'] = np.sqrt(np.einsum('ij,ij->i', self.values[:, :3], self.values[:, :3]))
+        elif self.name in STRESS_BLOCKS + STRAIN_BLOCKS and self.values.shape[1] >= 6:
+            tensor = self.values[:, :6]
+            if self.name in STRESS_BLOCKS:
+                quantities['von_mises'] = von_mises(tensor)
+            else:
+                # 张量应变的 von Mises 等效应变 sqrt(2/3 e':e')
+                quantities['equivalent'] = von_mises(tensor) * (2.0 / 3.0)
+            principal = principal_values(tensor)
+            for i in range(3):
+                quantities[f'principal_{i + 1}'] = principal[:, i]
+        return quantities
+
+    def summary(self, locate=None):
+        """各量的最小/最大/均值及所在节点；locate(node_ids) 给出节点坐标"""
+        result = {
+            'name': self.name,
+            'step': self.step,
+            'increment': self.increment,
+            'time': self.time,
+            'num_nodes': int(self.node_ids.shape[0]),
+            'quantities': {}
+        }
+        if self.node_ids.shape[0] == 0:
+            return result
+
+        for name, values in self.derived().items():
+            i_min, i_max = int(np.argmin(values)), int(np.argmax(values))
+            entry = {
+                'min': float(values[i_min]),
+                'max': float(values[i_max]),
+                'mean': float(values.mean()),
+                'min_node': int(self.node_ids[i_min]),
+                'max_node': int(self.node_ids[i_max]),
+            }
+            if locate is not None:
+                coords = locate(self.node_ids[[i_min, i_max]])
+                if coords is not None:
+                    entry['min_location'] = coords[0].tolist()
+                    entry['max_location'] = coords[1].tolist()
+            result['quantities'][name] = entry
+        return result
+
+
+class FrdResults:
+    """完整读取的结果文件：节点、单元和全部结果块"""
+
+    def __init__(self, node_tags, nodes, element_tags, connectivity, blocks):
+        self.node_tags = node_tags          # (n,) int64
+        self.nodes = nodes                  # (n, 3) float64
+        self.element_tags = element_tags    # {frd_type: (m,) int64}
+        self.connectivity = connectivity    # {frd_type: (m, k) int64 节点编号，FRD 节点顺序}
+        self.blocks = blocks
+        self._index = None
+
+    @property
+    def num_nodes(self):
+        return int(self.node_tags.shape[0])
+
+    @property
+    def num_elements(self):
+        return int(sum(tags.shape[0] for tags in self.element_tags.values()))
+
+    def node_rows(self, tags):
+        if self._index is None:
+            self._index = NodeIndex(self.node_tags)
+        return self._index.rows(tags)
+
+    def steps(self):
+        """所有 (step, increment) 组合，按出现顺序"""
+        seen = []
+        for block in self.blocks:
+            key = (block.step, block.increment)
+            if key not in seen:
+                seen.append(key)
+        return seen
+
+    def get(self, name, step=None, increment=None):
+        """按名称取结果块；不指定步/增量时返回最后一个"""
+        matches = [b for b in self.blocks if b.name == name and
+                   (step is None or b.step == step) and
+                   (increment is None or b.increment == increment)]
+        return matches[-1] if matches else None
+
+    def nodal_field(self, name, step=None, increment=None):
+        """按节点顺序对齐的结果数组 (n, k)，无结果的节点为 NaN"""
+        block = self.get(name, step, increment)
+        if block is None:
+            return None
+        field = np.full((self.num_nodes, block.values.shape[1]), np.nan)
+        field[self.node_rows(block.node_ids)] = block.values
+        return field
+
+
+class FrdReader:
+    """按记录流式读取 .frd 文件
+
+    节点和单元段读完后保存在 reader 上，结果块通过 blocks() 逐个产出，
+    调用方处理完即可丢弃，不会同时持有整份文件的数据
+    """
+
+    def __init__(self, path, fields=None, read_elements=True):
+        self.path = path
+        self.fields = set(fields) if fields else None
+        self.read_elements = read_elements
+        self.f = open(path, 'rb')
+        self.node_format = 1
+        self.node_tags = np.empty(0, dtype=np.int64)
+        self.nodes = np.empty((0, 3), dtype=np.float64)
+        self.elements = {}
+        self.step = None
+        self.increment = None
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def node_rows(self, tags):
+        if self._index is None:
+            self._index = NodeIndex(self.node_tags)
+        return self._index.rows(tags)
+
+    def locate(self, node_ids):
+        """节点编号 -> 坐标；节点段缺失时返回 None"""
+        if self.node_tags.shape[0] == 0:
+            return None
+        return self.nodes[self.node_rows(node_ids)]
+
+    def element_arrays(self):
+        """{frd_type: 单元编号}, {frd_type: 连接关系}"""
+        element_tags = {}
+        connectivity = {}
+        for elem_type, parts in self.elements.items():
+            element_tags[elem_type] = np.concatenate([p[0] for p in parts])
+            connectivity[elem_type] = np.concatenate([p[1] for p in parts])
+        return element_tags, connectivity
+
+    # ---------- 基础读取 ----------
+
+    def _line(self):
+        line = self.f.readline()
+        if not line:
+            raise ValueError("Unexpected end of file")
+        return line
+
+    def _binary(self, dtype, count):
+        dtype = np.dtype(dtype)
+        data = self.f.read(dtype.itemsize * count)
+        if len(data) != dtype.itemsize * count:
+            raise ValueError("Unexpected end of binary data")
+        return np.frombuffer(data, dtype=dtype, count=count)
+
+    def _skip_block(self):
+        """跳到本段的 -3 结束记录"""
+        while not self._line().startswith(b' -3'):
+            pass
+
+    def _skip_end_marker(self):
+        """二进制数据之后可能跟一行 -3，有则跳过"""
+        pos = self.f.tell()
+        line = self.f.readline()
+        if not line.startswith(b' -3'):
+            self.f.seek(pos)
+
+    def _fixed_records(self, count, id_width, ncomp):
+        """读取 count 条定宽记录：' -1' + 编号 + ncomp 个 E12.5 值（每行 6 个，多余写在 -2 续行）
+
+        Returns:
+            (ids (count,) int64, values (count, ncomp) float64)
+        """
+        per_line = [min(_VALUES_PER_LINE, ncomp - i) for i in range(0, max(ncomp, 1), _VALUES_PER_LINE)]
+        widths = [3 + id_width + _VALUE_WIDTH * n for n in per_line]
+        fields = [('key', 'S3'), ('id', f'S{id_width}')]
+        for j, n in enumerate(per_line):
+            if j > 0:
+                fields.append((f'key{j}', f'S{3 + id_width}'))
+            if n:
+                fields.append((f'v{j}', f'S{_VALUE_WIDTH}', (n,)))
+            fields.append((f'eol{j}', 'S1'))
+        record = np.dtype(fields)
+        nlines = len(per_line)
+
+        ids_parts, value_parts = [], []
+        remaining = count
+        while remaining > 0:
+            n = min(remaining, max(CHUNK_LINES // nlines, 1))
+            lines = [self.f.readline() for _ in range(n * nlines)]
+            buf = b''.join(lines)
+            if len(buf) != n * record.itemsize:
+                # 行尾为 \r\n 或有多余空白时逐行规整到定宽
+                buf = b''.join(line.rstrip(b'\r\n').ljust(widths[i % nlines])[:widths[i % nlines]] + b'\n'
+                               for i, line in enumerate(lines))
+                if len(buf) != n * record.itemsize:
+                    raise ValueError("Unexpected end of file")
+            data = np.frombuffer(buf, dtype=record, count=n)
+            ids_parts.append(data['id'].astype(np.int64))
+            if ncomp:
+                value_parts.append(np.concatenate(
+                    [data[f'v{j}'].reshape(n, k).astype(np.float64) for j, k in enumerate(per_line) if k],
+                    axis=1))
+            else:
+                value_parts.append(np.empty((n, 0), dtype=np.float64))
+            remaining -= n
+
+        if not ids_parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, ncomp), dtype=np.float64)
+        return np.concatenate(ids_parts), np.concatenate(value_parts)
+
+    # ---------- 段解析 ----------
+
+    def blocks(self):
+        """逐个产出结果块（FrdBlock）"""
+        while True:
+            line = self.f.readline()
+            if not line:
+                return
+            code = line[:6].strip()
+            if code == b'2C':
+                self._read_nodes(line)
+            elif code == b'3C':
+                self._read_elements(line)
+            elif code == b'1P':
+                self._read_step(line)
+            elif code == b'100C':
+                block = self._read_result_block(line)
+                if block is not None:
+                    yield block
+            elif code == b'9999':
+                return
+
+    def _header_counts(self, line):
+        """2C / 3C 记录：(数量, 格式)"""
+        tokens = line[6:].split()
+        count = int(tokens[0])
+        fmt = int(tokens[1]) if len(tokens) > 1 else 0
+        return count, fmt
+
+    def _read_step(self, line):
+        # 1PSTEP  结果集编号  增量  步
+        tokens = line[10:].split()
+        if len(tokens) >= 3:
+            self.increment = int(tokens[1])
+            self.step = int(tokens[2])
+
+    def _read_nodes(self, line):
+        count, fmt = self._header_counts(line)
+        self.node_format = fmt
+        if fmt == 2:
+            rec = np.dtype([('id', '<i4'), ('xyz', '<f8', (3,))])
+            data = self._binary(rec, count)
+            ids, coords = data['id'].astype(np.int64), data['xyz'].astype(np.float64)
+            self._skip_end_marker()
+        else:
+            ids, coords = self._fixed_records(count, _id_width(fmt), 3)
+            self._skip_block()
+        self.node_tags, self.nodes = ids, coords
+        self._index = None
+
+    def _add_elements(self, heads, flat_nodes):
+        """heads (m, 4) 为 编号/类型/组/材料，flat_nodes 为按顺序拼接的节点编号"""
+        if heads.shape[0] == 0:
+            return
+        types = heads[:, 1]
+        if types.max() >= _TYPE_NODES.shape[0] or np.any(_TYPE_NODES[types] == 0):
+            raise ValueError(f"Unsupported FRD element type in {np.unique(types).tolist()}")
+        nnodes = _TYPE_NODES[types]
+        if int(nnodes.sum()) != flat_nodes.shape[0]:
+            raise ValueError("Element connectivity does not match element types")
+        offsets = np.concatenate(([0], np.cumsum(nnodes)[:-1]))
+        for elem_type in np.unique(types):
+            sel = types == elem_type
+            idx = offsets[sel][:, None] + np.arange(FRD_ELEMENT_TYPES[int(elem_type)][1])
+            self.elements.setdefault(int(elem_type), []).append((heads[sel, 0], flat_nodes[idx]))
+
+    def _read_elements(self, line):
+        count, fmt = self._header_counts(line)
+        if not self.read_elements and fmt != 2:
+            self._skip_block()
+            return
+        if fmt == 2:
+            # 二进制：每个单元 4 个 int（编号、类型、组、材料）后跟节点编号（变长，需逐个读过）
+            heads, nodes = [], []
+            for _ in range(count):
+                head = self._binary('<i4', 4)
+                heads.append(head)
+                nodes.append(self._binary('<i4', FRD_ELEMENT_TYPES[int(head[1])][1]))
+            if heads and self.read_elements:
+                self._add_elements(np.array(heads, dtype=np.int64), np.concatenate(nodes).astype(np.int64))
+            self._skip_end_marker()
+            return
+
+        # ASCII：-1 行为单元头，随后若干 -2 行为节点编号；按块收集后整体解析
+        head_lines, node_lines = [], []
+
+        def flush():
+            if head_lines:
+                heads = np.fromstring(b' '.join(l[3:] for l in head_lines), dtype=np.int64, sep=' ')
+                flat = np.fromstring(b' '.join(l[3:] for l in node_lines), dtype=np.int64, sep=' ')
+                self._add_elements(heads.reshape(len(head_lines), 4), flat)
+            head_lines.clear()
+            node_lines.clear()
+
+        while True:
+            line = self._line()
+            key = line[:3]
+            if key == b' -1':
+                if len(head_lines) >= CHUNK_LINES:
+                    flush()
+                head_lines.append(line)
+            elif key == b' -2':
+                node_lines.append(line)
+            elif key == b' -3':
+                break
+        flush()
+
+    def _read_result_block(self, line):
+        # 100C 记录（定宽）：结果集名称、时间/频率、节点数、...、格式
+        time = float(line[12:24])
+        count = int(line[24:36])
+        fmt_field = line[73:75].strip()
+        fmt = int(fmt_field) if fmt_field else self.node_format
+        step = self.step
+        if step is None:
+            step_field = line[58:63].strip()
+            step = int(step_field) if step_field else None
+
+        head = self._line()
+        tokens = head.split()
+        name = tokens[1].decode()
+        ncomp = int(tokens[2])
+        location = int(tokens[3]) if len(tokens) > 3 else 1
+
+        components = []
+        for _ in range(ncomp):
+            tokens = self._line().split()
+            # IEXIST = 1 表示该分量不在数据中（由后处理计算，如 ALL）
+            if len(tokens) > 6 and tokens[6].startswith(b'1'):
+                continue
+            components.append(tokens[1].decode())
+
+        wanted = location == 1 and (self.fields is None or name in self.fields)
+        if fmt == 2:
+            rec = np.dtype([('id', '<i4'), ('v', '<f4', (len(components),))])
+            if not wanted:
+                self.f.seek(rec.itemsize * count, 1)
+                self._skip_end_marker()
+                return None
+            data = self._binary(rec, count)
+            ids = data['id'].astype(np.int64)
+            values = data['v'].reshape(count, len(components)).astype(np.float64)
+            self._skip_end_marker()
+        else:
+            if not wanted:
+                self._skip_block()
+                return None
+            ids, values = self._fixed_records(count, _id_width(fmt), len(components))
+            self._skip_block()
+
+        return FrdBlock(name, components, step, self.increment, time, ids, values)
+
+
+def read_frd(path, fields=None, read_elements=True):
+    """读取整个 .frd 文件
+
+    Args:
+        path: .frd 文件路径
+        fields: 只保留这些结果块（如 ['DISP', 'STRESS']），None 表示全部
+        read_elements: 是否读取单元连接关系
+    """
+    with FrdReader(path, fields, read_elements) as reader:
+        blocks = list(reader.blocks())
+        element_tags, connectivity = reader.element_arrays()
+        return FrdResults(reader.node_tags, reader.nodes, element_tags, connectivity, blocks)
+
+
+def frd_statistics(path, fields=None):
+    """流式统计各步/增量结果块的最小/最大/均值及所在节点
+
+    结果块逐个读入并立即汇总，不保留数组；'last' 为每个物理量最后一个增量的汇总
+    """
+    summaries = []
+    last = {}
+    with FrdReader(path, fields, read_elements=False) as reader:
+        for block in reader.blocks():
+            summary = block.summary(reader.locate)
+            summaries.append(summary)
+            last[block.name] = summary
+        return {
+            'num_nodes': int(reader.node_tags.shape[0]),
+            'blocks': summaries,
+            'last': last
+        }
+
+
+def extract_key_results(path):
+    """提取最后一个增量的关键结果（最大/最小/平均 von Mises 应力、最大位移及位置、主应力极值）
+
+    字段名与 SimulationDataCollector.record_results 对应，无对应结果时为 None
+    """
+    stats = frd_statistics(path, fields=('DISP',) + STRESS_BLOCKS)
+    results = {
+        'max_stress': None,
+        'min_stress': None,
+        'mean_stress': None,
+        'max_displacement': None,
+    }
+
+    stress = stats['last'].get('STRESS')
+    if stress and 'von_mises' in stress['quantities']:
+        vm = stress['quantities']['von_mises']
+        results['max_stress'] = vm['max']
+        results['min_stress'] = vm['min']
+        results['mean_stress'] = vm['mean']
+        results['max_stress_node'] = vm['max_node']
+        results['max_stress_location'] = vm.get('max_location')
+        results['max_principal_stress'] = stress['quantities']['principal_1']['max']
+        results['min_principal_stress'] = stress['quantities']['principal_3']['min']
+
+    disp = stats['last'].get('DISP')
+    if disp and 'magnitude' in disp['quantities']:
+        mag = disp['quantities']['magnitude']
+        results['max_displacement'] = mag['max']
+        results['max_displacement_node'] = mag['max_node']
+        results['max_displacement_location'] = mag.get('max_location')
+
+    results['num_nodes'] = stats['num_nodes']
+    results['num_result_blocks'] = len(stats['blocks'])
+    return results
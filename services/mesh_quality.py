@@ -0,0 +1,257 @@
+"""
+网格质量评估
+基于 NumPy 向量化计算四面体 / 六面体单元的 scaled Jacobian、长宽比、
+偏斜度和最小/最大二面角，按块处理以支持数百万单元的网格
+"""
+
+import numpy as np
+
+from services.msh_reader import ELEMENT_TYPES, read_msh
+
+# 体单元类型 -> 参与计算的角点数（高阶单元只取角点）
+TET_TYPES = (4, 11, 29)
+HEX_TYPES = (5, 12, 17)
+
+# 每块处理的单元数，限制中间数组的内存
+CHUNK_ELEMENTS = 500_000
+
+# 各指标直方图的固定分箱（超出范围的值计入两端的箱）
+HISTOGRAM_BINS = {
+    'scaled_jacobian': np.linspace(-1.0, 1.0, 21),
+    'aspect_ratio': np.array([1.0, 1.25, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0, 100.0, 1e6]),
+    'skewness': np.linspace(0.0, 1.0, 11),
+    'min_dihedral': np.linspace(0.0, 180.0, 19),
+    'max_dihedral': np.linspace(0.0, 180.0, 19),
+}
+
+# 六面体各角点的三条棱（按右手系排列，与 gmsh 节点编号一致）
+_HEX_CORNER_EDGES = np.array([
+    [1, 3, 4], [2, 0, 5], [3, 1, 6], [0, 2, 7],
+    [7, 5, 0], [4, 6, 1], [5, 7, 2], [6, 4, 3],
+])
+
+# 六面体的 6 个面（从外侧看逆时针，法向朝外）
+_HEX_FACES = np.array([
+    [0, 3, 2, 1], [4, 5, 6, 7], [0, 1, 5, 4],
+    [1, 2, 6, 5], [2, 3, 7, 6], [3, 0, 4, 7],
+])
+
+# 共棱的相邻面对（对应 12 条棱）
+_HEX_FACE_PAIRS = np.array([
+    [0, 2], [0, 3], [0, 4], [0, 5],
+    [1, 2], [1, 3], [1, 4], [1, 5],
+    [2, 3], [3, 4], [4, 5], [5, 2],
+])
+
+_HEX_EDGES = np.array([
+    [0, 1], [1, 2], [2, 3], [3, 0],
+    [4, 5], [5, 6], [6, 7], [7, 4],
+    [0, 4], [1, 5], [2, 6], [3, 7],
+])
+
+_EPS = 1e-300
+
+
+def _norm(v):
+    return np.sqrt(np.einsum('...i,...i->...', v, v))
+
+
+def _unit(v):
+    return v / np.maximum(_norm(v), _EPS)[..., None]
+
+
+def _dihedral_degrees(n_a, n_b):
+    """两外法向单位向量之间的二面角（度）"""
+    cos = np.clip(np.einsum('...i,...i->...', n_a, n_b), -1.0, 1.0)
+    return 180.0 - np.degrees(np.arccos(cos))
+
+
+def tet_quality(p):
+    """四面体质量指标，p 形状为 (m, 4, 3)"""
+    p0, p1, p2, p3 = p[:, 0], p[:, 1], p[:, 2], p[:, 3]
+    L0, L1, L2 = p1 - p0, p2 - p1, p0 - p2
+    L3, L4, L5 = p3 - p0, p3 - p1, p3 - p2
+    l0, l1, l2, l3, l4, l5 = (_norm(v) for v in (L0, L1, L2, L3, L4, L5))
+
+    # scaled Jacobian：带符号体积 / 各顶点三棱长乘积的最大值，正四面体为 1
+    jacobian = np.einsum('ij,ij->i', L3, np.cross(L2, L0))
+    lam = np.max(np.stack([l0 * l2 * l3, l0 * l1 * l4, l1 * l2 * l5, l3 * l4 * l5]), axis=0)
+    scaled_jacobian = jacobian * np.sqrt(2.0) / np.maximum(lam, _EPS)
+
+    volume = jacobian / 6.0
+    abs_volume = np.abs(volume)
+
+    # 长宽比：最长棱 / (2√6 · 内切球半径)，正四面体为 1
+    area = 0.5 * (_norm(np.cross(L0, L2)) + _norm(np.cross(L3, L0)) +
+                  _norm(np.cross(L4, L1)) + _norm(np.cross(L3, L2)))
+    r_in = 3.0 * abs_volume / np.maximum(area, _EPS)
+    l_max = np.max(np.stack([l0, l1, l2, l3, l4, l5]), axis=0)
+    aspect_ratio = l_max / np.maximum(2.0 * np.sqrt(6.0) * r_in, _EPS)
+
+    # 偏斜度：1 - 体积 / 同外接球半径正四面体的体积
+    a, b, c = p1 - p0, p2 - p0, p3 - p0
+    circ = (np.einsum('ij,ij->i', a, a)[:, None] * np.cross(b, c) +
+            np.einsum('ij,ij->i', b, b)[:, None] * np.cross(c, a) +
+            np.einsum('ij,ij->i', c, c)[:, None] * np.cross(a, b))
+    radius = _norm(circ) / np.maximum(12.0 * abs_volume, _EPS)
+    ideal_volume = 8.0 * np.sqrt(3.0) / 27.0 * radius ** 3
+    skewness = np.clip(1.0 - abs_volume / np.maximum(ideal_volume, _EPS), 0.0, 1.0)
+
+    # 二面角：四个面的外法向两两组合（每对面共一条棱）
+    faces = ((p1, p2, p3, p0), (p0, p2, p3, p1), (p0, p1, p3, p2), (p0, p1, p2, p3))
+    normals = []
+    for fa, fb, fc, opposite in faces:
+        n = np.cross(fb - fa, fc - fa)
+        outward = np.einsum('ij,ij->i', n, opposite - fa) > 0
+        n[outward] *= -1.0
+        normals.append(_unit(n))
+    dihedral = np.stack([_dihedral_degrees(normals[i], normals[j])
+                         for i in range(4) for j in range(i + 1, 4)], axis=1)
+
+    return {
+        'scaled_jacobian': scaled_jacobian,
+        'aspect_ratio': aspect_ratio,
+        'skewness': skewness,
+        'min_dihedral': dihedral.min(axis=1),
+        'max_dihedral': dihedral.max(axis=1),
+    }
+
+
+def hex_quality(p):
+    """六面体质量指标，p 形状为 (m, 8, 3)"""
+    # scaled Jacobian：8 个角点处单位棱向量行列式的最小值
+    corner = p[:, :, None, :]
+    edges = _unit(p[:, _HEX_CORNER_EDGES] - corner)          # (m, 8, 3, 3)
+    corner_det = np.linalg.det(edges)
+    scaled_jacobian = corner_det.min(axis=1)
+
+    # 长宽比：最长棱 / 最短棱
+    lengths = _norm(p[:, _HEX_EDGES[:, 1]] - p[:, _HEX_EDGES[:, 0]])
+    aspect_ratio = lengths.max(axis=1) / np.maximum(lengths.min(axis=1), _EPS)
+
+    # 偏斜度：三个主轴方向两两夹角余弦的最大值
+    x1 = (p[:, 1] - p[:, 0]) + (p[:, 2] - p[:, 3]) + (p[:, 5] - p[:, 4]) + (p[:, 6] - p[:, 7])
+    x2 = (p[:, 3] - p[:, 0]) + (p[:, 2] - p[:, 1]) + (p[:, 7] - p[:, 4]) + (p[:, 6] - p[:, 5])
+    x3 = (p[:, 4] - p[:, 0]) + (p[:, 5] - p[:, 1]) + (p[:, 6] - p[:, 2]) + (p[:, 7] - p[:, 3])
+    x1, x2, x3 = _unit(x1), _unit(x2), _unit(x3)
+    skewness = np.max(np.abs(np.stack([
+        np.einsum('ij,ij->i', x1, x2),
+        np.einsum('ij,ij->i', x1, x3),
+        np.einsum('ij,ij->i', x2, x3),
+    ])), axis=0)
+
+    # 二面角：面法向由对角线叉积得到（适用于非平面四边形）
+    f = p[:, _HEX_FACES]                                      # (m, 6, 4, 3)
+    normals = _unit(np.cross(f[:, :, 2] - f[:, :, 0], f[:, :, 3] - f[:, :, 1]))
+    dihedral = _dihedral_degrees(normals[:, _HEX_FACE_PAIRS[:, 0]], normals[:, _HEX_FACE_PAIRS[:, 1]])
+
+    return {
+        'scaled_jacobian': scaled_jacobian,
+        'aspect_ratio': aspect_ratio,
+        'skewness': skewness,
+        'min_dihedral': dihedral.min(axis=1),
+        'max_dihedral': dihedral.max(axis=1),
+    }
+
+
+class _MetricAccumulator:
+    """跨块累计最小/最大/均值和固定分箱直方图"""
+
+    def __init__(self):
+        self.count = 0
+        self.sums = {}
+        self.mins = {}
+        self.maxs = {}
+        self.hists = {name: np.zeros(len(bins) - 1, dtype=np.int64)
+                      for name, bins in HISTOGRAM_BINS.items()}
+        self.inverted = 0
+        self.score_sum = 0.0
+
+    def add(self, metrics):
+        n = len(metrics['scaled_jacobian'])
+        if n == 0:
+            return
+        self.count += n
+        for name, values in metrics.items():
+            values = np.nan_to_num(values, nan=0.0, posinf=HISTOGRAM_BINS[name][-1])
+            self.sums[name] = self.sums.get(name, 0.0) + float(values.sum())
+            self.mins[name] = min(self.mins.get(name, np.inf), float(values.min()))
+            self.maxs[name] = max(self.maxs.get(name, -np.inf), float(values.max()))
+            bins = HISTOGRAM_BINS[name]
+            counts, _ = np.histogram(np.clip(values, bins[0], bins[-1]), bins=bins)
+            self.hists[name] += counts
+        sj = metrics['scaled_jacobian']
+        self.inverted += int(np.count_nonzero(sj <= 0))
+        self.score_sum += float(np.clip(sj, 0.0, 1.0).sum())
+
+    def summary(self):
+        if self.count == 0:
+            return None
+        return {
+            'num_elements': self.count,
+            'num_inverted': self.inverted,
+            'quality_score': self.score_sum / self.count,
+            'metrics': {
+                name: {
+                    'min': self.mins[name],
+                    'max': self.maxs[name],
+                    'mean': self.sums[name] / self.count,
+                    'histogram': {
+                        'bins': HISTOGRAM_BINS[name].tolist(),
+                        'counts': self.hists[name].tolist()
+                    }
+                }
+                for name in HISTOGRAM_BINS
+            }
+        }
+
+
+def compute_quality(mesh, chunk_size=CHUNK_ELEMENTS):
+    """计算网格中所有四面体 / 六面体单元的质量指标汇总
+
+    Args:
+        mesh: services.msh_reader.MshMesh
+        chunk_size: 每块处理的单元数
+
+    Returns:
+        dict: quality_score（截断到 [0, 1] 的 scaled Jacobian 均值）、
+              翻转单元数、各指标的最小/最大/均值与直方图，以及按单元类型的汇总；
+              网格不含体单元时返回 None
+    """
+    total = _MetricAccumulator()
+    by_type = {}
+
+    for elem_type, conn in mesh.connectivity.items():
+        if elem_type in TET_TYPES:
+            corners, kernel = 4, tet_quality
+        elif elem_type in HEX_TYPES:
+            corners, kernel = 8, hex_quality
+        else:
+            continue
+
+        acc = _MetricAccumulator()
+        for start in range(0, conn.shape[0], chunk_size):
+            rows = mesh.node_rows(conn[start:start + chunk_size, :corners])
+            metrics = kernel(mesh.nodes[rows])
+            acc.add(metrics)
+            total.add(metrics)
+        by_type[ELEMENT_TYPES[elem_type][0]] = acc.summary()
+
+    summary = total.summary()
+    if summary is not None:
+        summary['by_type'] = by_type
+    return summary
+
+
+def analyze_mesh(mesh_file):
+    """读取网格，返回统计信息和质量评估
+
+    返回的字典可直接传给 SimulationDataCollector.record_mesh：
+    'quality' 为质量得分（无体单元时为 0.0），完整指标在 'quality_metrics'
+    """
+    mesh = read_msh(mesh_file)
+    stats = mesh.statistics()
+    quality = compute_quality(mesh)
+    stats['quality'] = quality['quality_score'] if quality else 0.0
+    stats['quality_metrics'] = quality
+    return stats
@@ -8,11 +8,15 @@ import json
 import sys
 from pathlib import Path
 
+from server.mesh_cache import CACHE_ERRORS, get_mesh_cache
+from services.mesh_quality import analyze_mesh
+
 class MeshGenerationService:
     """网格生成服务"""
     
-    def __init__(self, container_name='cae_gmsh'):
+    def __init__(self, container_name='cae_gmsh', use_cache=True):
         self.container_name = container_name
+        self.use_cache = use_cache
     
     def generate_mesh(self, input_file, output_file=None, params=None):
         """生成网格"""
@@ -26,6 +30,27 @@ class MeshGenerationService:
         algorithm = params.get('algorithm', 'auto')
         optimize = params.get('optimize', True)
         
+        # 缓存查询：仅当几何文件在本地可见时才能计算内容哈希；缓存不可用时照常生成
+        cache_params = {'dim': 3, 'clmax': clmax, 'clmin': clmin,
+                        'algorithm': algorithm, 'optimize': optimize}
+        cache = cache_key = hit = None
+        if self.use_cache and Path(input_file).exists():
+            try:
+                cache = get_mesh_cache()
+                cache_key = cache.key_for(input_file, cache_params)
+                hit = cache.get(cache_key, output_file)
+            except CACHE_ERRORS as e:
+                print(f"网格缓存不可用: {e}")
+                cache = cache_key = hit = None
+            if hit:
+                return {
+                    'success': True,
+                    'mesh_file': output_file,
+                    'statistics': hit['stats'] or {},
+                    'stdout': '',
+                    'cached': True
+                }
+        
         # 构建命令
         cmd = [
             'docker', 'exec', self.container_name,
@@ -54,11 +79,18 @@ class MeshGenerationService:
                 # 获取网格统计
                 stats = self._get_mesh_statistics(output_file)
                 
+                if cache_key and Path(output_file).exists():
+                    try:
+                        cache.put(cache_key, output_file, stats, cache_params)
+                    except CACHE_ERRORS as e:
+                        print(f"网格缓存写入失败: {e}")
+                
                 return {
                     'success': True,
                     'mesh_file': output_file,
                     'statistics': stats,
-                    'stdout': result.stdout
+                    'stdout': result.stdout,
+                    'cached': False
                 }
             else:
                 return {
@@ -79,6 +111,17 @@ class MeshGenerationService:
     
     def _get_mesh_statistics(self, mesh_file):
         """获取网格统计信息"""
+        # 网格文件在本地可见时直接解析（含质量评估），精确且无需子进程
+        if Path(mesh_file).exists():
+            try:
+                return analyze_mesh(mesh_file)
+            except (OSError, ValueError) as e:
+                print(f"解析网格失败: {e}")
+        
+        return self._get_mesh_statistics_via_gmsh(mesh_file)
+    
+    def _get_mesh_statistics_via_gmsh(self, mesh_file):
+        """网格只存在于容器内时，退回 gmsh -info"""
         cmd = [
             'docker', 'exec', self.container_name,
             'gmsh', mesh_file, '-info'
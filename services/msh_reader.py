@@ -0,0 +1,429 @@
+"""
+Gmsh 网格读取器
+流式解析 MSH 2.2 / 4.0 / 4.1（ASCII 与二进制），节点坐标和单元连接关系
+直接读入 NumPy 数组，一次读取即可得到精确的节点数、单元数、单元类型
+直方图和包围盒，无需再启动 gmsh 进程
+"""
+
+import numpy as np
+
+# 单元类型编号 -> (名称, 节点数, 维度)
+ELEMENT_TYPES = {
+    1: ('line2', 2, 1),
+    2: ('tri3', 3, 2),
+    3: ('quad4', 4, 2),
+    4: ('tet4', 4, 3),
+    5: ('hex8', 8, 3),
+    6: ('prism6', 6, 3),
+    7: ('pyramid5', 5, 3),
+    8: ('line3', 3, 1),
+    9: ('tri6', 6, 2),
+    10: ('quad9', 9, 2),
+    11: ('tet10', 10, 3),
+    12: ('hex27', 27, 3),
+    13: ('prism18', 18, 3),
+    14: ('pyramid14', 14, 3),
+    15: ('point', 1, 0),
+    16: ('quad8', 8, 2),
+    17: ('hex20', 20, 3),
+    18: ('prism15', 15, 3),
+    19: ('pyramid13', 13, 3),
+    20: ('tri9', 9, 2),
+    21: ('tri10', 10, 2),
+    26: ('line4', 4, 1),
+    29: ('tet20', 20, 3),
+    36: ('quad16', 16, 2),
+}
+
+# ASCII 数据按块读取的行数，限制单次解析的内存峰值
+CHUNK_LINES = 1 << 18
+
+
+def _element_info(elem_type):
+    try:
+        return ELEMENT_TYPES[elem_type]
+    except KeyError:
+        raise ValueError(f"Unsupported element type: {elem_type}")
+
+
+class NodeIndex:
+    """节点编号 -> 行号的向量化查找"""
+
+    def __init__(self, node_tags):
+        num = int(node_tags.shape[0])
+        max_tag = int(node_tags.max()) if num else 0
+        if max_tag <= 4 * max(num, 1):
+            # 编号基本连续，用稠密查找表
+            lookup = np.full(max_tag + 1, -1, dtype=np.int64)
+            lookup[node_tags] = np.arange(num)
+            self._dense = lookup
+        else:
+            order = np.argsort(node_tags)
+            self._dense = None
+            self._sorted = (node_tags[order], order)
+
+    def rows(self, tags):
+        if self._dense is not None:
+            return self._dense[tags]
+        sorted_tags, order = self._sorted
+        return order[np.searchsorted(sorted_tags, tags)]
+
+
+class MshMesh:
+    """解析后的网格：节点坐标 + 按单元类型分组的连接关系"""
+
+    def __init__(self, version, binary, node_tags, nodes, element_tags, connectivity):
+        self.version = version
+        self.binary = binary
+        self.node_tags = node_tags          # (n,) int64
+        self.nodes = nodes                  # (n, 3) float64
+        self.element_tags = element_tags    # {elem_type: (m,) int64}
+        self.connectivity = connectivity    # {elem_type: (m, k) int64 节点编号}
+        self._index = None
+
+    @property
+    def num_nodes(self):
+        return int(self.node_tags.shape[0])
+
+    @property
+    def num_elements(self):
+        return int(sum(tags.shape[0] for tags in self.element_tags.values()))
+
+    def element_type_histogram(self):
+        """各单元类型数量"""
+        return {_element_info(t)[0]: int(tags.shape[0])
+                for t, tags in sorted(self.element_tags.items())}
+
+    def elements_by_dimension(self):
+        """按维度统计单元数（0 点 / 1 线 / 2 面 / 3 体）"""
+        counts = {0: 0, 1: 0, 2: 0, 3: 0}
+        for t, tags in self.element_tags.items():
+            counts[_element_info(t)[2]] += int(tags.shape[0])
+        return counts
+
+    def bounding_box(self):
+        """节点包围盒"""
+        if self.num_nodes == 0:
+            return None
+        return {
+            'min': self.nodes.min(axis=0).tolist(),
+            'max': self.nodes.max(axis=0).tolist()
+        }
+
+    def node_rows(self, tags):
+        """节点编号 -> 坐标数组中的行号（向量化）"""
+        if self._index is None:
+            self._index = NodeIndex(self.node_tags)
+        return self._index.rows(tags)
+
+    def statistics(self):
+        """网格统计信息（与 gmsh -info 对应的字段）"""
+        by_dim = self.elements_by_dimension()
+        return {
+            'format': f"msh {self.version} {'binary' if self.binary else 'ascii'}",
+            'num_nodes': self.num_nodes,
+            'num_elements': self.num_elements,
+            'num_volume_elements': by_dim[3],
+            'num_surface_elements': by_dim[2],
+            'element_types': self.element_type_histogram(),
+            'bounding_box': self.bounding_box()
+        }
+
+
+class _MshParser:
+    """按段流式读取 .msh 文件"""
+
+    def __init__(self, f):
+        self.f = f
+        self.version = None
+        self.binary = False
+        self.size_t = np.dtype('<u8')
+        self.int_t = np.dtype('<i4')
+        self.endian = '<'
+        self.node_chunks = []
+        self.coord_chunks = []
+        self.elements = {}
+
+    # ---------- 基础读取 ----------
+
+    def _line(self):
+        line = self.f.readline()
+        if not line:
+            raise ValueError("Unexpected end of file")
+        return line.strip()
+
+    def _ascii_numbers(self, nlines, dtype):
+        """读取 nlines 行 ASCII 数字，返回一维数组"""
+        parts = []
+        remaining = nlines
+        while remaining > 0:
+            n = min(remaining, CHUNK_LINES)
+            text = b' '.join(self.f.readline() for _ in range(n))
+            parts.append(np.fromstring(text, dtype=dtype, sep=' '))
+            remaining -= n
+        if not parts:
+            return np.empty(0, dtype=dtype)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _binary(self, dtype, count):
+        dtype = np.dtype(dtype)
+        data = self.f.read(dtype.itemsize * count)
+        if len(data) != dtype.itemsize * count:
+            raise ValueError("Unexpected end of binary data")
+        return np.frombuffer(data, dtype=dtype, count=count)
+
+    def _skip_section(self, name):
+        end = b'$End' + name
+        while True:
+            line = self.f.readline()
+            if not line:
+                raise ValueError(f"Missing {end.decode()}")
+            if line.strip() == end:
+                return
+
+    def _add_elements(self, elem_type, tags, conn):
+        self.elements.setdefault(elem_type, []).append((tags.astype(np.int64), conn.astype(np.int64)))
+
+    # ---------- 段解析 ----------
+
+    def parse(self):
+        while True:
+            line = self.f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line.startswith(b'$') or line.startswith(b'$End'):
+                continue
+            name = line[1:]
+            if name == b'MeshFormat':
+                self._read_format()
+            elif name == b'Nodes':
+                self._read_nodes()
+                self._skip_section(b'Nodes')
+            elif name == b'Elements':
+                self._read_elements()
+                self._skip_section(b'Elements')
+            else:
+                self._skip_section(name)
+        return self._build()
+
+    def count_nodes(self):
+        """只读到 $Nodes 段头，返回节点总数"""
+        while True:
+            line = self.f.readline()
+            if not line:
+                return 0
+            line = line.strip()
+            if not line.startswith(b'$') or line.startswith(b'$End'):
+                continue
+            name = line[1:]
+            if name == b'MeshFormat':
+                self._read_format()
+            elif name == b'Nodes':
+                layout = self._layout()
+                if layout == 'v2':
+                    return int(self._line())
+                header_size = 4 if layout == 'v41' else 2
+                if self.binary:
+                    return int(self._binary(self.size_t, header_size)[1])
+                return int(self._line().split()[1])
+            else:
+                self._skip_section(name)
+
+    def _read_format(self):
+        version, file_type, data_size = self._line().split()[:3]
+        self.version = version.decode()
+        self.binary = int(file_type) == 1
+        if self.binary:
+            one = self.f.read(4)
+            if np.frombuffer(one, dtype='<i4')[0] != 1:
+                self.endian = '>'
+            self.f.readline()
+        self.int_t = np.dtype(f'{self.endian}i4')
+        self.size_t = np.dtype(f'{self.endian}u{int(data_size)}')
+        self.double_t = np.dtype(f'{self.endian}f8')
+        self._skip_section(b'MeshFormat')
+
+    def _layout(self):
+        """按版本号选择段布局（gmsh 4.0 写出的版本号可能是 "4"）"""
+        if self.version is None:
+            raise ValueError("Missing $MeshFormat")
+        version = float(self.version)
+        if 2.0 <= version < 3.0:
+            return 'v2'
+        if 4.0 <= version < 4.1:
+            return 'v40'
+        if 4.1 <= version < 5.0:
+            return 'v41'
+        raise ValueError(f"Unsupported MSH version: {self.version}")
+
+    def _read_nodes(self):
+        getattr(self, f'_read_nodes_{self._layout()}')()
+
+    def _read_elements(self):
+        getattr(self, f'_read_elements_{self._layout()}')()
+
+    # MSH 2.2
+
+    def _read_nodes_v2(self):
+        num = int(self._line())
+        if self.binary:
+            rec = np.dtype([('tag', self.int_t), ('xyz', self.double_t, 3)])
+            data = self._binary(rec, num)
+            self.node_chunks.append(data['tag'].astype(np.int64))
+            self.coord_chunks.append(data['xyz'].astype(np.float64))
+        else:
+            data = self._ascii_numbers(num, np.float64).reshape(num, 4)
+            self.node_chunks.append(data[:, 0].astype(np.int64))
+            self.coord_chunks.append(data[:, 1:4])
+
+    def _read_elements_v2(self):
+        num = int(self._line())
+        if self.binary:
+            read = 0
+            while read < num:
+                elem_type, count, ntags = self._binary(self.int_t, 3)
+                nnodes = _element_info(int(elem_type))[1]
+                width = 1 + int(ntags) + nnodes
+                data = self._binary(self.int_t, int(count) * width).reshape(int(count), width)
+                self._add_elements(int(elem_type), data[:, 0], data[:, 1 + int(ntags):])
+                read += int(count)
+            return
+
+        # ASCII：每行的标签数可能不同，按 (类型, 标签数) 分桶后整体解析
+        remaining = num
+        while remaining > 0:
+            n = min(remaining, CHUNK_LINES)
+            buckets = {}
+            for _ in range(n):
+                line = self.f.readline()
+                head = line.split(None, 3)
+                buckets.setdefault((int(head[1]), int(head[2])), []).append(line)
+            for (elem_type, ntags), lines in buckets.items():
+                width = 3 + ntags + _element_info(elem_type)[1]
+                data = np.fromstring(b' '.join(lines), dtype=np.int64, sep=' ').reshape(len(lines), width)
+                self._add_elements(elem_type, data[:, 0], data[:, 3 + ntags:])
+            remaining -= n
+
+    # MSH 4.1
+
+    def _read_nodes_v41(self):
+        if self.binary:
+            num_blocks = int(self._binary(self.size_t, 4)[0])
+        else:
+            num_blocks = int(self._line().split()[0])
+
+        for _ in range(num_blocks):
+            if self.binary:
+                dim, _, parametric = (int(v) for v in self._binary(self.int_t, 3))
+                count = int(self._binary(self.size_t, 1)[0])
+            else:
+                dim, _, parametric, count = (int(v) for v in self._line().split())
+            ncoord = 3 + (dim if parametric else 0)
+            if self.binary:
+                tags = self._binary(self.size_t, count)
+                coords = self._binary(self.double_t, count * ncoord)
+            else:
+                tags = self._ascii_numbers(count, np.int64)
+                coords = self._ascii_numbers(count, np.float64)
+            self.node_chunks.append(tags.astype(np.int64))
+            self.coord_chunks.append(coords.reshape(count, ncoord)[:, :3].astype(np.float64))
+
+    def _read_elements_v41(self):
+        if self.binary:
+            num_blocks = int(self._binary(self.size_t, 4)[0])
+        else:
+            num_blocks = int(self._line().split()[0])
+
+        for _ in range(num_blocks):
+            if self.binary:
+                _, _, elem_type = (int(v) for v in self._binary(self.int_t, 3))
+                count = int(self._binary(self.size_t, 1)[0])
+            else:
+                _, _, elem_type, count = (int(v) for v in self._line().split())
+            width = 1 + _element_info(elem_type)[1]
+            if self.binary:
+                data = self._binary(self.size_t, count * width)
+            else:
+                data = self._ascii_numbers(count, np.int64)
+            data = data.reshape(count, width)
+            self._add_elements(elem_type, data[:, 0], data[:, 1:])
+
+    # MSH 4.0
+
+    def _read_nodes_v40(self):
+        if self.binary:
+            num_blocks = int(self._binary(self.size_t, 2)[0])
+        else:
+            num_blocks = int(self._line().split()[0])
+
+        for _ in range(num_blocks):
+            if self.binary:
+                _, dim, parametric = (int(v) for v in self._binary(self.int_t, 3))
+                count = int(self._binary(self.size_t, 1)[0])
+            else:
+                _, dim, parametric, count = (int(v) for v in self._line().split())
+            ncoord = 3 + (dim if parametric else 0)
+            if self.binary:
+                rec = np.dtype([('tag', self.int_t), ('xyz', self.double_t, ncoord)])
+                data = self._binary(rec, count)
+                self.node_chunks.append(data['tag'].astype(np.int64))
+                self.coord_chunks.append(data['xyz'].reshape(count, ncoord)[:, :3].astype(np.float64))
+            else:
+                data = self._ascii_numbers(count, np.float64).reshape(count, 1 + ncoord)
+                self.node_chunks.append(data[:, 0].astype(np.int64))
+                self.coord_chunks.append(data[:, 1:4])
+
+    def _read_elements_v40(self):
+        if self.binary:
+            num_blocks = int(self._binary(self.size_t, 2)[0])
+        else:
+            num_blocks = int(self._line().split()[0])
+
+        for _ in range(num_blocks):
+            if self.binary:
+                _, _, elem_type = (int(v) for v in self._binary(self.int_t, 3))
+                count = int(self._binary(self.size_t, 1)[0])
+            else:
+                _, _, elem_type, count = (int(v) for v in self._line().split())
+            width = 1 + _element_info(elem_type)[1]
+            if self.binary:
+                data = self._binary(self.int_t, count * width)
+            else:
+                data = self._ascii_numbers(count, np.int64)
+            data = data.reshape(count, width)
+            self._add_elements(elem_type, data[:, 0], data[:, 1:])
+
+    def _build(self):
+        if self.version is None:
+            raise ValueError("Not a Gmsh MSH file")
+        if self.node_chunks:
+            node_tags = np.concatenate(self.node_chunks)
+            nodes = np.concatenate(self.coord_chunks)
+        else:
+            node_tags = np.empty(0, dtype=np.int64)
+            nodes = np.empty((0, 3), dtype=np.float64)
+
+        element_tags = {}
+        connectivity = {}
+        for elem_type, parts in self.elements.items():
+            element_tags[elem_type] = np.concatenate([p[0] for p in parts])
+            connectivity[elem_type] = np.concatenate([p[1] for p in parts])
+        return MshMesh(self.version, self.binary, node_tags, nodes, element_tags, connectivity)
+
+
+def read_msh(path):
+    """读取 Gmsh .msh 文件"""
+    with open(path, 'rb') as f:
+        return _MshParser(f).parse()
+
+
+def mesh_statistics(path):
+    """读取网格并返回统计信息（节点数、单元数、单元类型、包围盒）"""
+    return read_msh(path).statistics()
+
+
+def count_nodes(path):
+    """只读取 $Nodes 段头得到节点数，不解析坐标"""
+    with open(path, 'rb') as f:
+        return _MshParser(f).count_nodes()
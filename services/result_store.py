@@ -0,0 +1,287 @@
+"""
+结果列存储
+把 CalculiX .frd 结果一次性转换为可内存映射的二进制列文件：
+header.json 记录网格拓扑、字段名和各数组的形状，数据为原始 little-endian
+float32 / int32 数组，读取端通过 numpy.memmap 零拷贝打开，
+大模型也无需再次解析文本
+
+目录布局（与 .frd 同目录）::
+
+    simulation.frd
+    simulation.results/
+        header.json
+        nodes.f32             (n, 3) 节点坐标
+        node_tags.i32         (n,)   节点编号
+        cells_<type>.i32      (m, k) 单元连接关系（节点行号，FRD 节点顺序）
+        cell_tags_<type>.i32  (m,)   单元编号
+        field_<i>.f32         (n, c) 节点结果，按节点行对齐，无值处为 NaN
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from services.frd_reader import FRD_ELEMENT_TYPES, FrdReader
+from services.msh_reader import NodeIndex
+
+try:
+    import pyvista as pv
+    PYVISTA_AVAILABLE = True
+except ImportError:
+    PYVISTA_AVAILABLE = False
+
+STORE_VERSION = 1
+STORE_SUFFIX = '.results'
+
+# FRD 单元类型 -> VTK 单元类型
+VTK_CELL_TYPES = {
+    1: 12,   # he8  -> VTK_HEXAHEDRON
+    2: 13,   # pe6  -> VTK_WEDGE
+    3: 10,   # te4  -> VTK_TETRA
+    4: 25,   # he20 -> VTK_QUADRATIC_HEXAHEDRON
+    5: 26,   # pe15 -> VTK_QUADRATIC_WEDGE
+    6: 24,   # te10 -> VTK_QUADRATIC_TETRA
+    7: 5,    # tr3  -> VTK_TRIANGLE
+    8: 22,   # tr6  -> VTK_QUADRATIC_TRIANGLE
+    9: 9,    # qu4  -> VTK_QUAD
+    10: 23,  # qu8  -> VTK_QUADRATIC_QUAD
+    11: 3,   # be2  -> VTK_LINE
+    12: 21,  # be3  -> VTK_QUADRATIC_EDGE
+}
+
+# FRD 与 VTK 节点顺序不同的单元：ccx 写出二次六面体/楔形单元时交换了顶面棱边和竖向棱边中点
+VTK_NODE_ORDER = {
+    4: np.r_[0:12, 16:20, 12:16],
+    5: np.r_[0:9, 12:15, 9:12],
+}
+
+
+def store_path(frd_file):
+    """.frd 对应的结果存储目录"""
+    frd_file = Path(frd_file)
+    return frd_file.with_name(frd_file.stem + STORE_SUFFIX)
+
+
+def _source_signature(frd_file):
+    st = os.stat(frd_file)
+    return {'path': str(Path(frd_file).resolve()), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _write_array(directory, name, array, dtype):
+    array = np.ascontiguousarray(array, dtype=dtype)
+    array.tofile(str(directory / name))
+    return {'file': name, 'dtype': np.dtype(dtype).str, 'shape': list(array.shape)}
+
+
+class ResultStore:
+    """只读打开的结果存储，所有数组都是 numpy.memmap"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        with open(self.root / 'header.json', 'r', encoding='utf-8') as f:
+            self.header = json.load(f)
+        if self.header.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported result store version: {self.header.get('version')}")
+        self._arrays = {}
+        self._index = None
+
+    def _map(self, spec):
+        name = spec['file']
+        if name not in self._arrays:
+            shape = tuple(spec['shape'])
+            if 0 in shape:
+                # 空数组无法 memmap
+                self._arrays[name] = np.empty(shape, dtype=spec['dtype'])
+            else:
+                self._arrays[name] = np.memmap(self.root / name, dtype=spec['dtype'], mode='r', shape=shape)
+        return self._arrays[name]
+
+    @property
+    def num_nodes(self):
+        return self.header['num_nodes']
+
+    @property
+    def num_elements(self):
+        return sum(cell['count'] for cell in self.header['cells'].values())
+
+    @property
+    def nodes(self):
+        return self._map(self.header['nodes'])
+
+    @property
+    def node_tags(self):
+        return self._map(self.header['node_tags'])
+
+    def node_rows(self, tags):
+        if self._index is None:
+            self._index = NodeIndex(np.asarray(self.node_tags, dtype=np.int64))
+        return self._index.rows(tags)
+
+    def cell_types(self):
+        return [int(t) for t in self.header['cells']]
+
+    def cells(self, frd_type):
+        """某类单元的连接关系 (m, k)，值为节点行号"""
+        return self._map(self.header['cells'][str(frd_type)]['connectivity'])
+
+    def cell_tags(self, frd_type):
+        return self._map(self.header['cells'][str(frd_type)]['tags'])
+
+    def fields(self):
+        """字段描述列表（名称、步、增量、时间、列名）"""
+        return [{k: v for k, v in field.items() if k != 'data'} for field in self.header['fields']]
+
+    def field_names(self):
+        names = []
+        for field in self.header['fields']:
+            if field['name'] not in names:
+                names.append(field['name'])
+        return names
+
+    def _find(self, name, step=None, increment=None):
+        matches = [f for f in self.header['fields'] if f['name'] == name and
+                   (step is None or f['step'] == step) and
+                   (increment is None or f['increment'] == increment)]
+        if not matches:
+            raise KeyError(f"Field not found: {name} (step={step}, increment={increment})")
+        return matches[-1]
+
+    def field(self, name, step=None, increment=None):
+        """节点结果 (n, c)；不指定步/增量时取最后一个"""
+        return self._map(self._find(name, step, increment)['data'])
+
+    def column(self, name, column, step=None, increment=None):
+        """字段中的单列（如 ('STRESS', 'von_mises')），返回 memmap 视图"""
+        spec = self._find(name, step, increment)
+        return self._map(spec['data'])[:, spec['columns'].index(column)]
+
+    def to_pyvista(self, step=None, increment=None):
+        """构造 pyvista.UnstructuredGrid，节点结果作为 point_data
+
+        每个字段以名称保存全部分量，派生列另存为 '<字段>_<列名>'（如 STRESS_von_mises）
+        """
+        if not PYVISTA_AVAILABLE:
+            raise ImportError("PyVista not installed. Please install with: pip install pyvista")
+
+        cells = {}
+        for frd_type in self.cell_types():
+            conn = np.asarray(self.cells(frd_type))
+            if frd_type in VTK_NODE_ORDER:
+                conn = conn[:, VTK_NODE_ORDER[frd_type]]
+            vtk_type = VTK_CELL_TYPES[frd_type]
+            cells[vtk_type] = np.concatenate([cells[vtk_type], conn]) if vtk_type in cells else conn
+        grid = pv.UnstructuredGrid(cells, np.asarray(self.nodes, dtype=np.float64))
+
+        for name in self.field_names():
+            try:
+                spec = self._find(name, step, increment)
+            except KeyError:
+                continue
+            data = self._map(spec['data'])
+            ncomp = len(spec['components'])
+            grid.point_data[name] = np.asarray(data[:, :ncomp])
+            for i, column in enumerate(spec['columns'][ncomp:], start=ncomp):
+                grid.point_data[f"{name}_{column}"] = np.asarray(data[:, i])
+        return grid
+
+
+def is_stale(frd_file, root=None):
+    """存储不存在、版本不符或 .frd 已更新时返回 True"""
+    root = Path(root) if root else store_path(frd_file)
+    try:
+        with open(root / 'header.json', 'r', encoding='utf-8') as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return True
+    source = header.get('source', {})
+    current = _source_signature(frd_file)
+    return (header.get('version') != STORE_VERSION or
+            source.get('size') != current['size'] or
+            source.get('mtime_ns') != current['mtime_ns'])
+
+
+def convert_frd(frd_file, root=None):
+    """把 .frd 转换为结果存储
+
+    结果块逐个读入、计算派生量并立即写盘，内存峰值为单个结果块；
+    先写入临时目录再整体替换，读取端不会看到写了一半的存储
+    """
+    frd_file = Path(frd_file)
+    root = Path(root) if root else store_path(frd_file)
+    tmp = root.with_name(f"{root.name}.tmp{os.getpid()}")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    try:
+        header = {
+            'version': STORE_VERSION,
+            'source': _source_signature(frd_file),
+            'cells': {},
+            'fields': []
+        }
+        with FrdReader(str(frd_file)) as reader:
+            for i, block in enumerate(reader.blocks()):
+                # 派生量（模、von Mises、主值）随分量一起存，读取端无需再算
+                derived = block.derived()
+                columns = list(derived)
+                data = np.full((reader.node_tags.shape[0], len(columns)), np.nan, dtype=np.float32)
+                data[reader.node_rows(block.node_ids)] = np.stack([derived[c] for c in columns], axis=1)
+                header['fields'].append({
+                    'name': block.name,
+                    'step': block.step,
+                    'increment': block.increment,
+                    'time': block.time,
+                    'components': block.components,
+                    'columns': columns,
+                    'data': _write_array(tmp, f'field_{i}.f32', data, '<f4')
+                })
+
+            header['num_nodes'] = int(reader.node_tags.shape[0])
+            header['nodes'] = _write_array(tmp, 'nodes.f32', reader.nodes, '<f4')
+            header['node_tags'] = _write_array(tmp, 'node_tags.i32', reader.node_tags, '<i4')
+
+            element_tags, connectivity = reader.element_arrays()
+            for frd_type, conn in connectivity.items():
+                name, nnodes = FRD_ELEMENT_TYPES[frd_type]
+                header['cells'][str(frd_type)] = {
+                    'name': name,
+                    'count': int(conn.shape[0]),
+                    'nodes_per_cell': nnodes,
+                    'vtk_type': VTK_CELL_TYPES[frd_type],
+                    'connectivity': _write_array(tmp, f'cells_{name}.i32', reader.node_rows(conn), '<i4'),
+                    'tags': _write_array(tmp, f'cell_tags_{name}.i32', element_tags[frd_type], '<i4')
+                }
+
+        with open(tmp / 'header.json', 'w', encoding='utf-8') as f:
+            json.dump(header, f, ensure_ascii=False, indent=2)
+
+        if root.exists():
+            shutil.rmtree(root)
+        os.rename(tmp, root)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return ResultStore(root)
+
+
+def open_results(path, convert=True):
+    """打开结果存储
+
+    Args:
+        path: .frd 文件或存储目录
+        convert: 存储缺失或过期时是否自动从 .frd 转换
+    """
+    path = Path(path)
+    if path.suffix.lower() != '.frd':
+        return ResultStore(path)
+    root = store_path(path)
+    if is_stale(path, root):
+        if not convert:
+            raise FileNotFoundError(f"Result store missing or stale: {root}")
+        return convert_frd(path, root)
+    return ResultStore(root)
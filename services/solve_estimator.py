@@ -0,0 +1,324 @@
+"""
+求解时间估算
+流式扫描 .inp 得到自由度、单元类型和分析步，按分析类型在历史仿真耗时上
+拟合 t = c · DOF^α（对数空间线性回归），给出估计值和 95% 预测区间；
+历史数据不足时退回经验先验。结果可用于 Celery 短作业优先调度和 ETA 显示
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.msh_reader import count_nodes
+
+# .inp 分析步关键字 -> 分析类型
+PROCEDURES = {
+    'STATIC': 'static',
+    'VISCO': 'static',
+    'FREQUENCY': 'frequency',
+    'COMPLEX FREQUENCY': 'frequency',
+    'BUCKLE': 'buckle',
+    'DYNAMIC': 'dynamic',
+    'MODAL DYNAMIC': 'dynamic',
+    'STEADY STATE DYNAMICS': 'dynamic',
+    'HEAT TRANSFER': 'heat_transfer',
+    'COUPLED TEMPERATURE-DISPLACEMENT': 'coupled',
+    'UNCOUPLED TEMPERATURE-DISPLACEMENT': 'coupled',
+}
+
+# 仿真记录里使用的分析类型名称 -> 统一名称
+ANALYSIS_ALIASES = {
+    'stress': 'static',
+    'structural': 'static',
+    'modal': 'frequency',
+    'buckling': 'buckle',
+    'thermal': 'heat_transfer',
+    'heat': 'heat_transfer',
+}
+
+# 每个节点的自由度
+DOF_PER_NODE = {
+    'heat_transfer': 1,
+    'coupled': 4,
+}
+
+# 历史数据不足时的先验：t = 启动开销 + PRIOR_COEF · (DOF / 1e4)^PRIOR_ALPHA · 步数 · 类型系数
+PRIOR_OVERHEAD = 1.0
+PRIOR_COEF = 2.0
+PRIOR_ALPHA = 1.3
+PRIOR_FACTORS = {
+    'frequency': 3.0,
+    'buckle': 3.0,
+    'dynamic': 5.0,
+    'coupled': 2.0,
+}
+# 先验估计的区间为 [t / PRIOR_SPREAD, t · PRIOR_SPREAD]
+PRIOR_SPREAD = 3.0
+
+# 至少需要这么多条历史记录（且 DOF 不全相同）才拟合
+MIN_SAMPLES = 5
+REFIT_INTERVAL = 300
+
+# 双侧 95% 的 t 分布分位数（自由度 1..30），更大自由度取正态分位数
+_T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+          2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+          2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def _t_quantile(df):
+    return _T_975[df - 1] if df <= len(_T_975) else 1.96
+
+
+def normalize_analysis_type(analysis_type):
+    if not analysis_type:
+        return 'static'
+    name = str(analysis_type).strip().lower().replace(' ', '_').replace('-', '_')
+    return ANALYSIS_ALIASES.get(name, name)
+
+
+def dof_per_node(analysis_type):
+    return DOF_PER_NODE.get(normalize_analysis_type(analysis_type), 3)
+
+
+def scan_inp(inp_file):
+    """流式扫描 .inp（跟随 *INCLUDE）
+
+    Returns:
+        dict: num_nodes, num_elements, element_types（类型 -> 数量）,
+              steps（各分析步类型）, analysis_type（第一个分析步）, dof,
+              missing_includes（找不到的包含文件）
+    """
+    info = {
+        'num_nodes': 0,
+        'num_elements': 0,
+        'element_types': {},
+        'steps': [],
+        'missing_includes': []
+    }
+    _scan_file(Path(inp_file), info, depth=0)
+    info['analysis_type'] = info['steps'][0] if info['steps'] else 'static'
+    info['dof'] = info['num_nodes'] * dof_per_node(info['analysis_type'])
+    return info
+
+
+def _keyword_params(params):
+    result = {}
+    for param in params.split(','):
+        name, _, value = param.partition('=')
+        result[name.strip().upper()] = value.strip().strip('"')
+    return result
+
+
+def _scan_file(path, info, depth):
+    if depth > 8:
+        raise ValueError(f"*INCLUDE nested too deeply: {path}")
+
+    section = None
+    element_type = None
+    in_step = False
+    continued = False
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('**'):
+                continue
+            if stripped.startswith('*'):
+                keyword, _, params = stripped[1:].partition(',')
+                keyword = ' '.join(keyword.split()).upper()
+                continued = False
+                section = None
+                if keyword == 'NODE':
+                    section = 'num_nodes'
+                elif keyword == 'ELEMENT':
+                    section = 'num_elements'
+                    element_type = _keyword_params(params).get('TYPE', 'UNKNOWN').upper()
+                elif keyword == 'INCLUDE':
+                    include = path.parent / _keyword_params(params).get('INPUT', '')
+                    if include.is_file():
+                        _scan_file(include, info, depth + 1)
+                    else:
+                        info['missing_includes'].append(str(include))
+                elif keyword == 'STEP':
+                    in_step = True
+                elif keyword == 'END STEP':
+                    in_step = False
+                elif in_step and keyword in PROCEDURES:
+                    info['steps'].append(PROCEDURES[keyword])
+                continue
+            if section is None:
+                continue
+            # 单元数据行以逗号结尾时表示下一行是续行
+            if not continued:
+                info[section] += 1
+                if section == 'num_elements':
+                    info['element_types'][element_type] = info['element_types'].get(element_type, 0) + 1
+            continued = section == 'num_elements' and stripped.endswith(',')
+
+
+class _PowerLawFit:
+    """log t = log c + α · log DOF 的最小二乘拟合"""
+
+    def __init__(self, dof, seconds):
+        x = np.log(np.asarray(dof, dtype=np.float64))
+        y = np.log(np.asarray(seconds, dtype=np.float64))
+        self.n = len(x)
+        self.mean_x = float(x.mean())
+        self.sxx = float(((x - self.mean_x) ** 2).sum())
+        self.alpha = float(((x - self.mean_x) * (y - y.mean())).sum() / self.sxx)
+        self.log_coef = float(y.mean() - self.alpha * self.mean_x)
+        residuals = y - (self.log_coef + self.alpha * x)
+        self.sigma = float(math.sqrt((residuals ** 2).sum() / (self.n - 2)))
+
+    def predict(self, dof):
+        """(估计值, 95% 预测区间下限, 上限)"""
+        x = math.log(dof)
+        mu = self.log_coef + self.alpha * x
+        se = self.sigma * math.sqrt(1.0 + 1.0 / self.n + (x - self.mean_x) ** 2 / self.sxx)
+        half = _t_quantile(self.n - 2) * se
+        return math.exp(mu), math.exp(mu - half), math.exp(mu + half)
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'coefficient': math.exp(self.log_coef),
+                'samples': self.n, 'sigma_log': self.sigma}
+
+
+class SolveTimeEstimator:
+    """基于历史耗时的求解时间估算器"""
+
+    def __init__(self, collector=None, refit_interval=REFIT_INTERVAL):
+        self.collector = collector
+        self.refit_interval = refit_interval
+        self._fits = None
+        self._fitted_at = 0.0
+        self._lock = threading.Lock()
+
+    def fits(self):
+        """按分析类型拟合的模型（'*' 为所有类型合并），定期刷新"""
+        with self._lock:
+            if self._fits is not None and time.monotonic() - self._fitted_at < self.refit_interval:
+                return self._fits
+            self._fits = self._fit()
+            self._fitted_at = time.monotonic()
+            return self._fits
+
+    def _fit(self):
+        if self.collector is None:
+            return {}
+        try:
+            rows = self.collector.get_duration_samples()
+        except sqlite3.Error as e:
+            print(f"读取历史耗时失败: {e}")
+            return {}
+
+        groups = {'*': ([], [])}
+        for analysis_type, num_nodes, duration in rows:
+            if not num_nodes or not duration or duration <= 0:
+                continue
+            analysis_type = normalize_analysis_type(analysis_type)
+            dof = num_nodes * dof_per_node(analysis_type)
+            for key in (analysis_type, '*'):
+                dofs, seconds = groups.setdefault(key, ([], []))
+                dofs.append(dof)
+                seconds.append(duration)
+
+        fits = {}
+        for key, (dofs, seconds) in groups.items():
+            if len(dofs) >= MIN_SAMPLES and len(set(dofs)) >= 2:
+                fits[key] = _PowerLawFit(dofs, seconds)
+        return fits
+
+    def estimate(self, dof, analysis_type='static', num_steps=1):
+        """估算求解时间
+
+        Returns:
+            dict: estimated_seconds, lower_seconds, upper_seconds（95% 区间）,
+                  source（history / history_pooled / prior）, model
+        """
+        analysis_type = normalize_analysis_type(analysis_type)
+        result = {'dof': dof, 'analysis_type': analysis_type, 'confidence': 0.95}
+        if not dof:
+            result.update({'estimated_seconds': None, 'lower_seconds': None,
+                           'upper_seconds': None, 'source': None, 'model': None})
+            return result
+
+        fits = self.fits()
+        fit = fits.get(analysis_type)
+        source = 'history'
+        if fit is None:
+            fit = fits.get('*')
+            source = 'history_pooled'
+
+        if fit is not None:
+            estimate, lower, upper = fit.predict(dof)
+            model = fit.to_dict()
+        else:
+            source = 'prior'
+            estimate = PRIOR_OVERHEAD + (PRIOR_COEF * (dof / 1e4) ** PRIOR_ALPHA * max(num_steps, 1) *
+                                         PRIOR_FACTORS.get(analysis_type, 1.0))
+            lower, upper = estimate / PRIOR_SPREAD, estimate * PRIOR_SPREAD
+            model = {'alpha': PRIOR_ALPHA, 'coefficient': PRIOR_COEF, 'samples': 0}
+
+        result.update({
+            'estimated_seconds': estimate,
+            'lower_seconds': lower,
+            'upper_seconds': upper,
+            'source': source,
+            'model': model
+        })
+        return result
+
+    def estimate_inp(self, inp_file, analysis_type=None):
+        """扫描 .inp 后估算；analysis_type 缺省时取第一个分析步的类型"""
+        info = scan_inp(inp_file)
+        result = self.estimate(info['dof'], analysis_type or info['analysis_type'],
+                               num_steps=len(info['steps']))
+        result.update({
+            'num_nodes': info['num_nodes'],
+            'num_elements': info['num_elements'],
+            'element_types': info['element_types'],
+            'num_steps': len(info['steps'])
+        })
+        if info['missing_includes']:
+            result['missing_includes'] = info['missing_includes']
+        return result
+
+    def estimate_mesh(self, mesh_file, analysis_type='static'):
+        """提交前按 .msh 的节点数估算（只读取节点段头）"""
+        num_nodes = count_nodes(mesh_file)
+        result = self.estimate(num_nodes * dof_per_node(analysis_type), analysis_type)
+        result['num_nodes'] = num_nodes
+        return result
+
+
+def sjf_priority(estimated_seconds, levels=10):
+    """短作业优先的 Celery 优先级（Redis 传输下 0 最先执行）
+
+    按耗时的对数分档：< 10 s 为 0，每增加一个数量级（约）加 2 档，未知耗时居中
+    """
+    if estimated_seconds is None:
+        return levels // 2
+    level = int(2 * math.log10(max(estimated_seconds, 1.0) / 10.0) + 1) if estimated_seconds >= 10 else 0
+    return max(0, min(levels - 1, level))
+
+
+_default_estimator = None
+_default_lock = threading.Lock()
+
+
+def get_solve_time_estimator() -> SolveTimeEstimator:
+    """进程内共享的默认估算器（历史数据来自默认的仿真数据库）"""
+    global _default_estimator
+    with _default_lock:
+        if _default_estimator is None:
+            try:
+                from server.data_collector import SimulationDataCollector
+                collector = SimulationDataCollector()
+            except (ImportError, OSError, sqlite3.Error) as e:
+                print(f"求解历史不可用，使用先验估算: {e}")
+                collector = None
+            _default_estimator = SolveTimeEstimator(collector)
+        return _default_estimator
@@ -0,0 +1,306 @@
+"""
+求解调度器
+根据 .inp 中 *NODE / *ELEMENT 的数量为每个 CalculiX 作业分配线程数，
+用跨进程的 CPU 槽位（文件锁）限制同一容器内并发求解占用的核数：
+小模型可以多个并行，大模型独占全部核心。每次运行的线程布局和墙钟时间
+写入 solver_runs 表，之后同规模的模型优先参考历史数据选择线程数
+"""
+
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from services.solve_estimator import scan_inp
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 等平台没有 fcntl，退化为进程内槽位
+    fcntl = None
+
+# 节点数上限 -> 线程数（超过最后一档时使用全部核心）
+THREAD_TIERS = (
+    (5_000, 1),
+    (50_000, 2),
+    (200_000, 4),
+)
+
+# 历史数据：同规模定义为节点数在 [n / SIZE_WINDOW, n * SIZE_WINDOW] 内
+SIZE_WINDOW = 2.0
+# 耗时在最优值的该比例以内时，选择线程更少的方案（把核心留给其他作业）
+EFFICIENCY_TOLERANCE = 1.1
+# 同一线程数已有这么多次记录而没有其他方案可比时，尝试加倍线程数
+EXPLORE_AFTER = 3
+
+# 读取失败时按中等规模处理
+DEFAULT_THREADS = 2
+
+
+def count_model_size(inp_file):
+    """流式统计 .inp 的节点数和单元数（跟随 *INCLUDE）"""
+    info = scan_inp(inp_file)
+    return {'num_nodes': info['num_nodes'], 'num_elements': info['num_elements']}
+
+
+def total_cpus():
+    """容器可用的 CPU 数（可用 CCX_TOTAL_CPUS 覆盖）"""
+    value = os.environ.get('CCX_TOTAL_CPUS')
+    if value:
+        return max(1, int(value))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+class SolvePlan:
+    """一个求解作业的资源方案"""
+
+    def __init__(self, inp_file, threads, num_nodes=None, num_elements=None,
+                 total_cpus=None, source='heuristic'):
+        self.inp_file = str(inp_file)
+        self.threads = threads
+        self.num_nodes = num_nodes
+        self.num_elements = num_elements
+        self.total_cpus = total_cpus
+        self.source = source
+        self.busy_cpus = None
+
+    def env(self):
+        """传给 ccx 的线程环境变量（SPOOLES / PARDISO / PaStiX 与结果计算都会读取）"""
+        n = str(self.threads)
+        return {
+            'OMP_NUM_THREADS': n,
+            'MKL_NUM_THREADS': n,
+            'CCX_NPROC_EQUATION_SOLVER': n,
+            'CCX_NPROC_RESULTS': n,
+            'CCX_NPROC_STIFFNESS': n,
+        }
+
+    def docker_env_args(self):
+        """docker exec 的 -e 参数"""
+        args = []
+        for key, value in self.env().items():
+            args += ['-e', f'{key}={value}']
+        return args
+
+    def to_dict(self):
+        return {
+            'inp_file': self.inp_file,
+            'threads': self.threads,
+            'num_nodes': self.num_nodes,
+            'num_elements': self.num_elements,
+            'total_cpus': self.total_cpus,
+            'busy_cpus': self.busy_cpus,
+            'plan_source': self.source
+        }
+
+
+class CpuSlots:
+    """跨进程 CPU 槽位
+
+    每个 CPU 对应 lock_dir 下的一个槽位文件，作业对所需数量的槽位加 flock。
+    申请时先持有 gate 锁，保证同一时间只有一个作业在收集槽位：
+    大作业不会因为小作业不断插队而饿死，也不会出现两个作业各拿一半的死锁
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, total, lock_dir=None):
+        self.total = total
+        self.lock_dir = Path(lock_dir or os.environ.get(
+            'CCX_SLOT_DIR', os.path.join(tempfile.gettempdir(), 'ccx_cpu_slots')))
+        self._local_free = total
+        self._local_cond = threading.Condition()
+        if fcntl is not None:
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    def _open(self, name):
+        return open(self.lock_dir / name, 'a+')
+
+    def _try_lock(self, f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def busy(self):
+        """当前被占用的槽位数"""
+        if fcntl is None:
+            with self._local_cond:
+                return self.total - self._local_free
+        busy = 0
+        for i in range(self.total):
+            with self._open(f'slot_{i}.lock') as f:
+                if self._try_lock(f):
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    busy += 1
+        return busy
+
+    @contextmanager
+    def acquire(self, count, timeout=None):
+        """占用 count 个槽位，退出时释放；超时抛出 TimeoutError"""
+        count = max(1, min(count, self.total))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        if fcntl is None:
+            with self._local_cond:
+                while self._local_free < count:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"Timed out waiting for {count} CPU slots")
+                    self._local_cond.wait(remaining)
+                self._local_free -= count
+            try:
+                yield count
+            finally:
+                with self._local_cond:
+                    self._local_free += count
+                    self._local_cond.notify_all()
+            return
+
+        held = {}
+        gate = self._open('gate.lock')
+        try:
+            while not self._try_lock(gate):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for {count} CPU slots")
+                time.sleep(self.POLL_INTERVAL)
+            try:
+                while len(held) < count:
+                    for i in range(self.total):
+                        if len(held) == count:
+                            break
+                        if i in held:
+                            continue
+                        f = self._open(f'slot_{i}.lock')
+                        if self._try_lock(f):
+                            held[i] = f
+                        else:
+                            f.close()
+                    if len(held) == count:
+                        break
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for {count} CPU slots")
+                    time.sleep(self.POLL_INTERVAL)
+            finally:
+                fcntl.flock(gate.fileno(), fcntl.LOCK_UN)
+        except BaseException:
+            for f in held.values():
+                f.close()
+            raise
+        finally:
+            gate.close()
+
+        try:
+            yield count
+        finally:
+            for f in held.values():
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                f.close()
+
+
+class SolveScheduler:
+    """CalculiX 作业的线程分配与并发控制"""
+
+    def __init__(self, cpus=None, lock_dir=None, collector=None):
+        self.total_cpus = cpus or total_cpus()
+        self.slots = CpuSlots(self.total_cpus, lock_dir)
+        self.collector = collector
+
+    def _history(self, num_nodes):
+        """同规模模型的历史运行 {threads: [每节点耗时, ...]}"""
+        if self.collector is None or not num_nodes:
+            return {}
+        try:
+            rows = self.collector.get_solver_runs(int(num_nodes / SIZE_WINDOW), int(num_nodes * SIZE_WINDOW))
+        except sqlite3.Error:
+            return {}
+        history = {}
+        for nodes, threads, wall_time in rows:
+            if nodes and threads <= self.total_cpus:
+                history.setdefault(threads, []).append(wall_time / nodes)
+        return history
+
+    def heuristic_threads(self, num_nodes):
+        for limit, threads in THREAD_TIERS:
+            if num_nodes < limit:
+                return min(threads, self.total_cpus)
+        return self.total_cpus
+
+    def plan(self, inp_file):
+        """为 .inp 生成资源方案：优先参考历史耗时，否则按模型规模分档"""
+        try:
+            size = count_model_size(inp_file)
+        except (OSError, ValueError):
+            return SolvePlan(inp_file, min(DEFAULT_THREADS, self.total_cpus),
+                             total_cpus=self.total_cpus, source='default')
+
+        num_nodes = size['num_nodes']
+        plan = SolvePlan(inp_file, self.heuristic_threads(num_nodes), num_nodes,
+                         size['num_elements'], self.total_cpus)
+
+        history = self._history(num_nodes)
+        if len(history) >= 2:
+            medians = {t: statistics.median(v) for t, v in history.items()}
+            best = min(medians.values())
+            plan.threads = min(t for t, m in medians.items() if m <= best * EFFICIENCY_TOLERANCE)
+            plan.source = 'history'
+        elif len(history) == 1:
+            (threads, samples), = history.items()
+            if len(samples) >= EXPLORE_AFTER and threads * 2 <= self.total_cpus:
+                # 只有一种方案的数据，试一次更多线程以便比较
+                plan.threads = threads * 2
+                plan.source = 'explore'
+        return plan
+
+    @contextmanager
+    def reserve(self, plan, timeout=None):
+        """在求解期间占用 plan.threads 个 CPU 槽位"""
+        with self.slots.acquire(plan.threads, timeout):
+            try:
+                # 记录开始求解时整个容器被占用的核数（含本作业）
+                plan.busy_cpus = self.slots.busy()
+            except OSError:
+                plan.busy_cpus = None
+            yield plan
+
+    def record(self, plan, wall_time, status='completed'):
+        """记录运行结果；数据库不可用时忽略"""
+        if self.collector is None:
+            return
+        run = plan.to_dict()
+        run.update({'wall_time': wall_time, 'status': status})
+        try:
+            self.collector.record_solver_run(run)
+        except sqlite3.Error as e:
+            print(f"记录求解器运行失败: {e}")
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def _default_collector():
+    try:
+        from server.data_collector import SimulationDataCollector
+        return SimulationDataCollector()
+    except (ImportError, OSError, sqlite3.Error) as e:
+        print(f"求解历史不可用，按模型规模分配线程: {e}")
+        return None
+
+
+def get_solve_scheduler() -> SolveScheduler:
+    """进程内共享的默认调度器（历史记录写入默认的仿真数据库）"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = SolveScheduler(collector=_default_collector())
+        return _default_scheduler
@@ -5,32 +5,49 @@
 
 import subprocess
 import re
+import time
 from pathlib import Path
 
+from services.frd_reader import extract_key_results
+from services.result_store import convert_frd
+from services.solve_scheduler import get_solve_scheduler
+from services.solve_estimator import get_solve_time_estimator
+
 class SolveService:
     """求解服务"""
     
-    def __init__(self, container_name='cae_calculix'):
+    def __init__(self, container_name='cae_calculix', scheduler=None, estimator=None):
         self.container_name = container_name
+        self.scheduler = scheduler or get_solve_scheduler()
+        self.estimator = estimator or get_solve_time_estimator()
     
     def run_analysis(self, inp_file, analysis_type='static'):
-        """运行分析"""
+        """运行分析（线程数由调度器按模型规模分配，并占用相应的 CPU 槽位）"""
         
         # 去除 .inp 后缀
         base_name = str(Path(inp_file).with_suffix(''))
         
+        plan = self.scheduler.plan(inp_file)
         cmd = [
-            'docker', 'exec', self.container_name,
+            'docker', 'exec', *plan.docker_env_args(), self.container_name,
             'ccx', base_name
         ]
         
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600
-            )
+            with self.scheduler.reserve(plan):
+                start = time.time()
+                try:
+                    result = subprocess.run(
+                        cmd,
+                        capture_output=True,
+                        text=True,
+                        timeout=3600
+                    )
+                except subprocess.TimeoutExpired:
+                    self.scheduler.record(plan, time.time() - start, 'timeout')
+                    raise
+                self.scheduler.record(plan, time.time() - start,
+                                      'completed' if result.returncode == 0 else 'failed')
             
             if result.returncode == 0:
                 # 提取结果
@@ -40,7 +57,9 @@ class SolveService:
                     'success': True,
                     'frd_file': f"{base_name}.frd",
                     'dat_file': f"{base_name}.dat",
+                    'result_store': self._convert_results(f"{base_name}.frd"),
                     'results': results,
+                    'solver_plan': plan.to_dict(),
                     'stdout': result.stdout
                 }
             else:
@@ -60,8 +79,25 @@ class SolveService:
                 'error': str(e)
             }
     
+    def _convert_results(self, frd_file):
+        """把 .frd 转换为列存储（可视化端直接 memmap 打开），返回存储目录"""
+        if not Path(frd_file).exists():
+            return None
+        try:
+            return str(convert_frd(frd_file).root)
+        except (OSError, ValueError) as e:
+            print(f"结果存储转换失败: {e}")
+            return None
+    
     def _extract_results(self, base_name):
-        """从结果文件提取关键数据"""
+        """从结果文件提取关键数据（优先解析 .frd 节点结果，缺失时回退到 .dat）"""
+        frd_file = f"{base_name}.frd"
+        if Path(frd_file).exists():
+            try:
+                return extract_key_results(frd_file)
+            except (OSError, ValueError) as e:
+                print(f"解析 .frd 失败，回退到 .dat: {e}")
+        
         dat_file = f"{base_name}.dat"
         
         results = {
@@ -116,26 +152,12 @@ class SolveService:
                 'reason': str(e)
             }
     
-    def estimate_time(self, inp_file):
-        """估算求解时间"""
+    def estimate_time(self, inp_file, analysis_type=None):
+        """估算求解时间（按自由度和分析类型拟合历史耗时，附 95% 区间）"""
         try:
-            with open(inp_file, 'r') as f:
-                content = f.read()
-            
-            # 估算基于节点数和单元数
-            node_pattern = r'\*NODE.*?(\d+)'
-            elem_pattern = r'\*ELEMENT.*?(\d+)'
-            
-            # 简化估算：假设每1000个单元需要1秒
-            # 实际时间取决于分析类型和复杂度
-            
-            return {
-                'estimated_seconds': 60,  # 默认估计
-                'note': 'Actual time depends on problem complexity'
-            }
-        
-        except:
-            return {'estimated_seconds': None}
+            return self.estimator.estimate_inp(inp_file, analysis_type)
+        except (OSError, ValueError) as e:
+            return {'estimated_seconds': None, 'error': str(e)}
     
     def validate_input_file(self, inp_file):
         """验证输入文件"""
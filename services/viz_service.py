@@ -22,6 +22,17 @@ except ImportError:
     NUMPY_AVAILABLE = False
     print("Warning: NumPy not available")
 
+try:
+    from services.result_store import open_results
+    RESULT_STORE_AVAILABLE = True
+except ImportError:
+    RESULT_STORE_AVAILABLE = False
+
+def _stress_arrays(mesh):
+    """应力相关数组，von Mises 优先"""
+    names = [name for name in mesh.array_names if 'stress' in name.lower() or 'mises' in name.lower()]
+    return sorted(names, key=lambda name: 'mises' not in name.lower())
+
 class VisualizationService:
     """可视化服务类"""
 
@@ -33,6 +44,12 @@ class VisualizationService:
             except:
                 pass
 
+    def _load_mesh(self, result_file):
+        """加载结果网格：.frd 经结果存储打开（首次转换，之后 memmap 直接读取），其他格式用 pv.read"""
+        if RESULT_STORE_AVAILABLE and str(result_file).lower().endswith('.frd'):
+            return open_results(result_file).to_pyvista()
+        return pv.read(result_file)
+
     def visualize_stress(self, frd_file, output_png, options=None):
         """生成应力云图"""
         if not PYVISTA_AVAILABLE:
@@ -51,10 +68,10 @@ class VisualizationService:
 
         try:
             # 读取结果文件
-            mesh = pv.read(frd_file)
+            mesh = self._load_mesh(frd_file)
 
             # 查找应力数据
-            stress_arrays = [name for name in mesh.array_names if 'stress' in name.lower() or 'mises' in name.lower()]
+            stress_arrays = _stress_arrays(mesh)
 
             if not stress_arrays:
                 return {'success': False, 'error': 'No stress data found'}
@@ -113,7 +130,7 @@ class VisualizationService:
         options = options or {}
 
         try:
-            mesh = pv.read(frd_file)
+            mesh = self._load_mesh(frd_file)
 
             # 查找位移数据
             disp_arrays = [name for name in mesh.array_names if 'disp' in name.lower() or 'displacement' in name.lower()]
@@ -150,7 +167,7 @@ class VisualizationService:
         options = options or {}
 
         try:
-            mesh = pv.read(frd_file)
+            mesh = self._load_mesh(frd_file)
             plotter = pv.Plotter(off_screen=True)
             plotter.add_mesh(mesh, color=options.get('color', 'lightblue'))
 
@@ -176,14 +193,17 @@ class VisualizationService:
             return None
 
         try:
-            mesh = pv.read(frd_file)
-            return {
+            mesh = self._load_mesh(frd_file)
+            info = {
                 'file': frd_file,
                 'n_points': mesh.n_points,
                 'n_cells': mesh.n_cells,
                 'array_names': mesh.array_names,
                 'viz_type': viz_type
             }
+            if RESULT_STORE_AVAILABLE and str(frd_file).lower().endswith('.frd'):
+                info['fields'] = open_results(frd_file).fields()
+            return info
         except Exception as e:
             print(f"Error reading FRD file: {e}")
             return None
@@ -0,0 +1,78 @@
+"""网格 / 体素缓存（services/content_cache.py 公共索引与淘汰）测试"""
+
+import numpy as np
+
+from ml.models import voxel_cache
+from ml.models.voxel_cache import COORDS_MODE, VoxelCache, pack_voxels
+from server.mesh_cache import MeshCache
+
+
+def _write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_mesh_cache_round_trip_and_eviction(tmp_path):
+    cache = MeshCache(tmp_path / 'cache', max_bytes=10 ** 6, max_entries=2)
+    geometry = _write(tmp_path / 'part.step', b'solid')
+
+    keys = []
+    for i in range(3):
+        key = cache.key_for(geometry, {'clmax': 1 + i})
+        mesh = _write(tmp_path / f'{i}.msh', b'x' * (i + 1))
+        cache.put(key, mesh, stats={'elements': i}, params={'clmax': 1 + i})
+        keys.append(key)
+
+    # 最早写入的条目被淘汰，文件一并删除
+    assert cache.get(keys[0]) is None
+    assert not cache._entry_path(keys[0]).exists()
+    hit = cache.get(keys[2], output_file=str(tmp_path / 'out' / 'mesh.msh'))
+    assert hit['stats'] == {'elements': 2}
+    assert (tmp_path / 'out' / 'mesh.msh').read_bytes() == b'xxx'
+    assert cache.get_statistics()['entries'] == 2
+
+    cache.clear()
+    assert cache.get(keys[2]) is None
+
+
+def test_hash_memo_is_bounded(tmp_path):
+    cache = MeshCache(tmp_path / 'cache')
+    cache._hash_memo_size = 3
+    files = [_write(tmp_path / f'{i}.step', bytes([i])) for i in range(5)]
+    for name in files:
+        cache._geometry_hash(name)
+    cache._geometry_hash(files[2])
+    assert len(cache._hash_memo) == 3
+    # 最近使用的保留在末尾
+    assert next(reversed(cache._hash_memo))[0] == files[2]
+
+
+def test_voxel_cache_round_trip(tmp_path):
+    cache = VoxelCache(tmp_path / 'cache')
+    geometry = _write(tmp_path / 'part.step', b'solid')
+    voxels = (np.random.default_rng(0).random((8, 8, 8)) > 0.5).astype(np.float32)
+    coords = np.array([[0, 1, 2], [7, 7, 7]])
+
+    key = cache.key_for(geometry, 8, 'solid')
+    cache.put(key, voxels, 8, 'solid')
+    np.testing.assert_array_equal(cache.get(key), voxels)
+    np.testing.assert_array_equal(cache.get(key, packed=True), pack_voxels(voxels))
+
+    key = cache.key_for(geometry, 8, COORDS_MODE)
+    cache.put(key, coords, 8, COORDS_MODE)
+    np.testing.assert_array_equal(cache.get(key), coords)
+    assert cache.get_statistics()['entries'] == 2
+
+
+def test_get_or_voxelize_keeps_result_when_put_fails(tmp_path, monkeypatch):
+    cache = VoxelCache(tmp_path / 'cache')
+    geometry = _write(tmp_path / 'part.step', b'solid')
+    voxels = np.ones((4, 4, 4), dtype=np.float32)
+    monkeypatch.setattr(voxel_cache, 'voxelize', lambda step_file, resolution, mode: voxels)
+
+    def fail(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(cache, 'put', fail)
+    np.testing.assert_array_equal(cache.get_or_voxelize(geometry, 4, packed=True), pack_voxels(voxels))
+    assert cache.get(cache.key_for(geometry, 4, 'solid')) is None
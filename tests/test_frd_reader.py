@@ -0,0 +1,110 @@
+"""
+CalculiX .frd 结果读取：定宽 ASCII 样例（长 / 短编号格式、-2 续行、CRLF 行尾）
+"""
+
+import numpy as np
+import pytest
+
+from services.frd_reader import FrdReader, extract_key_results, frd_statistics, read_frd
+
+NODES = {1: (0.0, 0.0, 0.0), 2: (1.0, 0.0, 0.0), 3: (0.0, 1.0, 0.0), 4: (0.0, 0.0, 1.0)}
+# SXX SYY SZZ SXY SYZ SZX：单轴 100 / 单轴 200 / 静水压力 / 纯剪切
+STRESS = {1: (100, 0, 0, 0, 0, 0), 2: (200, 0, 0, 0, 0, 0), 3: (50, 50, 50, 0, 0, 0), 4: (0, 0, 0, 10, 0, 0)}
+
+
+def _records(values, id_width):
+    """' -1' + 编号 + 每行 6 个 E12.5，多余分量写在 -2 续行"""
+    lines = []
+    for node, row in values.items():
+        for begin in range(0, len(row), 6):
+            key = f" -1{node:{id_width}d}" if begin == 0 else " -2" + " " * id_width
+            lines.append(key + ''.join(f"{v:12.5E}" for v in row[begin:begin + 6]))
+    return lines
+
+
+def _result_block(name, components, values, increment, fmt, all_component=False):
+    """第 1 步第 increment 个增量的结果块"""
+    id_width = 5 if fmt == 0 else 10
+    lines = [f"    1PSTEP{increment:25d}{increment:12d}{1:12d}",
+             f"  100CL{100 + increment:5d}{float(increment):12.5E}{len(values):12d}{'':22s}{1:5d}{'':10s}{fmt:2d}",
+             f" -4  {name:8s}{len(components) + all_component:4d}    1"]
+    lines += [f" -5  {c:8s}    1    2    1    0" for c in components]
+    if all_component:
+        lines.append(" -5  ALL         1    2    0    0    1ALL")
+    return lines + _records(values, id_width) + [" -3"]
+
+
+def frd_text():
+    lines = ["    1C", f"    2C{len(NODES):30d}{1:37d}"]
+    lines += _records(NODES, 10) + [" -3"]
+    lines += [f"    3C{1:30d}{1:37d}", " -1         1    3    0    1", " -2         1         2         3         4", " -3"]
+    disp = {n: (0.1 * n, 0.0, 0.0) for n in NODES}
+    lines += _result_block('DISP', ['D1', 'D2', 'D3'], disp, 1, 1, all_component=True)
+    lines += _result_block('STRESS', ['SXX', 'SYY', 'SZZ', 'SXY', 'SYZ', 'SZX'], STRESS, 1, 0)
+    # 8 个分量，第二行为 -2 续行
+    lines += _result_block('EXTRA', [f'C{i}' for i in range(8)], {n: tuple(range(n, n + 8)) for n in NODES}, 1, 1)
+    lines += _result_block('DISP', ['D1', 'D2', 'D3'], {n: (0.2 * n, 0.0, 0.0) for n in NODES}, 2, 1)
+    return '\n'.join(lines + ["9999", ""])
+
+
+@pytest.fixture(params=['\n', '\r\n'], ids=['lf', 'crlf'])
+def frd_file(request, tmp_path):
+    path = tmp_path / 'job.frd'
+    path.write_bytes(frd_text().replace('\n', request.param).encode())
+    return str(path)
+
+
+def test_read_frd(frd_file):
+    results = read_frd(frd_file)
+
+    np.testing.assert_array_equal(results.node_tags, list(NODES))
+    np.testing.assert_array_equal(results.nodes, list(NODES.values()))
+    np.testing.assert_array_equal(results.connectivity[3], [[1, 2, 3, 4]])
+    assert results.steps() == [(1, 1), (1, 2)]
+    assert [b.name for b in results.blocks] == ['DISP', 'STRESS', 'EXTRA', 'DISP']
+
+    disp = results.get('DISP', increment=1)
+    assert disp.components == ['D1', 'D2', 'D3']
+    np.testing.assert_allclose(disp.values[:, 0], [0.1, 0.2, 0.3, 0.4])
+    np.testing.assert_array_equal(results.get('STRESS').values, list(STRESS.values()))
+    np.testing.assert_array_equal(results.get('EXTRA').values, [range(n, n + 8) for n in NODES])
+    np.testing.assert_allclose(results.nodal_field('DISP')[:, 0], [0.2, 0.4, 0.6, 0.8])
+
+
+def test_fields_filter_skips_other_blocks(frd_file):
+    with FrdReader(frd_file, fields=['STRESS'], read_elements=False) as reader:
+        names = [block.name for block in reader.blocks()]
+        assert reader.elements == {}
+    assert names == ['STRESS']
+
+
+def test_extract_key_results(frd_file):
+    results = extract_key_results(frd_file)
+
+    assert results['max_stress'] == pytest.approx(200.0)
+    assert results['max_stress_node'] == 2
+    assert results['max_stress_location'] == [1.0, 0.0, 0.0]
+    assert results['min_stress'] == pytest.approx(0.0, abs=1e-9)
+    assert results['mean_stress'] == pytest.approx((300 + 10 * np.sqrt(3)) / 4)
+    assert results['max_principal_stress'] == pytest.approx(200.0)
+    assert results['min_principal_stress'] == pytest.approx(-10.0)
+    # 位移取最后一个增量
+    assert results['max_displacement'] == pytest.approx(0.8)
+    assert results['max_displacement_node'] == 4
+    assert results['num_nodes'] == 4
+    assert results['num_result_blocks'] == 3
+
+
+def test_statistics_blocks(frd_file):
+    stats = frd_statistics(frd_file)
+    assert [(b['name'], b['increment']) for b in stats['blocks']] == [('DISP', 1), ('STRESS', 1), ('EXTRA', 1), ('DISP', 2)]
+    assert stats['last']['DISP']['quantities']['magnitude']['max'] == pytest.approx(0.8)
+
+
+def test_truncated_file_raises(tmp_path):
+    text = frd_text()
+    path = tmp_path / 'truncated.frd'
+    # 截断在 EXTRA 块的定宽记录中间
+    path.write_bytes(text[:text.index(' -5  C7') + 100].encode())
+    with pytest.raises(ValueError):
+        read_frd(str(path))
@@ -0,0 +1,92 @@
+"""
+几何向量库：检查点 + 追加日志重放，以及中断写入后的恢复
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from ml.models.geometry_search import GeometryVectorDatabase, load_vector_config
+
+DIM = 8
+
+
+@pytest.fixture
+def open_db(tmp_path):
+    def open_db(**kwargs):
+        config = load_vector_config(tmp_path / 'missing.yaml')
+        return GeometryVectorDatabase(DIM, tmp_path / 'vectors.db', config=config, **kwargs)
+    return open_db
+
+
+def vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype('float32')
+
+
+def test_replays_log_after_checkpoint(open_db):
+    data = vectors(15)
+    db = open_db(checkpoint_interval=0)
+    db.add_geometries(data[:10], [{'id': i} for i in range(10)])
+    db.checkpoint()
+    db.add_geometries(data[10:], [{'id': i} for i in range(10, 15)])
+
+    reopened = open_db()
+    stats = reopened.get_statistics()
+    assert stats['total_geometries'] == stats['metadata_count'] == 15
+    assert stats['pending_vectors'] == 5
+    for i in (3, 12):
+        assert reopened.search_similar(data[i], k=1)[0]['metadata'] == {'id': i}
+
+
+def test_truncated_write_is_dropped(open_db):
+    data = vectors(6)
+    db = open_db(checkpoint_interval=0)
+    db.add_geometries(data[:4], [{'id': i} for i in range(4)])
+    db.checkpoint()
+    db.add_geometries(data[4:5], [{'id': 4}])
+
+    # 中断的写入：向量只写了半行，元数据最后一行没有换行
+    with open(db.vector_file, 'ab') as f:
+        f.write(data[5].tobytes()[:DIM * 2])
+    with open(db.metadata_file, 'a', encoding='utf-8') as f:
+        f.write('{"id": 5')
+
+    reopened = open_db()
+    assert reopened.index.ntotal == len(reopened.metadata) == 5
+    assert db.vector_file.stat().st_size == 5 * DIM * 4
+    assert db.metadata_file.read_text().endswith('{"id": 4}\n')
+    assert reopened.search_similar(data[4], k=1)[0]['metadata'] == {'id': 4}
+
+    # 截断后继续追加，行号仍然对齐
+    reopened.add_geometries(data[5:], [{'id': 5}])
+    again = open_db()
+    assert again.search_similar(data[5], k=1)[0]['metadata'] == {'id': 5}
+
+
+def test_vector_without_metadata_is_dropped(open_db):
+    data = vectors(3)
+    db = open_db(checkpoint_interval=0)
+    db.add_geometries(data[:2], [{'id': 0}, {'id': 1}])
+    # 向量写完、元数据写入前中断
+    with open(db.vector_file, 'ab') as f:
+        f.write(data[2].tobytes())
+
+    reopened = open_db()
+    assert reopened.index.ntotal == len(reopened.metadata) == 2
+    assert db.vector_file.stat().st_size == 2 * DIM * 4
+
+
+def test_checkpoint_ahead_of_log_is_rebuilt(open_db):
+    data = vectors(6)
+    db = open_db(checkpoint_interval=0)
+    db.add_geometries(data, [{'id': i} for i in range(6)])
+    db.checkpoint()
+
+    # 日志比检查点短（例如从备份恢复了旧的 .vec / .jsonl）
+    with open(db.vector_file, 'r+b') as f:
+        f.truncate(4 * DIM * 4)
+
+    reopened = open_db()
+    assert reopened.index.ntotal == len(reopened.metadata) == 4
+    assert reopened.search_similar(data[3], k=1)[0]['metadata'] == {'id': 3}
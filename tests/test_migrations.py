@@ -0,0 +1,118 @@
+"""
+仿真数据库迁移：user_version 0（旧版数据库）-> 最新版本
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from server.data_collector import SimulationDataCollector
+from server.migrations import FEATURE_DTYPE, MIGRATIONS, SCHEMA_VERSION, apply_migrations, schema_version
+
+# 迁移引入之前 _init_database 创建的表（版本 0）
+V0_SCHEMA = '''
+    CREATE TABLE simulations (id INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT UNIQUE NOT NULL,
+                              timestamp TEXT NOT NULL, geometry_file TEXT, geometry_hash TEXT,
+                              analysis_type TEXT, status TEXT, duration REAL);
+    CREATE TABLE geometry_params (id INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT NOT NULL,
+                                  param_name TEXT NOT NULL, param_value REAL NOT NULL);
+    CREATE TABLE mesh_params (id INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT NOT NULL, num_nodes INTEGER,
+                              num_elements INTEGER, clmax REAL, clmin REAL, mesh_quality REAL);
+    CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT NOT NULL, max_stress REAL,
+                          min_stress REAL, mean_stress REAL, max_displacement REAL, volume REAL, mass REAL);
+    CREATE TABLE geometry_features (id INTEGER PRIMARY KEY AUTOINCREMENT, sim_id TEXT NOT NULL,
+                                    feature_vector BLOB NOT NULL, feature_dim INTEGER NOT NULL);
+    CREATE TABLE solver_runs (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, inp_file TEXT,
+                              num_nodes INTEGER, num_elements INTEGER, threads INTEGER NOT NULL,
+                              total_cpus INTEGER, busy_cpus INTEGER, plan_source TEXT, wall_time REAL,
+                              status TEXT);
+'''
+
+
+@pytest.fixture
+def v0_database(tmp_path):
+    """旧版数据库：两条已完成仿真、一条运行中；特征向量为 float64，sim_a 记录了两次"""
+    path = tmp_path / 'legacy.db'
+    conn = sqlite3.connect(str(path))
+    conn.executescript(V0_SCHEMA)
+    for sim_id, status in (('sim_a', 'completed'), ('sim_b', 'completed'), ('sim_c', 'running')):
+        conn.execute("INSERT INTO simulations (sim_id, timestamp, analysis_type, status) VALUES (?, '2024', 'static', ?)",
+                     (sim_id, status))
+        conn.execute("INSERT INTO geometry_params (sim_id, param_name, param_value) VALUES (?, 'width', 10)", (sim_id,))
+        conn.execute("INSERT INTO mesh_params (sim_id, num_elements, clmax) VALUES (?, 100, 2.0)", (sim_id,))
+    conn.execute("INSERT INTO results (sim_id, max_stress, volume) VALUES ('sim_a', 120.0, 5.0)")
+    conn.execute("INSERT INTO results (sim_id, max_stress, volume) VALUES ('sim_b', 80.0, 4.0)")
+    for sim_id, vector in (('sim_a', [1.0, 2.0, 3.0]), ('sim_b', [4.0, 5.0, 6.0]), ('sim_a', [7.0, 8.0, 9.0])):
+        conn.execute('INSERT INTO geometry_features (sim_id, feature_vector, feature_dim) VALUES (?, ?, 3)',
+                     (sim_id, np.array(vector, dtype='<f8').tobytes()))
+    conn.commit()
+    assert schema_version(conn) == 0
+    conn.close()
+    return path
+
+
+def _names(conn, kind):
+    return {row[0] for row in conn.execute('SELECT name FROM sqlite_master WHERE type = ?', (kind,))}
+
+
+def test_upgrade_from_version_0(v0_database):
+    collector = SimulationDataCollector(str(v0_database))
+
+    conn = sqlite3.connect(str(v0_database))
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert {'idx_results_sim', 'idx_simulations_hash', 'idx_geometry_features_sim',
+            'idx_training_view_type'} <= _names(conn, 'index')
+    assert 'training_view' in _names(conn, 'table')
+    assert {'trg_training_view_sim_complete', 'trg_training_view_results'} <= _names(conn, 'trigger')
+
+    # 回填已完成的仿真
+    rows = conn.execute('SELECT sim_id, params, num_elements, max_stress FROM training_view ORDER BY sim_id').fetchall()
+    assert rows == [('sim_a', 'width:10.0', 100, 120.0), ('sim_b', 'width:10.0', 100, 80.0)]
+
+    # 特征向量转为 float32，每个 sim_id 只保留最后一条
+    features = dict(conn.execute('SELECT sim_id, feature_vector FROM geometry_features').fetchall())
+    assert sorted(features) == ['sim_a', 'sim_b']
+    np.testing.assert_array_equal(np.frombuffer(features['sim_a'], dtype=FEATURE_DTYPE), [7, 8, 9])
+    np.testing.assert_array_equal(np.frombuffer(features['sim_b'], dtype=FEATURE_DTYPE), [4, 5, 6])
+
+    # 迁移后的触发器随写入维护训练视图
+    collector.record_results('sim_c', {'max_stress': 60.0})
+    collector.complete_simulation('sim_c', 1.0)
+    assert conn.execute("SELECT max_stress FROM training_view WHERE sim_id = 'sim_c'").fetchone() == (60.0,)
+    collector.record_geometry_features('sim_b', np.ones(3))
+    assert conn.execute("SELECT COUNT(*) FROM geometry_features WHERE sim_id = 'sim_b'").fetchone() == (1,)
+    conn.close()
+
+
+def test_migrations_are_idempotent(v0_database):
+    SimulationDataCollector(str(v0_database))
+    conn = sqlite3.connect(str(v0_database), isolation_level=None)
+    conn.execute('BEGIN IMMEDIATE')
+    assert apply_migrations(conn) == []
+    conn.execute('COMMIT')
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+def test_partial_upgrade_applies_remaining_versions(v0_database):
+    conn = sqlite3.connect(str(v0_database), isolation_level=None)
+    conn.execute('BEGIN IMMEDIATE')
+    for version, _description, statements in MIGRATIONS[:1]:
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {version}')
+    conn.execute('COMMIT')
+
+    conn.execute('BEGIN IMMEDIATE')
+    assert apply_migrations(conn) == [version for version, _, _ in MIGRATIONS[1:]]
+    conn.execute('COMMIT')
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
+
+
+def test_new_database_starts_at_latest_version(tmp_path):
+    SimulationDataCollector(str(tmp_path / 'new.db'))
+    conn = sqlite3.connect(str(tmp_path / 'new.db'))
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
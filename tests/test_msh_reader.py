@@ -0,0 +1,154 @@
+"""
+Gmsh 网格读取：MSH 2.2 / 4.1 的 ASCII 与二进制样例
+"""
+
+import numpy as np
+import pytest
+
+from services.msh_reader import count_nodes, mesh_statistics, read_msh
+
+# 两个四面体 + 一个三角形 + 一个点单元；节点编号不连续（100），走排序查找
+NODE_TAGS = [1, 2, 3, 4, 100]
+NODES = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 1]]
+TETS = [[1, 2, 3, 4], [2, 3, 4, 100]]
+TRI = [1, 2, 3]
+
+MSH22_ASCII = b"""$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$PhysicalNames
+1
+3 1 "volume"
+$EndPhysicalNames
+$Nodes
+5
+1 0 0 0
+2 1 0 0
+3 0 1 0
+4 0 0 1
+100 1 1 1
+$EndNodes
+$Elements
+4
+1 15 2 0 1 1
+2 2 2 0 1 1 2 3
+3 4 2 1 1 1 2 3 4
+4 4 3 1 1 0 2 3 4 100
+$EndElements
+"""
+
+MSH41_ASCII = b"""$MeshFormat
+4.1 0 8
+$EndMeshFormat
+$Entities
+0 0 0 1
+1 0 0 0 1 1 1 0 0
+$EndEntities
+$Nodes
+2 5 1 100
+2 1 0 3
+1
+2
+3
+0 0 0
+1 0 0
+0 1 0
+3 1 0 2
+4
+100
+0 0 1
+1 1 1
+$EndNodes
+$Elements
+2 3 1 3
+2 1 2 1
+1 1 2 3
+3 1 4 2
+2 1 2 3 4
+3 2 3 4 100
+$EndElements
+"""
+
+
+def _msh22_binary():
+    out = [b"$MeshFormat\n2.2 1 8\n", np.int32(1).tobytes(), b"\n$EndMeshFormat\n"]
+    rec = np.dtype([('tag', '<i4'), ('xyz', '<f8', 3)])
+    nodes = np.array(list(zip(NODE_TAGS, NODES)), dtype=rec)
+    out += [b"$Nodes\n5\n", nodes.tobytes(), b"\n$EndNodes\n$Elements\n3\n"]
+    # 块头 (类型, 数量, 标签数)，每行 编号 + 标签 + 节点
+    out += [np.array([2, 1, 2], '<i4').tobytes(), np.array([1, 0, 1] + TRI, '<i4').tobytes()]
+    out += [np.array([4, 2, 2], '<i4').tobytes(),
+            np.array([[2, 1, 1] + TETS[0], [3, 1, 1] + TETS[1]], '<i4').tobytes()]
+    out.append(b"\n$EndElements\n")
+    return b''.join(out)
+
+
+def _msh41_binary():
+    size_t = '<u8'
+    out = [b"$MeshFormat\n4.1 1 8\n", np.int32(1).tobytes(), b"\n$EndMeshFormat\n$Nodes\n"]
+    out.append(np.array([1, 5, 1, 100], size_t).tobytes())
+    out += [np.array([3, 1, 0], '<i4').tobytes(), np.array([5], size_t).tobytes(),
+            np.array(NODE_TAGS, size_t).tobytes(), np.array(NODES, '<f8').tobytes()]
+    out.append(b"\n$EndNodes\n$Elements\n")
+    out.append(np.array([2, 3, 1, 3], size_t).tobytes())
+    out += [np.array([2, 1, 2], '<i4').tobytes(), np.array([1], size_t).tobytes(),
+            np.array([1] + TRI, size_t).tobytes()]
+    out += [np.array([3, 1, 4], '<i4').tobytes(), np.array([2], size_t).tobytes(),
+            np.array([[2] + TETS[0], [3] + TETS[1]], size_t).tobytes()]
+    out.append(b"\n$EndElements\n")
+    return b''.join(out)
+
+
+SAMPLES = {
+    '2.2-ascii': (MSH22_ASCII, '2.2', False, {'point': 1, 'tri3': 1, 'tet4': 2}),
+    '2.2-binary': (_msh22_binary(), '2.2', True, {'tri3': 1, 'tet4': 2}),
+    '4.1-ascii': (MSH41_ASCII, '4.1', False, {'tri3': 1, 'tet4': 2}),
+    '4.1-binary': (_msh41_binary(), '4.1', True, {'tri3': 1, 'tet4': 2}),
+}
+
+
+@pytest.fixture(params=sorted(SAMPLES))
+def sample(request, tmp_path):
+    content, version, binary, histogram = SAMPLES[request.param]
+    path = tmp_path / 'mesh.msh'
+    path.write_bytes(content)
+    return str(path), version, binary, histogram
+
+
+def test_read_msh(sample):
+    path, version, binary, histogram = sample
+    mesh = read_msh(path)
+
+    assert (mesh.version, mesh.binary) == (version, binary)
+    np.testing.assert_array_equal(mesh.node_tags, NODE_TAGS)
+    np.testing.assert_array_equal(mesh.nodes, NODES)
+    np.testing.assert_array_equal(mesh.connectivity[4], TETS)
+    np.testing.assert_array_equal(mesh.connectivity[2], [TRI])
+    assert mesh.element_type_histogram() == histogram
+    assert mesh.num_elements == sum(histogram.values())
+    np.testing.assert_array_equal(mesh.nodes[mesh.node_rows(mesh.connectivity[4][1])], NODES[1:])
+
+
+def test_statistics_and_count_nodes(sample):
+    path, version, binary, histogram = sample
+    stats = mesh_statistics(path)
+
+    assert stats['format'] == f"msh {version} {'binary' if binary else 'ascii'}"
+    assert stats['num_nodes'] == count_nodes(path) == 5
+    assert stats['num_volume_elements'] == 2
+    assert stats['num_surface_elements'] == 1
+    assert stats['bounding_box'] == {'min': [0.0, 0.0, 0.0], 'max': [1.0, 1.0, 1.0]}
+
+
+def test_rejects_unknown_element_type(tmp_path):
+    path = tmp_path / 'bad.msh'
+    path.write_bytes(MSH22_ASCII.replace(b"2 2 2 0 1 1 2 3", b"2 99 2 0 1 1 2 3"))
+    with pytest.raises(ValueError, match="Unsupported element type"):
+        read_msh(str(path))
+
+
+def test_rejects_non_msh_file(tmp_path):
+    path = tmp_path / 'empty.msh'
+    path.write_bytes(b"not a mesh\n")
+    with pytest.raises(ValueError):
+        read_msh(str(path))
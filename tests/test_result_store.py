@@ -0,0 +1,95 @@
+"""
+结果列存储：.frd -> memmap 列文件 -> 读取
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from services.result_store import ResultStore, convert_frd, is_stale, open_results, store_path
+from tests.test_frd_reader import NODES, STRESS, _result_block, frd_text
+
+
+@pytest.fixture
+def frd_file(tmp_path):
+    path = tmp_path / 'simulation.frd'
+    path.write_text(frd_text())
+    return path
+
+
+def test_memmap_round_trip(frd_file):
+    store = convert_frd(frd_file)
+    assert store.root == store_path(frd_file)
+
+    reopened = ResultStore(store.root)
+    assert isinstance(reopened.nodes, np.memmap)
+    assert reopened.nodes.dtype == np.float32
+    np.testing.assert_array_equal(reopened.nodes, list(NODES.values()))
+    np.testing.assert_array_equal(reopened.node_tags, list(NODES))
+    assert reopened.num_nodes == 4
+    assert reopened.num_elements == 1
+    # 连接关系存为节点行号
+    np.testing.assert_array_equal(reopened.cells(3), [[0, 1, 2, 3]])
+    np.testing.assert_array_equal(reopened.cell_tags(3), [1])
+
+    assert reopened.field_names() == ['DISP', 'STRESS', 'EXTRA']
+    assert [(f['name'], f['increment']) for f in reopened.fields()] == [
+        ('DISP', 1), ('STRESS', 1), ('EXTRA', 1), ('DISP', 2)]
+    np.testing.assert_allclose(reopened.field('DISP')[:, 0], [0.2, 0.4, 0.6, 0.8], rtol=1e-6)
+    np.testing.assert_allclose(reopened.field('DISP', increment=1)[:, 0], [0.1, 0.2, 0.3, 0.4], rtol=1e-6)
+    np.testing.assert_allclose(reopened.field('STRESS')[:, :6], list(STRESS.values()))
+    np.testing.assert_allclose(reopened.column('STRESS', 'von_mises'), [100, 200, 0, 10 * np.sqrt(3)], atol=1e-4)
+    np.testing.assert_allclose(reopened.column('DISP', 'magnitude'), [0.2, 0.4, 0.6, 0.8], rtol=1e-6)
+    with pytest.raises(KeyError):
+        reopened.field('VELO')
+
+
+def test_field_without_value_is_nan(tmp_path):
+    text = frd_text().replace('9999\n', '')
+    text += '\n'.join(_result_block('TEMP', ['T'], {2: (5.0,), 4: (7.0,)}, 3, 1) + ['9999', ''])
+    path = tmp_path / 'simulation.frd'
+    path.write_text(text)
+
+    column = convert_frd(path).field('TEMP')[:, 0]
+    np.testing.assert_array_equal(np.isnan(column), [True, False, True, False])
+    np.testing.assert_array_equal(column[[1, 3]], [5.0, 7.0])
+
+
+def test_open_results_converts_when_stale(frd_file):
+    assert is_stale(frd_file)
+    store = open_results(frd_file)
+    assert not is_stale(frd_file)
+    header_mtime = os.stat(store.root / 'header.json').st_mtime_ns
+
+    # 未过期时直接打开，不重新转换
+    assert open_results(frd_file).header == store.header
+    assert os.stat(store.root / 'header.json').st_mtime_ns == header_mtime
+
+    frd_file.write_text(frd_text().replace('2.00000E+02', '3.00000E+02'))
+    # 同样大小的文件，只靠 mtime 判断过期
+    st = os.stat(frd_file)
+    os.utime(frd_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert is_stale(frd_file)
+    with pytest.raises(FileNotFoundError):
+        open_results(frd_file, convert=False)
+    assert open_results(frd_file).column('STRESS', 'von_mises')[1] == pytest.approx(300)
+
+
+def test_failed_conversion_keeps_previous_store(frd_file):
+    store = convert_frd(frd_file)
+    text = frd_text()
+    frd_file.write_text(text[:text.index(' -5  C7') + 100])
+
+    with pytest.raises(ValueError):
+        convert_frd(frd_file)
+    assert sorted(p.name for p in frd_file.parent.iterdir()) == ['simulation.frd', 'simulation.results']
+    np.testing.assert_array_equal(ResultStore(store.root).node_tags, list(NODES))
+
+
+def test_to_pyvista(frd_file):
+    pytest.importorskip("pyvista")
+    grid = convert_frd(frd_file).to_pyvista()
+    assert grid.n_points == 4
+    assert grid.n_cells == 1
+    assert 'STRESS_von_mises' in grid.point_data
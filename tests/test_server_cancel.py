@@ -0,0 +1,112 @@
+"""
+MCP 服务器的作业取消：容器内脚本在本机 bash 中执行（不需要 Docker）
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+from server import server
+
+pytestmark = pytest.mark.skipif(not (shutil.which('bash') and shutil.which('pgrep')),
+                                reason="需要 bash 和 pgrep")
+
+
+@pytest.fixture
+def local_job(monkeypatch):
+    """DockerJob 的容器内脚本和清理脚本改为在本机 bash 中执行"""
+    def cleanup(script):
+        subprocess.run(['/bin/bash', '-c', script], timeout=30)
+
+    monkeypatch.setattr(server, '_docker_cleanup', cleanup)
+
+    def make(cmd):
+        job = server.DockerJob(cmd, '/app')
+        job.full_cmd = ['/bin/bash', '-c', job.full_cmd[-1]]
+        return job
+    return make
+
+
+def _wait_for(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f"{path} not created"
+        time.sleep(0.01)
+
+
+def test_cancel_before_start_does_not_launch(local_job, monkeypatch):
+    job = local_job('ls')
+    job.kill()
+
+    def no_popen(*args, **kwargs):
+        raise AssertionError("docker exec started after cancellation")
+
+    monkeypatch.setattr(server.subprocess, 'Popen', no_popen)
+    assert job.run(timeout=5) == (130, "", "Cancelled")
+
+
+def test_cancel_before_pid_file_stops_command(local_job, tmp_path):
+    marker = tmp_path / 'ran'
+    job = local_job(f'touch {marker}')
+
+    class Starting:
+        """docker 客户端已启动，容器内的 shell 还没写 PID 文件"""
+        def poll(self):
+            return None
+
+        def kill(self):
+            pass
+
+    job.proc = Starting()
+    job.kill()
+    assert os.path.exists(job.cancel_file)
+
+    # 随后容器内的 shell 才开始执行
+    result = subprocess.run(job.full_cmd, timeout=10)
+    assert result.returncode == 130
+    assert not marker.exists()
+    assert not os.path.exists(job.pid_file)
+    assert not os.path.exists(job.cancel_file)
+
+
+def test_cancel_running_command_kills_tree(local_job, tmp_path):
+    marker = tmp_path / 'ran'
+    job = local_job(f'sleep 30; touch {marker}')
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(result=job.run(timeout=60)))
+    thread.start()
+    _wait_for(job.pid_file)
+
+    start = time.monotonic()
+    job.kill()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert time.monotonic() - start < 10
+    assert not marker.exists()
+    assert not os.path.exists(job.pid_file)
+    assert not os.path.exists(job.cancel_file)
+
+
+def test_completed_command_leaves_no_files(local_job):
+    job = local_job('echo done')
+    assert job.run(timeout=10)[:2] == (0, 'done\n')
+    job.kill()
+    assert not os.path.exists(job.pid_file)
+    assert not os.path.exists(job.cancel_file)
+
+
+def test_session_job_cancelled_before_start():
+    class Session:
+        def execute(self, *args):
+            raise AssertionError("command sent after cancellation")
+
+        def interrupt(self):
+            raise AssertionError("nothing to interrupt before start")
+
+    job = server.SessionJob(Session(), 'ls', '/app')
+    job.kill()
+    assert job.run(timeout=5) == (130, "", "Cancelled")
@@ -0,0 +1,47 @@
+"""
+代理模型列式数据准备
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from ml.trainers.surrogate_model import SurrogateModel
+
+
+def column_dict():
+    """get_training_columns 格式的小列字典：第 2 行没有结果，第 3 行缺少 clmin"""
+    nan = np.nan
+    return {
+        'sim_id': ['a', 'b', 'c'],
+        'analysis_type': ['static', 'static', 'static'],
+        'num_elements': np.array([100.0, 200.0, 300.0]),
+        'clmax': np.array([5.0, 4.0, 3.0]),
+        'clmin': np.array([0.5, 0.4, nan]),
+        'max_stress': np.array([250.0, nan, 120.0]),
+        'mean_stress': np.array([80.0, nan, 40.0]),
+        'max_displacement': np.array([0.1, nan, 0.05]),
+        'volume': np.array([1e5, 2e5, 3e5]),
+        'param_width': np.array([50.0, 60.0, 70.0]),
+        'param_length': np.array([100.0, 110.0, 120.0]),
+    }
+
+
+def test_prepare_columns_features_and_targets():
+    model = SurrogateModel()
+    X, y = model.prepare_columns(column_dict())
+
+    assert model.feature_names == ['num_elements', 'clmax', 'clmin', 'param_length', 'param_width']
+    assert model.target_names == ['max_stress', 'mean_stress', 'max_displacement']
+    # 没有结果的行被丢弃，缺失的特征记为 0
+    np.testing.assert_array_equal(X, [[100.0, 5.0, 0.5, 100.0, 50.0],
+                                      [300.0, 3.0, 0.0, 120.0, 70.0]])
+    np.testing.assert_array_equal(y, [[250.0, 80.0, 0.1], [120.0, 40.0, 0.05]])
+
+
+def test_prepare_columns_without_geometry_params():
+    data = {k: v for k, v in column_dict().items() if not k.startswith('param_')}
+    X, y = SurrogateModel().prepare_columns(data)
+    assert X.shape == (2, 3)
+    assert y.shape == (2, 3)
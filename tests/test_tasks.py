@@ -0,0 +1,31 @@
+"""
+Celery 任务的结果处理（不启动 worker）
+"""
+
+import pytest
+
+pytest.importorskip("celery")
+
+from server.tasks import process_calculix_results
+from tests.test_frd_reader import frd_text
+
+
+def test_process_calculix_results(tmp_path):
+    (tmp_path / 'simulation.frd').write_text(frd_text())
+    results = process_calculix_results(tmp_path)
+    assert results['max_stress'] == pytest.approx(200.0)
+    assert results['max_displacement'] == pytest.approx(0.8)
+
+
+def test_missing_frd_returns_defaults(tmp_path):
+    results = process_calculix_results(tmp_path)
+    assert results['max_stress'] == 0.0
+    assert 'error' not in results
+
+
+def test_unparsable_frd_returns_error(tmp_path):
+    text = frd_text()
+    (tmp_path / 'simulation.frd').write_text(text[:text.index(' -5  C7') + 100])
+    results = process_calculix_results(tmp_path)
+    assert results['success'] is False
+    assert '结果文件解析失败' in results['error']
@@ -0,0 +1,82 @@
+"""
+分片体素数据集与增强（写入 / 读取 / 定位 / 对称变换）
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+
+from ml.models.voxelizer import voxels_to_coords
+from ml.trainers.train_geometry import (ShardedVoxelDataset, augment_coords, augment_voxels,
+                                        write_voxel_shards)
+
+RESOLUTION = 8
+
+
+def random_grids(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(rng.random((RESOLUTION,) * 3) < 0.3).astype(np.float32) for _ in range(count)]
+
+
+def test_packed_shard_round_trip(tmp_path):
+    grids = random_grids(7)
+    written = write_voxel_shards(((f'g{i}', g) for i, g in enumerate(grids)), tmp_path, RESOLUTION, shard_size=3)
+
+    dataset = ShardedVoxelDataset(tmp_path)
+    assert written == len(dataset) == 7
+    assert dataset.format == 'packed'
+    assert dataset.names == [f'g{i}' for i in range(7)]
+    assert len(dataset.shard_files) == 3
+    for i, grid in enumerate(grids):
+        np.testing.assert_array_equal(dataset.load(i), grid)
+        np.testing.assert_array_equal(dataset.load_coords(i), voxels_to_coords(grid))
+    x, y = dataset[4]
+    assert tuple(x.shape) == (1,) + (RESOLUTION,) * 3
+    np.testing.assert_array_equal(x[0].numpy(), grids[4])
+
+
+def test_coords_shard_round_trip(tmp_path):
+    coords = [voxels_to_coords(g) for g in random_grids(5)]
+    # 空样本也要能写入和读出
+    coords.insert(2, np.empty((0, 3), dtype=np.int32))
+    write_voxel_shards(((None, c) for c in coords), tmp_path, RESOLUTION, shard_size=4, shard_format='coords')
+
+    dataset = ShardedVoxelDataset(tmp_path)
+    assert dataset.format == 'coords'
+    assert len(dataset) == 6
+    for i, c in enumerate(coords):
+        np.testing.assert_array_equal(dataset.load_coords(i), c)
+        grid = np.zeros((RESOLUTION,) * 3, dtype=np.float32)
+        grid[tuple(c.T)] = 1.0
+        np.testing.assert_array_equal(dataset.load(i), grid)
+
+
+def test_locate_across_shard_boundaries(tmp_path):
+    write_voxel_shards(((None, g) for g in random_grids(10)), tmp_path, RESOLUTION, shard_size=4)
+    dataset = ShardedVoxelDataset(tmp_path)
+
+    expected = [(0, 0), (0, 3), (1, 0), (1, 3), (2, 0), (2, 1)]
+    assert [dataset._locate(i) for i in (0, 3, 4, 7, 8, 9)] == expected
+    assert dataset._locate(-1) == (2, 1)
+    assert dataset._locate(-10) == (0, 0)
+
+
+def test_write_rejects_wrong_resolution(tmp_path):
+    with pytest.raises(ValueError):
+        write_voxel_shards([(None, np.zeros((4, 4, 4)))], tmp_path, RESOLUTION)
+    with pytest.raises(ValueError):
+        write_voxel_shards([], tmp_path, RESOLUTION, shard_format='sparse')
+
+
+@pytest.mark.parametrize('seed', range(16))
+def test_augment_coords_matches_augment_voxels(seed):
+    grid = random_grids(1, seed)[0]
+    coords = np.argwhere(grid)
+
+    augmented = augment_voxels(grid, np.random.default_rng(seed))
+    moved = augment_coords(coords, RESOLUTION, np.random.default_rng(seed))
+
+    expected = np.zeros_like(grid)
+    expected[tuple(moved.T)] = 1.0
+    np.testing.assert_array_equal(augmented, expected)
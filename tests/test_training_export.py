@@ -0,0 +1,59 @@
+"""
+训练数据列式导出：数据库 -> Arrow / Parquet -> 代理模型训练集
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("sklearn")
+
+from ml.trainers.surrogate_model import SurrogateModel
+from server.data_collector import SimulationDataCollector
+from server.training_export import export_training_data, read_training_table
+
+
+@pytest.fixture
+def collector(tmp_path):
+    collector = SimulationDataCollector(str(tmp_path / 'sim.db'))
+    sim_ids = [f'sim_{i}' for i in range(6)]
+    stats = collector.bulk_ingest(
+        simulations=({'sim_id': sid, 'analysis_type': 'static' if i % 2 else 'modal', 'duration': 1.0,
+                      'geometry_params': {'length': 100.0 + i, 'width': 50.0}}
+                     for i, sid in enumerate(sim_ids)),
+        mesh=({'sim_id': sid, 'num_nodes': 1000, 'num_elements': 5000 + i,
+               'clmax': 5.0, 'clmin': 0.5, 'quality': 0.8} for i, sid in enumerate(sim_ids)),
+        # 最后一个仿真没有结果
+        results=({'sim_id': sid, 'max_stress': 250.0 + i, 'mean_stress': 80.0, 'max_displacement': 0.1,
+                  'volume': 1e5, 'mass': 0.78} for i, sid in enumerate(sim_ids[:-1]))
+    )
+    assert stats['success']
+    return collector
+
+
+@pytest.mark.parametrize('format', ['arrow', 'parquet'])
+def test_export_read_prepare_round_trip(collector, tmp_path, format):
+    stats = export_training_data(collector, tmp_path / 'training', format=format)
+    assert stats['success'], stats.get('error')
+    assert stats['rows'] == 6
+
+    table = read_training_table(stats['path'])
+    X, y = SurrogateModel().prepare_columns(table)
+    X_ref, y_ref = SurrogateModel().prepare_columns(collector.get_training_columns())
+
+    assert X.shape == (5, 5)
+    np.testing.assert_allclose(X, X_ref)
+    np.testing.assert_allclose(y, y_ref)
+
+
+def test_partitioned_export_filters_analysis_type(collector, tmp_path):
+    stats = export_training_data(collector, tmp_path / 'training', format='parquet',
+                                 partition_by_analysis_type=True)
+    assert stats['success'], stats.get('error')
+    assert stats['partitions'] == ['modal', 'static']
+
+    table = read_training_table(tmp_path / 'training', analysis_type='static')
+    X, y = SurrogateModel().prepare_columns(table)
+    assert table.num_rows == 3
+    # static 为奇数序号：5 号没有结果
+    np.testing.assert_allclose(sorted(y[:, 0]), [251.0, 253.0])
@@ -0,0 +1,77 @@
+"""向量化体素化（ml/models/voxelizer.py）测试：用解析可知的圆环和立方体网格"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from ml.models import voxelizer
+from ml.models.voxelizer import surface_voxel_coords, voxelize_mesh, voxels_to_coords
+from scripts.benchmark_voxelizer import torus_mesh
+
+MAJOR, MINOR = 1.0, 0.4
+
+
+def cube_mesh():
+    """单位立方体的 12 个三角形（外法向）"""
+    vertices = np.array(list(itertools.product((0.0, 1.0), repeat=3)))
+    triangles = np.array([
+        [0, 2, 3], [0, 3, 1], [4, 5, 7], [4, 7, 6],  # x = 0 / x = 1
+        [0, 1, 5], [0, 5, 4], [2, 6, 7], [2, 7, 3],  # y = 0 / y = 1
+        [0, 4, 6], [0, 6, 2], [1, 3, 7], [1, 7, 5],  # z = 0 / z = 1
+    ])
+    return vertices, triangles
+
+
+def torus_distance(vertices, resolution):
+    """各体素中心到圆环管中心线的距离"""
+    lo, hi = vertices.min(axis=0), vertices.max(axis=0)
+    centers = [lo[d] + (np.arange(resolution) + 0.5) * (hi[d] - lo[d]) / resolution for d in range(3)]
+    x, y, z = np.meshgrid(*centers, indexing='ij')
+    return np.hypot(np.hypot(x, y) - MAJOR, z), (hi - lo).max() / resolution
+
+
+@pytest.mark.parametrize('resolution', [16, 32, 48])
+def test_torus_solid_misses_no_interior_voxel(resolution):
+    vertices, triangles = torus_mesh(MAJOR, MINOR)
+    voxels = voxelize_mesh(vertices, triangles, resolution, 'solid') > 0
+    distance, voxel = torus_distance(vertices, resolution)
+
+    # 网格是内接多边形，离散误差远小于半个体素：管内留出半个体素的余量后必须全部占据
+    assert voxels[distance < MINOR - 0.5 * voxel].all()
+    # 表面体素可能超出解析表面，但不超过一个体素对角线
+    assert not voxels[distance > MINOR + np.sqrt(3) * voxel].any()
+
+
+@pytest.mark.parametrize('resolution', [8, 17])
+def test_cube_solid_and_surface(resolution):
+    vertices, triangles = cube_mesh()
+    solid = voxelize_mesh(vertices, triangles, resolution, 'solid')
+    surface = voxelize_mesh(vertices, triangles, resolution, 'surface')
+
+    assert solid.all()
+    expected = np.ones((resolution,) * 3, dtype=bool)
+    expected[1:-1, 1:-1, 1:-1] = False
+    np.testing.assert_array_equal(surface > 0, expected)
+    np.testing.assert_array_equal(voxels_to_coords(solid), np.argwhere(expected))
+
+
+def test_solid_contains_surface():
+    # solid 模式包含表面体素（与旧版只取中心在内部的体素不同）
+    vertices, triangles = torus_mesh(MAJOR, MINOR, segments=64, rings=32)
+    solid = voxelize_mesh(vertices, triangles, 32, 'solid') > 0
+    surface = voxelize_mesh(vertices, triangles, 32, 'surface') > 0
+    assert surface.any()
+    assert not (surface & ~solid).any()
+
+
+@pytest.mark.parametrize('chunk', [1, 97, 5000])
+def test_results_independent_of_chunk_size(monkeypatch, chunk):
+    vertices, triangles = torus_mesh(MAJOR, MINOR, segments=64, rings=32)
+    expected = {mode: voxelize_mesh(vertices, triangles, 24, mode) for mode in voxelizer.VOXEL_MODES}
+    expected_coords = surface_voxel_coords(vertices, triangles, 24)
+
+    monkeypatch.setattr(voxelizer, '_MAX_PAIRS_PER_CHUNK', chunk)
+    for mode, voxels in expected.items():
+        np.testing.assert_array_equal(voxelize_mesh(vertices, triangles, 24, mode), voxels)
+    np.testing.assert_array_equal(surface_voxel_coords(vertices, triangles, 24), expected_coords)